@@ -15,17 +15,32 @@
  Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 """
 
-from collections import deque
 import threading
 import sys
 import time
 
+try:
+    from concurrent.futures import Future
+except ImportError:
+    # python 2.7 without the futures backport - connect() is not available
+    Future = None
+
+from .pymata_board_cache import PyMataBoardCache
+from .pymata_ring_buffer import PyMataRingBuffer
 from .pymata_serial import PyMataSerial
+from .pymata_shared_state import PyMataStateExporter
 from .pymata_command_handler import PyMataCommandHandler
 
 # For report data formats refer to http://firmata.org/wiki/Protocol
 
 
+class PyMataConnectionError(Exception):
+    """
+    Raised when the board does not respond while PyMata is connecting to it.
+    """
+    pass
+
+
 # noinspection PyPep8
 class PyMata:
     """
@@ -41,22 +56,69 @@ class PyMata:
     REPORTING_ENABLE = 1  # enable reporting for REPORT_ANALOG or REPORT_DIGITAL message sent to firmata
     REPORTING_DISABLE = 0  # disable reporting for REPORT_ANALOG or REPORT_DIGITAL message sent to firmata
 
+    ########################################################################
+    # constants defined locally from values contained in the command handler
+    ########################################################################
+
+    # Data latch state constants to be used when accessing data returned from get_latch_data methods.
+    # The get_latch data methods return [pin_number, latch_state, latched_data, time_stamp]
+    # These three constants define possible values for the second item in the list, latch_state
+
+    # this pin will be ignored for latching - table initialized with this value
+    LATCH_IGNORE = PyMataCommandHandler.LATCH_IGNORE
+    # When the next pin value change is received for this pin, if it matches the latch criteria
+    # the data will be latched.
+    LATCH_ARMED = PyMataCommandHandler.LATCH_ARMED
+    # Data has been latched. Read the data to re-arm the latch.
+    LATCH_LATCHED = PyMataCommandHandler.LATCH_LATCHED
+
+    #
+    # These constants are used when setting a data latch.
+    # Latch threshold types
+    #
+    DIGITAL_LATCH_HIGH = PyMataCommandHandler.DIGITAL_LATCH_HIGH
+    DIGITAL_LATCH_LOW = PyMataCommandHandler.DIGITAL_LATCH_LOW
+
+    ANALOG_LATCH_GT = PyMataCommandHandler.ANALOG_LATCH_GT
+    ANALOG_LATCH_LT = PyMataCommandHandler.ANALOG_LATCH_LT
+    ANALOG_LATCH_GTE = PyMataCommandHandler.ANALOG_LATCH_GTE
+    ANALOG_LATCH_LTE = PyMataCommandHandler.ANALOG_LATCH_LTE
+
+    # constants to be used to parse the data returned from calling
+    # get_X_latch_data()
+
+    LATCH_PIN = 0
+    LATCH_STATE = 1
+    LATCHED_DATA = 2
+    LATCHED_TIME_STAMP = 3
+
     # Shared Resources - data structures, controlling mechanisms, and reference variables
 
-    # Commands and data received from Firmata via the serial interface are placed into the command deque.
+    # Commands and data received from Firmata via the serial interface are placed into the receive buffer
+    # (a PyMataRingBuffer created by the constructor).
     # The pymata_command_handler class removes and processes this information.
-    command_deque = deque()
+    receive_buffer = None
 
     # This is the instance reference to the communications port object
     arduino = None
 
+    # This is the instance reference to the transport (a PyMataTransport) used to communicate with the board
+    transport = None
+
     # This is  a thread lock to assure data integrity when reading or writing to the data response tables
     # (defined in the CommandHandler class). It shared by the pymata class and the pymata_command_handler class.
-    data_lock = threading.RLock()
+    # Each PyMata instance has its own lock, created by the constructor.
+    data_lock = None
 
     # This is the instance reference to the _command_handler
     _command_handler = None
 
+    # The PyMataReactor that reads this board, if one is used
+    reactor = None
+
+    # The PyMataCallbackDispatcher that runs this board's callbacks, if one is used
+    callback_dispatcher = None
+
     # verbose can be set to false to suppress output to the console when instantiating PyMata
     verbose = True
 
@@ -97,121 +159,286 @@ class PyMata:
     STEPPER_STEP = 1  # command a motor to move at the provided speed
     STEPPER_LIBRARY_VERSION = 2  # used to get stepper library version number
 
-    # each byte represents a digital port and its value contains the current port settings
-    digital_output_port_pins = [0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00,
-                                0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00, 0x00]
+    # each byte represents a digital port and its value contains the current port settings.
+    # Created for each PyMata instance by the constructor.
+    digital_output_port_pins = None
+
+    # the number of digital ports tracked in digital_output_port_pins
+    NUMBER_OF_DIGITAL_PORTS = 16
 
     # noinspection PyPep8Naming
-    def __init__(self, port_id='/dev/ttyACM0', bluetooth=True, verbose=True, baud_rate=57600):
+    def __init__(self, port_id='/dev/ttyACM0', bluetooth=True, verbose=True, baud_rate=57600,
+                 bulk_read=True, max_chunk_size=PyMataSerial.MAX_CHUNK_SIZE, event_driven=False,
+                 receive_buffer_size=PyMataRingBuffer.DEFAULT_CAPACITY, overflow_policy=PyMataRingBuffer.BLOCK,
+                 single_thread=False, transport=None, startup_timeout=PyMataCommandHandler.DISCOVERY_TIMEOUT,
+                 board_cache=None, rediscover=False, auto_connect=True, reactor=None, callback_dispatcher=None):
         """
         The "constructor" instantiates the entire interface. It starts the operational threads for the serial
         interface as well as for the command handler.
 
+        If auto_connect is False, the constructor returns at once, and the port is opened and the board
+        discovered by connect(), which does not block. This allows many boards to be brought up concurrently.
+
         :param port_id: Communications port specifier (COM3, /dev/ttyACM0, etc)
 
-        :param bluetooth: Sets start up delays for bluetooth connectivity. Set to False for faster start up.
+        :param bluetooth: Retained for compatibility. Start up no longer uses fixed delays for bluetooth
+                          connectivity - the board is probed until it responds.
 
         :param verbose: If set to False, the status print statements are suppressed.
 
         :param baud_rate: Set serial baud rate. Must match that of Firmata sketch on Arduino
-        """
-        # Currently only serial communication over USB is supported, but in the future
-        # wifi and other transport mechanism support is anticipated
 
+        :param bulk_read: If True, all data waiting on the serial port is read in a single operation.
+                          Set to False to read the serial port one byte at a time.
+
+        :param max_chunk_size: Maximum number of bytes transferred from the serial port per bulk read.
+
+        :param event_driven: If True, the serial receive thread and the command handler thread block until
+                             data arrives instead of polling. Requires a platform where the serial port
+                             exposes a file descriptor (Linux, macOS). Falls back to polling if unavailable.
+
+        :param receive_buffer_size: Capacity in bytes of the buffer holding data received from Firmata.
+
+        :param overflow_policy: Action taken when data arrives and the receive buffer is full:
+                                PyMataRingBuffer.BLOCK - wait for room in the buffer
+                                PyMataRingBuffer.DROP_OLDEST - discard the oldest data in the buffer
+                                PyMataRingBuffer.RAISE - raise a BufferError in the receive thread
+
+        :param single_thread: If True, the serial port is read by the command handler thread and the data is
+                              decoded as soon as it is read. No separate serial receive thread is started and
+                              the receive buffer is not used. Best combined with event_driven=True.
+
+        :param transport: An optional PyMataTransport instance (for example PyMataLoopbackTransport) to use in
+                          place of the serial port. When specified, port_id, bluetooth, baud_rate, bulk_read,
+                          max_chunk_size and event_driven are ignored.
+
+        :param startup_timeout: Maximum time in seconds allowed for opening the port and discovering the board.
+                                Use get_startup_timing() to see where the start up time was spent.
+
+        :param board_cache: Cache the board's analog mapping, capability map and pin counts on disk, so that
+                            a known board is ready after a single firmware report round trip.
+                            True uses the default cache file (~/.pymata/board_cache.json). A file name or a
+                            PyMataBoardCache instance may be given instead. None disables the cache.
+                            A cache entry is replaced when the board reports a different firmware.
+
+        :param rediscover: If True, the board is discovered even if it is cached, and the cache entry is
+                           refreshed.
+
+        :param auto_connect: If True, the constructor connects to the board and blocks until the board is
+                             discovered or startup_timeout expires. If False, call connect() to connect.
+
+        :param reactor: An optional PyMataReactor. The board is then read by the reactor's I/O thread, which
+                        can be shared by many boards, and no threads are started for this board.
+                        single_thread and event_driven do not apply.
+
+        :param callback_dispatcher: An optional PyMataCallbackDispatcher. Callbacks are then run by the
+                                    dispatcher's workers instead of the thread that reads the board, so that
+                                    slow callbacks do not delay data processing. The dispatcher can be shared
+                                    by many boards and is not closed by disconnect(). With the BLOCK
+                                    overflow policy, callbacks must not call disconnect().
+        """
         self.baud_rate = baud_rate
-        try:
-            # save the user's request if specified
-            self.verbose = verbose
+        self.single_thread = single_thread
+        self.reactor = reactor
+        self.callback_dispatcher = callback_dispatcher
 
+        # save the user's request if specified
+        self.verbose = verbose
 
-            if self.verbose:
-                print("\nPython Version %s" % sys.version)
-                print('\nPyMata version 2.20  Copyright(C) 2013-19 Alan Yorinks    All rights reserved.')
+        # the state of this board
+        self.data_lock = threading.RLock()
+        self.digital_output_port_pins = [0x00] * self.NUMBER_OF_DIGITAL_PORTS
 
-            # Instantiate the serial support class
-            self.transport = PyMataSerial(port_id, self.command_deque, self.baud_rate)
+        # start up time breakdown in seconds, reported by get_startup_timing()
+        self.startup_timing = {}
 
-            # wait for HC-06 Bluetooth slave to initialize in case it is being used.
-            if bluetooth:
-                time.sleep(5)
+        # the connection settings used by _connect()
+        self._connect_options = {'port_id': port_id, 'bulk_read': bulk_read, 'max_chunk_size': max_chunk_size,
+                                 'event_driven': event_driven, 'transport': transport,
+                                 'startup_timeout': startup_timeout, 'board_cache': board_cache,
+                                 'rediscover': rediscover}
+        self._connect_started = False
 
-            # Attempt opening communications with the Arduino micro-controller
-            self.transport.open(self.verbose)
+        if self.verbose:
+            print("\nPython Version %s" % sys.version)
+            print('\nPyMata version 2.20  Copyright(C) 2013-19 Alan Yorinks    All rights reserved.')
+
+        # The transport writes received data into this buffer. The command handler waits for data
+        # to arrive in the buffer and processes it.
+        self.receive_buffer = PyMataRingBuffer(receive_buffer_size, overflow_policy)
+
+        if auto_connect:
+            try:
+                self._connect()
+            except PyMataConnectionError:
+                # board was not found - PyMata has been shut down
+                if self.verbose:
+                    print("Board Auto Discovery Failed!, Shutting Down")
+            except KeyboardInterrupt:
+                if self.verbose:
+                    print("Program Aborted Before PyMata Instantiated")
+                sys.exit()
 
-            # additional wait for HC-06 if it is being used
-            if bluetooth:
-                time.sleep(2)
-            else:
-                # necessary to support Arduino Mega
-                time.sleep(1)
+    def _connect(self):
+        """
+        Open the port, start the threads and discover the board. Blocks until the board is discovered.
+        If the board does not respond, the threads are stopped and a PyMataConnectionError is raised.
+        Errors opening the port are raised by the transport.
+        """
+        if self._connect_started:
+            raise RuntimeError('PyMata is already connected or connecting')
+        self._connect_started = True
+
+        options = self._connect_options
+        start_time = time.time()
+        deadline = start_time + options['startup_timeout']
+
+        # Serial communication over USB is used unless another transport is provided
+        if options['transport'] is not None:
+            self.transport = options['transport']
+            self.transport.receive_buffer = self.receive_buffer
+        else:
+            # Instantiate the serial support class
+            self.transport = PyMataSerial(options['port_id'], self.receive_buffer, self.baud_rate,
+                                          options['bulk_read'], options['max_chunk_size'], options['event_driven'])
+
+        # Attempt opening communications with the Arduino micro-controller.
+        # There are no fixed delays - board discovery below probes the board until it is ready.
+        self.transport.open(self.verbose)
+        self.startup_timing['open'] = time.time() - start_time
 
-            # Start the data receive thread
+        # Start the data receive thread. In single thread mode the command handler reads the transport.
+        if self.reactor is None and not self.single_thread:
             self.transport.start()
 
-            # Instantiate the command handler
-            self._command_handler = PyMataCommandHandler(self)
-            self._command_handler.system_reset()
-
-            ########################################################################
-            # constants defined locally from values contained in the command handler
-            ########################################################################
-
-            # Data latch state constants to be used when accessing data returned from get_latch_data methods.
-            # The get_latch data methods return [pin_number, latch_state, latched_data, time_stamp]
-            # These three constants define possible values for the second item in the list, latch_state
-
-            # this pin will be ignored for latching - table initialized with this value
-            self.LATCH_IGNORE = self._command_handler.LATCH_IGNORE
-            # When the next pin value change is received for this pin, if it matches the latch criteria
-            # the data will be latched.
-            self.LATCH_ARMED = self._command_handler.LATCH_ARMED
-            # Data has been latched. Read the data to re-arm the latch.
-            self.LATCH_LATCHED = self._command_handler.LATCH_LATCHED
-
-            #
-            # These constants are used when setting a data latch.
-            # Latch threshold types
-            #
-            self.DIGITAL_LATCH_HIGH = self._command_handler.DIGITAL_LATCH_HIGH
-            self.DIGITAL_LATCH_LOW = self._command_handler.DIGITAL_LATCH_LOW
-
-            self.ANALOG_LATCH_GT = self._command_handler.ANALOG_LATCH_GT
-            self.ANALOG_LATCH_LT = self._command_handler.ANALOG_LATCH_LT
-            self.ANALOG_LATCH_GTE = self._command_handler.ANALOG_LATCH_GTE
-            self.ANALOG_LATCH_LTE = self._command_handler.ANALOG_LATCH_LTE
-
-            # constants to be used to parse the data returned from calling
-            # get_X_latch_data()
-
-            self.LATCH_PIN = 0
-            self.LATCH_STATE = 1
-            self.LATCHED_DATA = 2
-            self.LATCHED_TIME_STAMP = 3
+        # Instantiate the command handler
+        self._create_command_handler()
 
+        if self.reactor is not None:
+            # the reactor's thread reads the transport and feeds the command handler parser
+            self.reactor.register(self)
+        else:
             # Start the command processing thread
             self._command_handler.start()
 
-            # Command handler should now be prepared to receive replies from the Arduino, so go ahead
-            # detect the Arduino board
+        self._command_handler.system_reset()
+
+        # Command handler should now be prepared to receive replies from the Arduino, so go ahead
+        # detect the Arduino board
 
-            if self.verbose:
-                print('\nPlease wait while Arduino is being detected. This can take up to 30 seconds ...')
+        if self.verbose:
+            print('\nPlease wait while Arduino is being detected. This can take up to %d seconds ...' %
+                  options['startup_timeout'])
 
-            # perform board auto discovery
-            if not self._command_handler.auto_discover_board(self.verbose):
-                # board was not found so shutdown
-                if self.verbose:
-                    print("Board Auto Discovery Failed!, Shutting Down")
-                self._command_handler.stop()
-                self.transport.stop()
-                self._command_handler.join()
-                self.transport.join()
-                time.sleep(2)
+        # perform board auto discovery
+        if not self._discover_board(deadline, options['board_cache'], options['rediscover']):
+            # board was not found so shutdown
+            self._stop_threads()
+            raise PyMataConnectionError('Board auto discovery failed for %s' %
+                                        (self.transport.get_device_identity() or self.transport.__class__.__name__))
+
+        self.startup_timing['total'] = time.time() - start_time
+        if self.verbose:
+            print('Start up timing: %s' % ', '.join('%s %.3f s' % (phase, self.startup_timing[phase])
+                                                    for phase in ('open', 'first_message', 'verification',
+                                                                  'discovery', 'capability', 'total')
+                                                    if phase in self.startup_timing))
+
+    def _create_command_handler(self):
+        """
+        Instantiate the command handler. The command handler thread is not started.
+        """
+        self._command_handler = PyMataCommandHandler(self)
+        self._command_handler.dispatcher = self.callback_dispatcher
+
+    def _discover_board(self, deadline, board_cache, rediscover):
+        """
+        Discover the board, using the board cache if one is specified.
+
+        With a cache, the board is first asked to report its firmware. If the cache holds an entry for this
+        device and firmware, the pin tables are built from it. Otherwise the board is discovered, its
+        capabilities are queried, and the results are cached. The capabilities are also queried for an
+        entry that has no capability map, such as one stored by PyMataDiscovery.connect_all().
+
+        :param deadline: time.time() value at which discovery is abandoned
 
-        except KeyboardInterrupt:
+        :param board_cache: None, True, a cache file name or a PyMataBoardCache instance
+
+        :param rediscover: If True, the cached entry is not used
+
+        :return: True if the board was discovered
+        """
+        handler = self._command_handler
+        timing = self.startup_timing
+
+        identity = self.transport.get_device_identity()
+        if board_cache is None or identity is None:
+            return handler.auto_discover_board(self.verbose, deadline, timing)
+
+        if board_cache is True:
+            board_cache = PyMataBoardCache()
+        elif not isinstance(board_cache, PyMataBoardCache):
+            board_cache = PyMataBoardCache(board_cache)
+
+        # the verification round trip - the firmware report identifies the sketch running on the board
+        start_time = time.time()
+        if not handler.probe_board(handler.REPORT_FIRMWARE, handler.firmware_event, deadline, timing):
+            return False
+        timing['verification'] = time.time() - start_time
+        firmware = handler.firmata_firmware[-3:]
+
+        entry = None
+        if not rediscover:
+            entry = board_cache.load(identity, firmware)
+        if entry is not None:
+            if self.verbose:
+                print('Using cached board information for %s' % identity)
+            handler.analog_mapping_query_results = entry['analog_mapping']
+            handler.initialize_pin_tables(self.verbose)
+            timing['cache'] = 'hit'
+            timing['discovery'] = time.time() - start_time
+            if entry['capability']:
+                handler.capability_query_results = entry['capability']
+                return True
+        else:
+            timing['cache'] = 'miss'
+            if not handler.auto_discover_board(self.verbose, deadline, timing):
+                return False
+
+        # the board is known to be responding, so the capability query is sent only once
+        capability_start = time.time()
+        self.capability_query()
+        if not handler.capability_event.wait(max(0, deadline - capability_start)):
             if self.verbose:
-                print("Program Aborted Before PyMata Instantiated")
-            sys.exit()
+                print('No capability response - board information not cached')
+            return True
+        timing['capability'] = time.time() - capability_start
+
+        try:
+            board_cache.store(identity, firmware, handler.analog_mapping_query_results,
+                              handler.capability_query_results, handler.total_pins_discovered,
+                              handler.number_of_analog_pins_discovered)
+        except (IOError, OSError) as e:
+            # the board is usable without the cache
+            if self.verbose:
+                print('Board information not cached: %s' % e)
+        return True
+
+    def _stop_threads(self):
+        """
+        Stop reading the board and close the transport
+        """
+        self._command_handler.stop()
+        self.transport.stop()
+        self.receive_buffer.close()
+        if self.reactor is not None:
+            self.reactor.unregister(self)
+
+        # wait for the threads to end. The thread that reads the transport closes it on the way out.
+        for thread in (self.transport, self._command_handler):
+            if thread.is_alive() and thread is not threading.current_thread():
+                thread.join()
+        self.transport.close()
 
     def analog_mapping_query(self):
         """
@@ -229,7 +456,7 @@ class PyMata:
         :return: The last value entered into the analog response table.
         """
         with self.data_lock:
-            data = self._command_handler.analog_response_table[pin][self._command_handler.RESPONSE_TABLE_PIN_DATA_VALUE]
+            data = self._command_handler.analog_response_table.values[pin]
         return data
 
     def analog_write(self, pin, value):
@@ -264,10 +491,7 @@ class PyMata:
         :return: No return value, but sys.exit(0) is called.
         """
 
-        self._command_handler.system_reset()
-        self._command_handler.stop()
-        self.transport.stop()
-        self.transport.close()
+        self.disconnect()
 
         if self.verbose:
             print("PyMata close(): Calling sys.exit(0): Hope to see you soon!")
@@ -275,6 +499,46 @@ class PyMata:
         sys.exit(0)
 
 
+    def connect(self):
+        """
+        Connect to the board without blocking. Use with auto_connect=False.
+
+        The port is opened and the board discovered in a separate thread. The returned
+        concurrent.futures.Future resolves to this PyMata instance once the board has been discovered.
+        If the board does not respond within startup_timeout, the future raises a PyMataConnectionError.
+        Errors opening the port are raised by the future as well.
+
+        To connect to several boards concurrently:
+            boards = [PyMata(port, auto_connect=False) for port in ports]
+            futures = [board.connect() for board in boards]
+            concurrent.futures.wait(futures)
+
+        From asyncio code, use: await asyncio.wrap_future(board.connect())
+
+        Requires Python 3, or the futures backport for Python 2.7.
+
+        :return: A concurrent.futures.Future
+        """
+        if Future is None:
+            raise ImportError('connect() requires concurrent.futures')
+
+        future = Future()
+
+        def connect_thread():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                self._connect()
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(self)
+
+        thread = threading.Thread(target=connect_thread)
+        thread.daemon = True
+        thread.start()
+        return future
+
     def digital_read(self, pin):
         """
         Retrieve the last digital data value received for the specified pin.
@@ -285,8 +549,7 @@ class PyMata:
         :return: The last value entered into the digital response table.
         """
         with self.data_lock:
-            data = \
-                self._command_handler.digital_response_table[pin][self._command_handler.RESPONSE_TABLE_PIN_DATA_VALUE]
+            data = self._command_handler.digital_response_table.values[pin]
         return data
 
 
@@ -348,6 +611,27 @@ class PyMata:
         self._command_handler.send_command(command)
 
 
+    def disconnect(self):
+        """
+        Reset the board, stop the threads and close the transport (serial port).
+        Unlike close(), this method returns, so that other boards in the same process keep running.
+
+        If the board was never connected, or connecting failed, there is nothing to do.
+
+        :return: No return value
+        """
+        if self._command_handler is None or self._command_handler.is_stopped():
+            return
+        self._command_handler.system_reset()
+        self._stop_threads()
+
+        # remove the shared pin state segment, if the pin state was exported
+        exporter = self._command_handler.exporter
+        if exporter is not None:
+            self._command_handler.set_exporter(None)
+            exporter.close()
+
+
     def enable_analog_reporting(self, pin):
         """
         Enables analog reporting. By turning reporting on for a single pin.
@@ -393,17 +677,35 @@ class PyMata:
         :return: No return value
         """
         data = [pin_a, pin_b]
-        self._command_handler.digital_response_table[pin_a][self._command_handler.RESPONSE_TABLE_MODE] \
-            = self.ENCODER
-        self._command_handler.digital_response_table[pin_a][self._command_handler.RESPONSE_TABLE_CALLBACK] = cb
+        self._command_handler.digital_response_table.modes[pin_a] = self.ENCODER
+        self._command_handler.digital_response_table.callbacks[pin_a] = cb
         self.enable_digital_reporting(pin_a)
 
-        self._command_handler.digital_response_table[pin_b][self._command_handler.RESPONSE_TABLE_MODE] \
-            = self.ENCODER
-        self._command_handler.digital_response_table[pin_b][self._command_handler.RESPONSE_TABLE_CALLBACK] = cb
+        self._command_handler.digital_response_table.modes[pin_b] = self.ENCODER
+        self._command_handler.digital_response_table.callbacks[pin_b] = cb
         self.enable_digital_reporting(pin_b)
 
         self._command_handler.send_sysex(self._command_handler.ENCODER_CONFIG, data)
+        self._command_handler.export_tables()
+
+
+    def export_pin_state(self, name=None):
+        """
+        Mirror the pin modes and data values of the response tables into a shared memory segment,
+        so that other processes can read them with a PyMata.pymata_shared_state.PyMataStateReader.
+        The segment is removed by disconnect().
+
+        Requires Python 3.8 or later.
+
+        :param name: Name of the shared memory segment. A unique name is generated if None.
+
+        :return: The PyMataStateExporter. Its name attribute is the name to give the readers.
+        """
+        if self._command_handler.exporter is not None:
+            raise RuntimeError('The pin state is already exported as %s' % self._command_handler.exporter.name)
+        exporter = PyMataStateExporter(name)
+        self._command_handler.set_exporter(exporter)
+        return exporter
 
 
     def extended_analog(self, pin, data):
@@ -480,6 +782,33 @@ class PyMata:
         return self._command_handler.get_digital_response_table()
 
 
+    def get_error_counters(self):
+        """
+        Retrieve the counters for corrupted data detected in the data stream received from Firmata.
+        Corrupted data is skipped and data processing resumes with the next valid message.
+
+        :return: A dictionary containing:
+                 dropped_bytes - number of bytes discarded
+                 unknown_sysex - number of sysex messages received with an unknown sysex command
+                 truncated_frames - number of messages interrupted before they were complete
+                 handler_errors - number of messages that could not be processed
+        """
+        return self._command_handler.parser.get_error_counters()
+
+
+    def get_receive_buffer_stats(self):
+        """
+        Retrieve the usage statistics of the buffer holding data received from Firmata.
+
+        :return: A dictionary containing:
+                 capacity - buffer size in bytes
+                 unread_bytes - number of bytes waiting to be processed
+                 high_water_mark - the largest number of bytes waiting to be processed
+                 dropped_bytes - number of bytes discarded because the buffer was full
+        """
+        return self.receive_buffer.get_stats()
+
+
     def get_firmata_version(self):
         """
         Retrieve the firmata version information returned by a previous call to refresh_report_version()
@@ -496,6 +825,23 @@ class PyMata:
         return self._command_handler.firmata_firmware
 
 
+    def get_pin_snapshot(self, as_numpy=False):
+        """
+        Retrieve an immutable, point in time copy of the pin modes and data values of all pins.
+        Unlike the response tables, a snapshot is coherent: all values are from the same moment, identified
+        by a generation number that changes whenever data is received. Pollers can skip unchanged snapshots
+        by comparing generation numbers.
+
+        :param as_numpy: If True the modes and values are returned as read only NumPy arrays.
+                         Requires NumPy.
+
+        :return: A PyMataPinSnapshot named tuple:
+                 (generation, time_stamp, analog_modes, analog_values, digital_modes, digital_values)
+                 The modes and values are indexed by pin number.
+        """
+        return self._command_handler.get_pin_snapshot(as_numpy)
+
+
     def get_pin_state_query_results(self):
         """
         This method returns the results of a previous call to pin_state_query() and then resets
@@ -531,6 +877,24 @@ class PyMata:
         return self._command_handler.active_sonar_map
 
 
+    def get_startup_timing(self):
+        """
+        Retrieve the time spent in each phase of start up.
+
+        :return: A dictionary with the following entries, in seconds:
+                 'open' - opening the serial port (or transport)
+                 'first_message' - from the first board query until the first valid Firmata message arrived
+                 'verification' - the firmware report round trip (board cache only)
+                 'discovery' - from the first board query until the board was discovered
+                 'capability' - the capability query, when the board was not cached (board cache only)
+                 'total' - the entire start up
+                 The dictionary also contains 'queries_sent', the number of board queries sent, and
+                 with the board cache, 'cache': 'hit' or 'miss'.
+                 An entry is missing if its phase was not completed.
+        """
+        return dict(self.startup_timing)
+
+
     def get_stepper_version(self, timeout=20):
         """
         Get the stepper library version number.
@@ -580,15 +944,11 @@ class PyMata:
         # If pin type is set, set pin mode in appropriate response table for these pins
         if pin_type:
             if pin_type == self.DIGITAL:
-                self._command_handler.digital_response_table[clk_pin][self._command_handler.RESPONSE_TABLE_MODE] \
-                    = self.I2C
-                self._command_handler.digital_response_table[data_pin][self._command_handler.RESPONSE_TABLE_MODE] \
-                    = self.I2C
+                self._command_handler.digital_response_table.modes[clk_pin] = self.I2C
+                self._command_handler.digital_response_table.modes[data_pin] = self.I2C
             else:
-                self._command_handler.analog_response_table[clk_pin][self._command_handler.RESPONSE_TABLE_MODE] \
-                    = self.I2C
-                self._command_handler.analog_response_table[data_pin][self._command_handler.RESPONSE_TABLE_MODE] \
-                    = self.I2C
+                self._command_handler.analog_response_table.modes[clk_pin] = self.I2C
+                self._command_handler.analog_response_table.modes[data_pin] = self.I2C
 
 
     def i2c_read(self, address, register, number_of_bytes, read_type, cb=None):
@@ -690,14 +1050,61 @@ class PyMata:
             else:
                 data = [tone_command, pin, frequency & 0x7f, (frequency >> 7) & 0x7f, 0, 0]
 
-            self._command_handler.digital_response_table[pin][self._command_handler.RESPONSE_TABLE_MODE] = \
-                self.TONE
+            self._command_handler.digital_response_table.modes[pin] = self.TONE
         # turn off tone
         else:
             data = [tone_command, pin]
         self._command_handler.send_sysex(self._command_handler.TONE_PLAY, data)
 
 
+    def read_all_analog(self, time_stamps=False):
+        """
+        Retrieve the last data values received for all analog pins, with a single acquisition of the data lock.
+
+        :param time_stamps: If True, the times at which the values were received are returned as well.
+                            The time is 0 for pins for which no value has been received.
+
+        :return: A list of values indexed by analog pin number, or if time_stamps is True,
+                 a list of values and a list of time stamps.
+        """
+        return self._command_handler.read_values(self._command_handler.analog_response_table, None, time_stamps)
+
+
+    def read_all_digital(self, time_stamps=False):
+        """
+        Retrieve the last data values received for all digital pins, with a single acquisition of the data lock.
+        NOTE: As for digital_read(), values are returned for digital, pwm, etc, pin types
+
+        :param time_stamps: If True, the times at which the values were received are returned as well.
+                            The time is 0 for pins for which no value has been received.
+
+        :return: A list of values indexed by pin number, or if time_stamps is True,
+                 a list of values and a list of time stamps.
+        """
+        return self._command_handler.read_values(self._command_handler.digital_response_table, None, time_stamps)
+
+
+    def read_pins(self, pins, pin_type=DIGITAL, time_stamps=False):
+        """
+        Retrieve the last data values received for several pins, with a single acquisition of the data lock.
+
+        :param pins: A list of pin numbers (for analog use the analog numbers, for example A4: use 4)
+
+        :param pin_type: ANALOG or DIGITAL
+
+        :param time_stamps: If True, the times at which the values were received are returned as well.
+                            The time is 0 for pins for which no value has been received.
+
+        :return: A list of values in the order of pins, or if time_stamps is True,
+                 a list of values and a list of time stamps.
+        """
+        if pin_type == self.ANALOG:
+            table = self._command_handler.analog_response_table
+        else:
+            table = self._command_handler.digital_response_table
+        return self._command_handler.read_values(table, pins, time_stamps)
+
+
     def refresh_report_version(self):
         """
         This method will query firmata for the report version.
@@ -722,14 +1129,11 @@ class PyMata:
         """
         # set all output pins to a value of 0
         for pin in range(0, self._command_handler.total_pins_discovered):
-            if self._command_handler.digital_response_table[self._command_handler.RESPONSE_TABLE_MODE] \
-                    == self.PWM:
+            if self._command_handler.digital_response_table.modes[pin] == self.PWM:
                 self.analog_write(pin, 0)
-            elif self._command_handler.digital_response_table[self._command_handler.RESPONSE_TABLE_MODE] \
-                    == self.SERVO:
+            elif self._command_handler.digital_response_table.modes[pin] == self.SERVO:
                 self.analog_write(pin, 0)
-            elif self._command_handler.digital_response_table[self._command_handler.RESPONSE_TABLE_MODE] \
-                    == self.TONE:
+            elif self._command_handler.digital_response_table.modes[pin] == self.TONE:
                 data = [self.TONE_NO_TONE, pin]
                 self._command_handler.send_sysex(self._command_handler.TONE_PLAY, data)
             else:
@@ -737,6 +1141,14 @@ class PyMata:
         self._command_handler.system_reset()
 
 
+    def reset_error_counters(self):
+        """
+        Set the counters returned by get_error_counters() to zero.
+        :return: No return value.
+        """
+        self._command_handler.parser.reset_error_counters()
+
+
     def set_analog_latch(self, pin, threshold_type, threshold_value, cb=None):
         """
         This method "arms" an analog pin for its data to be latched and saved in the latching table
@@ -761,6 +1173,31 @@ class PyMata:
             return False
 
 
+    def set_batch_callback(self, cb, interval=0, as_numpy=False):
+        """
+        Subscribe to batched events. Instead of one callback call per pin change, cb is called with all of the
+        events decoded from a chunk of received data, or from a time window of at least interval seconds,
+        in the order they were received.
+
+        Every analog, digital, encoder and sonar value change is reported, whether or not a callback was
+        registered for the pin. Per pin callbacks are still called. With a time window, waiting events are
+        delivered when the window ends, even if no more data arrives. An exception raised by cb is reported and
+        counted in the handler_errors error counter.
+
+        :param cb: Batch callback function, or None to stop batching. It is called with a list of
+                   (mode, pin, value, time_stamp) tuples, where mode is ANALOG, DIGITAL, ENCODER or SONAR
+                   and time_stamp the time.time() the value was received.
+
+        :param interval: Minimum time in seconds between batches. 0 delivers a batch for each chunk of data.
+
+        :param as_numpy: If True the batch is a NumPy record array with the fields mode, pin, value and
+                         time_stamp. Requires NumPy.
+
+        :return: No return value.
+        """
+        self._command_handler.set_batch_callback(cb, interval, as_numpy)
+
+
     def set_digital_latch(self, pin, threshold_type, cb=None):
         """
         This method "arms" a digital pin for its data to be latched and saved in the latching table
@@ -811,24 +1248,24 @@ class PyMata:
 
                 # set analog response table to show this pin is an input pin
 
-                self._command_handler.analog_response_table[pin][self._command_handler.RESPONSE_TABLE_MODE] = \
-                    self.INPUT
-                self._command_handler.analog_response_table[pin][self._command_handler.RESPONSE_TABLE_CALLBACK] = cb
+                self._command_handler.analog_response_table.modes[pin] = self.INPUT
+                self._command_handler.analog_response_table.callbacks[pin] = cb
                 self.enable_analog_reporting(pin)
             # if not analog it has to be digital
             else:
-                self._command_handler.digital_response_table[pin][self._command_handler.RESPONSE_TABLE_MODE] = \
-                    self.INPUT
-                self._command_handler.digital_response_table[pin][self._command_handler.RESPONSE_TABLE_CALLBACK] = cb
+                self._command_handler.digital_response_table.modes[pin] = self.INPUT
+                self._command_handler.digital_response_table.callbacks[pin] = cb
 
                 self.enable_digital_reporting(pin)
 
         else:  # must be output - so set the tables accordingly
             if pin_type == self.ANALOG:
-                self._command_handler.analog_response_table[pin][self._command_handler.RESPONSE_TABLE_MODE] = mode
+                self._command_handler.analog_response_table.modes[pin] = mode
 
             else:
-                self._command_handler.digital_response_table[pin][self._command_handler.RESPONSE_TABLE_MODE] = mode
+                self._command_handler.digital_response_table.modes[pin] = mode
+
+        self._command_handler.export_tables()
 
 
     def set_sampling_interval(self, interval):
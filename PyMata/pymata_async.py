@@ -0,0 +1,579 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+ NOTE: This module requires Python 3.6 or later and a platform where the serial port
+ exposes a file descriptor (Linux, macOS).
+"""
+
+import asyncio
+import threading
+import os
+
+import serial
+
+from .pymata import PyMata
+from .pymata_serial import PyMataSerial
+
+
+class PyMataAsyncSerial(object):
+    """
+    This class manages a non-blocking serial port driven by an asyncio event loop.
+    Received data is passed to a receiver (the parser of the command handler) from an event loop
+    reader callback, so no thread is used.
+    """
+
+    def __init__(self, port_id, baud_rate, loop, max_chunk_size=PyMataSerial.MAX_CHUNK_SIZE):
+        """
+        Constructor:
+
+        :param port_id: Communications port specifier (/dev/ttyACM0, etc)
+
+        :param baud_rate: must match that of Arduino Sketch
+
+        :param loop: the asyncio event loop
+
+        :param max_chunk_size: Maximum number of bytes to read from the port at a time
+        """
+        self.port_id = port_id
+        self.baud_rate = baud_rate
+        self.loop = loop
+        self.max_chunk_size = max_chunk_size
+
+        self.arduino = None
+        self.fd = None
+        self.receiver = None
+
+        # data that could not be written without blocking and a future that is resolved when it is sent
+        self.pending = bytearray()
+        self.drained = None
+
+        # reads are always event driven
+        self.event_driven = True
+        self.stopped = False
+
+    def open(self, receiver):
+        """
+        Open the serial port and start passing received data to the receiver
+
+        :param receiver: a callable that accepts a chunk of received data
+        """
+        self.receiver = receiver
+        self.arduino = serial.Serial(self.port_id, self.baud_rate, timeout=0, writeTimeout=0)
+        # noinspection PyUnresolvedReferences
+        self.arduino.nonblocking()
+        self.fd = self.arduino.fileno()
+        self.loop.add_reader(self.fd, self._read_ready)
+
+    def is_stopped(self):
+        return self.stopped
+
+    def stop(self):
+        self.stopped = True
+
+    def close(self):
+        """
+            Close the serial port
+            return: None
+        """
+        self.stop()
+        if self.fd is not None:
+            self.loop.remove_reader(self.fd)
+            self.loop.remove_writer(self.fd)
+            self.fd = None
+        if self.arduino is not None:
+            try:
+                self.arduino.close()
+            except OSError:
+                pass
+        if self.drained is not None and not self.drained.done():
+            self.drained.set_result(None)
+
+    def _read_ready(self):
+        """
+        Event loop callback - data is waiting on the port
+        """
+        try:
+            data = os.read(self.fd, self.max_chunk_size)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self.close()
+            return
+        if not data:
+            # the device is gone
+            self.close()
+            return
+        self.receiver(data)
+
+    def write(self, data):
+        """
+        Write a frame to the serial port without blocking.
+        Data that cannot be written immediately is sent when the port becomes writable.
+
+        :param data: bytes or bytearray
+        """
+        if self.fd is None:
+            raise IOError('PyMataAsyncSerial: port %s is not open' % self.port_id)
+        if self.pending:
+            self.pending.extend(data)
+            return
+        try:
+            written = os.write(self.fd, data)
+        except (BlockingIOError, InterruptedError):
+            written = 0
+        if written < len(data):
+            self.pending.extend(data[written:])
+            self.loop.add_writer(self.fd, self._write_ready)
+
+    def _write_ready(self):
+        """
+        Event loop callback - the port can accept more data
+        """
+        try:
+            written = os.write(self.fd, self.pending)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self.close()
+            return
+        del self.pending[:written]
+        if not self.pending:
+            self.loop.remove_writer(self.fd)
+            if self.drained is not None and not self.drained.done():
+                self.drained.set_result(None)
+
+    async def drain(self):
+        """
+        Wait until all written data has been handed to the serial port
+        """
+        if self.pending and self.fd is not None:
+            if self.drained is None or self.drained.done():
+                self.drained = self.loop.create_future()
+            await self.drained
+
+
+class _PyMataAsyncCore(PyMata):
+    """
+    A PyMata instance that uses an asynchronous transport. No threads are started;
+    the transport feeds received data directly to the command handler parser.
+    """
+
+    # noinspection PyMissingConstructor
+    def __init__(self, transport, verbose):
+        self.verbose = verbose
+        self.single_thread = True
+        self.data_lock = threading.RLock()
+        self.digital_output_port_pins = [0x00] * self.NUMBER_OF_DIGITAL_PORTS
+        self.receive_buffer = None
+        self.transport = transport
+        self.startup_timing = {}
+        self._create_command_handler()
+
+    def disconnect(self):
+        raise NotImplementedError('PyMataAsync boards are disconnected with await board.close()')
+
+    def get_receive_buffer_stats(self):
+        """
+        Received data is decoded as soon as it is read, so there is no receive buffer.
+
+        :return: The get_receive_buffer_stats() dictionary, with every value 0
+        """
+        return {'capacity': 0, 'unread_bytes': 0, 'high_water_mark': 0, 'dropped_bytes': 0}
+
+
+class PyMataAsync(object):
+    """
+    This class provides the PyMata API for asyncio applications.
+
+    Methods that send a command to Firmata are coroutines that return once the command has been
+    handed to the serial port. Queries are coroutines that return the query results.
+    Methods that retrieve stored data (analog_read, digital_read, get_X...) and the PyMata constants
+    are available unchanged.
+
+    Callback data for all pins with callbacks enabled may also be consumed with an async iterator:
+
+        async for event in board.events():
+            print(event)
+
+    Each board is serviced by event loop callbacks, so any number of boards may run on one event loop.
+    """
+
+    def __init__(self, port_id='/dev/ttyACM0', verbose=True, baud_rate=57600, loop=None,
+                 max_chunk_size=PyMataSerial.MAX_CHUNK_SIZE):
+        """
+        The constructor does not communicate with the board. Call connect() to open the port and
+        discover the board.
+
+        :param port_id: Communications port specifier (/dev/ttyACM0, etc)
+
+        :param verbose: If set to False, the status print statements are suppressed.
+
+        :param baud_rate: Set serial baud rate. Must match that of Firmata sketch on Arduino
+
+        :param loop: asyncio event loop. If not specified, the event loop running connect() is used.
+
+        :param max_chunk_size: Maximum number of bytes read from the serial port at a time.
+        """
+        self.loop = loop
+        self.verbose = verbose
+        self.transport = PyMataAsyncSerial(port_id, baud_rate, self.loop, max_chunk_size)
+        self.core = _PyMataAsyncCore(self.transport, verbose)
+        self._command_handler = self.core._command_handler
+
+        # futures waiting for a response message, keyed by the response command
+        self._response_waiters = {}
+
+        # the queues of all active events() iterators
+        self._event_queues = []
+
+        # the event loop timer that delivers a waiting batch of events, see set_batch_callback()
+        self._batch_timer = None
+
+        # resolve response waiters when a response message is processed
+        for response in (self._command_handler.ANALOG_MAPPING_RESPONSE, self._command_handler.CAPABILITY_RESPONSE,
+                         self._command_handler.PIN_STATE_RESPONSE, self._command_handler.REPORT_FIRMWARE,
+                         self._command_handler.REPORT_VERSION, self._command_handler.STEPPER_DATA):
+            dispatch_entry = self._command_handler.command_dispatch[response]
+            self._command_handler.command_dispatch[response] = [self._response_hook(response, dispatch_entry[0]),
+                                                                dispatch_entry[1]]
+        self._command_handler.parser.build_dispatch_table()
+
+    def __getattr__(self, name):
+        # constants and data retrieval methods are provided by the PyMata core
+        if name == 'core':
+            raise AttributeError(name)
+        return getattr(self.core, name)
+
+    def _response_hook(self, response, method):
+        """
+        Wrap a response message handler so that the futures waiting for the response are resolved
+        after the handler has stored the response data.
+        """
+
+        def hook(data):
+            method(data)
+            for future in self._response_waiters.pop(response, []):
+                if not future.done():
+                    future.set_result(None)
+
+        return hook
+
+    async def _query(self, send, response, timeout):
+        """
+        Send a query and wait for its response message
+
+        :param send: a callable that sends the query
+
+        :param response: the response command
+
+        :param timeout: time in seconds to wait for the response
+
+        :return: No return value. asyncio.TimeoutError is raised if no response arrives in time.
+        """
+        future = self.loop.create_future()
+        waiters = self._response_waiters.setdefault(response, [])
+        waiters.append(future)
+        try:
+            send()
+            await self.transport.drain()
+            await asyncio.wait_for(future, timeout)
+        finally:
+            if future in waiters:
+                waiters.remove(future)
+
+    def _event_callback(self, cb):
+        """
+        Create a callback that publishes the callback data to the events() iterators
+        and then calls the user's callback, if provided.
+        """
+
+        def callback(data):
+            for queue in self._event_queues:
+                if queue.full():
+                    # the consumer is not keeping up - discard its oldest event
+                    queue.get_nowait()
+                queue.put_nowait(data)
+            if cb is not None:
+                cb(data)
+
+        return callback
+
+    def _feed(self, data):
+        """
+        Receive data from the transport. The data is decoded, and if a batch of events is waiting,
+        its delivery is scheduled for when it is due, in case no more data arrives before then.
+        """
+        self._command_handler.feed(data)
+        self._schedule_batch()
+
+    def _schedule_batch(self):
+        """
+        Start the batch timer if a batch of events is waiting and the timer is not running
+        """
+        wait_time = self._command_handler.get_batch_wait_time()
+        if wait_time is not None and self._batch_timer is None:
+            self._batch_timer = self.loop.call_later(wait_time, self._batch_timer_expired)
+
+    def _batch_timer_expired(self):
+        self._batch_timer = None
+        self._command_handler.deliver_due_batch()
+        self._schedule_batch()
+
+    async def connect(self, timeout=30):
+        """
+        Open the serial port and discover the board.
+
+        :param timeout: time in seconds allowed for opening the port and discovering the board.
+                        Use get_startup_timing() to see where the start up time was spent.
+
+        :return: No return value. asyncio.TimeoutError is raised if the board does not respond.
+        """
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+            self.transport.loop = self.loop
+        start_time = self.loop.time()
+        self.transport.open(self._feed)
+        self.core.startup_timing = {'open': self.loop.time() - start_time, 'queries_sent': 0}
+        self._command_handler.system_reset()
+
+        if self.verbose:
+            print('\nPlease wait while Arduino %s is being detected.' % self.transport.port_id)
+
+        # keep sending out an analog mapping query until there is a response, on the same
+        # exponential backoff schedule as the threaded PyMata
+        discovery_start = self.loop.time()
+        interval = self._command_handler.PROBE_INITIAL_INTERVAL
+        while True:
+            try:
+                self.core.startup_timing['queries_sent'] += 1
+                await self._query(self.core.analog_mapping_query, self._command_handler.ANALOG_MAPPING_RESPONSE,
+                                  min(interval, max(0, start_time + timeout - self.loop.time())))
+                break
+            except asyncio.TimeoutError:
+                if self.loop.time() - start_time >= timeout:
+                    self.transport.close()
+                    raise asyncio.TimeoutError('Board auto discovery failed for %s' % self.transport.port_id)
+                interval = min(interval * 2, self._command_handler.PROBE_MAX_INTERVAL)
+
+        self.core.startup_timing['discovery'] = self.loop.time() - discovery_start
+        self.core.startup_timing['total'] = self.loop.time() - start_time
+        if self.verbose:
+            print("Board initialized in %.3f seconds" % self.core.startup_timing['discovery'])
+        self._command_handler.initialize_pin_tables(self.verbose)
+
+    async def close(self):
+        """
+        Reset the board, close the serial port and end all events() iterators.
+        """
+        if self.transport.fd is not None:
+            self._command_handler.system_reset()
+            await self.transport.drain()
+        self.transport.close()
+        if self._batch_timer is not None:
+            self._batch_timer.cancel()
+            self._batch_timer = None
+        for queue in self._event_queues:
+            if queue.full():
+                # make room for the end of iteration marker by discarding the oldest event
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    async def disconnect(self):
+        """
+        The same as close(), for compatibility with PyMata
+        """
+        await self.close()
+
+    async def events(self, max_queue_size=0):
+        """
+        An async iterator over callback data for all pins configured with set_pin_mode, encoder_config,
+        sonar_config and i2c_read. The data format is the same as for callbacks. Iteration ends when
+        close() is called.
+
+        :param max_queue_size: Maximum number of events held for this iterator. If the iterator falls behind,
+                               the oldest events are discarded. 0 is unlimited.
+        """
+        queue = asyncio.Queue(max_queue_size)
+        self._event_queues.append(queue)
+        try:
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._event_queues.remove(queue)
+
+    async def analog_mapping_query(self, timeout=5):
+        """
+        Send an analog mapping query and wait for the results
+
+        :param timeout: time in seconds to wait for the results
+
+        :return: raw data returned by firmata
+        """
+        await self._query(self.core.analog_mapping_query, self._command_handler.ANALOG_MAPPING_RESPONSE, timeout)
+        return self.core.get_analog_mapping_request_results()
+
+    async def capability_query(self, timeout=30):
+        """
+        Send a Firmata capability query and wait for the results.
+        The Arduino can be rather slow in responding to this command.
+
+        :param timeout: time in seconds to wait for the results
+
+        :return: Raw capability data returned by firmata
+        """
+        await self._query(self.core.capability_query, self._command_handler.CAPABILITY_RESPONSE, timeout)
+        return self.core.get_capability_query_results()
+
+    async def pin_state_query(self, pin, timeout=5):
+        """
+        Send a pin state query and wait for the results
+
+        :param pin: pin number
+
+        :param timeout: time in seconds to wait for the results
+
+        :return: Raw pin state query data
+        """
+        await self._query(lambda: self.core.pin_state_query(pin), self._command_handler.PIN_STATE_RESPONSE,
+                          timeout)
+        return self.core.get_pin_state_query_results()
+
+    async def refresh_report_version(self, timeout=5):
+        """
+        Query firmata for the report version and wait for the results
+
+        :param timeout: time in seconds to wait for the results
+
+        :return: Firmata_version list [major, minor]
+        """
+        await self._query(self.core.refresh_report_version, self._command_handler.REPORT_VERSION, timeout)
+        return self.core.get_firmata_version()
+
+    async def refresh_report_firmware(self, timeout=5):
+        """
+        Query firmata to report firmware and wait for the results
+
+        :param timeout: time in seconds to wait for the results
+
+        :return: Firmata_firmware list [major, minor, file_name]
+        """
+        await self._query(self.core.refresh_report_firmware, self._command_handler.REPORT_FIRMWARE, timeout)
+        return self.core.get_firmata_firmware_version()
+
+    async def stepper_request_library_version(self, timeout=5):
+        """
+        Request the stepper library version and wait for the results
+
+        :param timeout: time in seconds to wait for the results
+
+        :return: the stepper version number
+        """
+        await self._query(self.core.stepper_request_library_version, self._command_handler.STEPPER_DATA, timeout)
+        return self._command_handler.stepper_library_version
+
+    async def set_pin_mode(self, pin, mode, pin_type, cb=None):
+        """
+        This method sets a pin to the desired pin mode for the pin_type.
+        It automatically enables data reporting. Data changes for input pins are
+        published to the events() iterators.
+
+        :param pin: Pin number (for analog use the analog number, for example A4: use 4)
+
+        :param mode: INPUT, OUTPUT, PWM, PULLUP
+
+        :param pin_type: ANALOG or DIGITAL
+
+        :param cb: This is an optional callback function to report data changes to the user
+        """
+        self.core.set_pin_mode(pin, mode, pin_type, self._event_callback(cb))
+        await self.transport.drain()
+
+    async def encoder_config(self, pin_a, pin_b, cb=None):
+        """
+        This command enables the rotary encoder (2 pin + ground) and will
+        enable encoder reporting. Encoder changes are published to the events() iterators.
+
+        :param pin_a: Encoder pin 1.
+
+        :param pin_b: Encoder pin 2.
+
+        :param cb: callback function to report encoder changes
+        """
+        self.core.encoder_config(pin_a, pin_b, self._event_callback(cb))
+        await self.transport.drain()
+
+    async def sonar_config(self, trigger_pin, echo_pin, cb=None, ping_interval=50, max_distance=200):
+        """
+        Configure the pins, ping interval and maximum distance for an HC-SR04 type device.
+        Distance changes are published to the events() iterators.
+
+        :param trigger_pin: The pin number of for the trigger (transmitter).
+
+        :param echo_pin: The pin number for the received echo.
+
+        :param cb: optional callback function to report sonar data changes
+
+        :param ping_interval: Minimum interval between pings. Lowest number to use is 33 ms.Max is 127
+
+        :param max_distance: Maximum distance in cm. Max is 200.
+        """
+        self.core.sonar_config(trigger_pin, echo_pin, self._event_callback(cb), ping_interval, max_distance)
+        await self.transport.drain()
+
+    async def i2c_read(self, address, register, number_of_bytes, read_type, cb=None):
+        """
+        This method requests the read of an i2c device. Results are retrieved by a call to
+        i2c_get_read_data() and are published to the events() iterators.
+
+        :param address: i2c device address
+
+        :param register: register number (can be set to zero)
+
+        :param number_of_bytes: number of bytes expected to be returned
+
+        :param read_type: I2C_READ  or I2C_READ_CONTINUOUSLY
+
+        :param cb: Optional callback function to report i2c data as result of read command
+        """
+        self.core.i2c_read(address, register, number_of_bytes, read_type, self._event_callback(cb))
+        await self.transport.drain()
+
+
+def _awaitable_command(name):
+    """
+    Create a coroutine that calls the PyMata command method of the same name and waits until
+    the command has been handed to the serial port.
+    """
+    method = getattr(PyMata, name)
+
+    async def command(self, *args, **kwargs):
+        result = method(self.core, *args, **kwargs)
+        await self.transport.drain()
+        return result
+
+    command.__name__ = name
+    command.__doc__ = method.__doc__
+    return command
+
+
+for _name in ('analog_write', 'digital_write', 'disable_analog_reporting', 'disable_digital_reporting',
+              'enable_analog_reporting', 'enable_digital_reporting', 'extended_analog', 'i2c_config',
+              'i2c_write', 'i2c_stop_reading', 'play_tone', 'reset', 'servo_config', 'set_sampling_interval',
+              'stepper_config', 'stepper_step'):
+    setattr(PyMataAsync, _name, _awaitable_command(_name))
@@ -0,0 +1,155 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+
+
+class PyMataBoardCache(object):
+    """
+    This class is an on-disk cache of the information PyMata discovers about a board: its analog mapping,
+    capability map and pin counts.
+
+    Entries are keyed by device identity (the port and, for USB devices, the vendor id, product id and
+    serial number). Each entry records the firmware name and version reported by the board when it was
+    stored. An entry is only used if the board still reports the same firmware - uploading a different
+    sketch invalidates it.
+
+    The cache is a JSON file. It is rewritten atomically, so that several processes may share it.
+    With a path of None the entries are only held in memory, for use by this process.
+    """
+    # the cache file format version - entries in files with a different version are ignored
+    FORMAT_VERSION = 1
+
+    DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.pymata', 'board_cache.json')
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        Constructor:
+
+        :param path: the cache file. It is created when the first entry is stored.
+                     None keeps the entries in memory.
+        """
+        self.path = path
+        self.lock = threading.Lock()
+
+        # the boards dictionary when there is no cache file
+        self.boards = {}
+
+    def _read(self):
+        """
+        :return: the boards dictionary stored in the cache file. Empty if the file is missing or unreadable.
+        """
+        if self.path is None:
+            return dict(self.boards)
+        try:
+            with open(self.path) as cache_file:
+                contents = json.load(cache_file)
+        except (IOError, OSError, ValueError):
+            return {}
+        if not isinstance(contents, dict) or contents.get('version') != self.FORMAT_VERSION:
+            return {}
+        return contents.get('boards', {})
+
+    def _write(self, boards):
+        """
+        Atomically replace the cache file
+
+        :param boards: the boards dictionary
+        """
+        if self.path is None:
+            self.boards = boards
+            return
+        directory = os.path.dirname(self.path) or '.'
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.board_cache')
+        try:
+            with os.fdopen(fd, 'w') as cache_file:
+                json.dump({'version': self.FORMAT_VERSION, 'boards': boards}, cache_file, indent=1, sort_keys=True)
+            if hasattr(os, 'replace'):
+                os.replace(temp_path, self.path)
+            else:
+                # python 2.7
+                os.rename(temp_path, self.path)
+        except Exception:
+            os.remove(temp_path)
+            raise
+
+    def load(self, identity, firmware):
+        """
+        Retrieve the cached information for a board
+
+        :param identity: the device identity
+
+        :param firmware: [major, minor, file_name] as reported by the board
+
+        :return: A dictionary with 'analog_mapping', 'capability', 'total_pins' and 'analog_pins',
+                 or None if the board is not cached or its firmware has changed
+        """
+        with self.lock:
+            entry = self._read().get(identity)
+        if entry is None or entry.get('firmware') != list(firmware):
+            return None
+        return entry
+
+    def store(self, identity, firmware, analog_mapping, capability, total_pins, analog_pins):
+        """
+        Add or replace the cached information for a board
+
+        :param identity: the device identity
+
+        :param firmware: [major, minor, file_name] as reported by the board
+
+        :param analog_mapping: the analog mapping query results
+
+        :param capability: the capability query results
+
+        :param total_pins: total number of pins
+
+        :param analog_pins: number of analog pins
+        """
+        with self.lock:
+            boards = self._read()
+            boards[identity] = {'firmware': list(firmware),
+                                'analog_mapping': list(analog_mapping),
+                                'capability': list(capability),
+                                'total_pins': total_pins,
+                                'analog_pins': analog_pins,
+                                'time_stored': time.time()}
+            self._write(boards)
+
+    def invalidate(self, identity):
+        """
+        Remove the cached information for a board
+
+        :param identity: the device identity
+        """
+        with self.lock:
+            boards = self._read()
+            if boards.pop(identity, None) is not None:
+                self._write(boards)
+
+    def clear(self):
+        """
+        Remove all cached information
+        """
+        with self.lock:
+            self._write({})
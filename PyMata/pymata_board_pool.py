@@ -0,0 +1,187 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import threading
+
+from .pymata import Future, PyMata
+from .pymata_discovery import PyMataDiscovery
+
+
+class PyMataBoardPool(object):
+    """
+    This class manages a group of boards used by one process. Each board is a PyMata instance with its
+    own threads, tables and lock, so a busy board does not hold up the others.
+
+    Boards are connected concurrently:
+
+        pool = PyMataBoardPool(verbose=False, event_driven=True)
+        connected, failures = pool.connect_all(['/dev/ttyACM0', '/dev/ttyACM1'])
+        pool['/dev/ttyACM0'].digital_write(13, 1)
+        pool.close()
+
+    Requires concurrent.futures (Python 3, or the futures backport for Python 2.7).
+    """
+
+    def __init__(self, **pymata_options):
+        """
+        Constructor:
+
+        :param pymata_options: keyword arguments passed to the PyMata constructor for every board
+        """
+        self.pymata_options = pymata_options
+
+        # name: PyMata instance
+        self.boards = {}
+        # names of the boards being connected
+        self.connecting = set()
+        self.lock = threading.Lock()
+
+        # used to name boards that have neither a port nor a device identity
+        self.boards_added = 0
+
+    def __len__(self):
+        return len(self.boards)
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self.boards))
+
+    def __getitem__(self, name):
+        return self.boards[name]
+
+    def items(self):
+        """
+        :return: A list of (name, PyMata instance) pairs
+        """
+        with self.lock:
+            return list(self.boards.items())
+
+    def add(self, port_id=None, name=None, **options):
+        """
+        Start connecting to a board. The board is added to the pool once it has been discovered.
+
+        :param port_id: the board's serial port. Not needed if a transport is passed in the options.
+
+        :param name: the name under which the board is kept. Defaults to port_id, or the transport's
+                     device identity. A ValueError is raised if the pool already has a board of that name,
+                     or is connecting one.
+
+        :param options: keyword arguments passed to the PyMata constructor for this board,
+                        in addition to those given to the pool
+
+        :return: A concurrent.futures.Future that resolves to the PyMata instance
+        """
+        pymata_options = dict(self.pymata_options)
+        pymata_options.update(options)
+        pymata_options['auto_connect'] = False
+        if port_id is not None:
+            pymata_options['port_id'] = port_id
+
+        board = PyMata(**pymata_options)
+        with self.lock:
+            self.boards_added += 1
+            board_number = self.boards_added
+        if name is None:
+            name = port_id
+            if name is None and board._connect_options['transport'] is not None:
+                name = board._connect_options['transport'].get_device_identity()
+            if name is None:
+                name = 'board %d' % board_number
+
+        with self.lock:
+            if name in self.boards or name in self.connecting:
+                raise ValueError('The pool already has a board named %s' % name)
+            self.connecting.add(name)
+
+        # the returned future resolves after the board has been added to the pool
+        pool_future = Future()
+        pool_future.set_running_or_notify_cancel()
+
+        def connected(completed):
+            exception = completed.exception()
+            with self.lock:
+                self.connecting.discard(name)
+                if exception is None:
+                    self.boards[name] = board
+            if exception is not None:
+                pool_future.set_exception(exception)
+            else:
+                pool_future.set_result(board)
+
+        board.connect().add_done_callback(connected)
+        return pool_future
+
+    def connect_all(self, ports):
+        """
+        Connect to several boards concurrently and wait until all of them are connected or have failed
+
+        :param ports: a list of serial ports
+
+        :return: A tuple of two dictionaries, as returned by PyMataDiscovery.connect_all(). The first maps each
+                 connected port to its PyMata instance, the second maps each port that failed to connect to
+                 its exception.
+        """
+        futures = dict((port_id, self.add(port_id)) for port_id in ports)
+        connected = {}
+        failures = {}
+        for port_id, future in futures.items():
+            exception = future.exception()
+            if exception is not None:
+                failures[port_id] = exception
+            else:
+                connected[port_id] = future.result()
+        return connected, failures
+
+    def connect_discovered(self, discovery=None):
+        """
+        Find the boards attached to this computer and connect to all of them
+
+        :param discovery: a PyMataDiscovery instance. Defaults to PyMataDiscovery().
+
+        :return: A tuple of two dictionaries - the connected boards and the failures, as for connect_all()
+        """
+        if discovery is None:
+            discovery = PyMataDiscovery()
+        return self.connect_all(sorted(discovery.discover()))
+
+    def remove(self, name):
+        """
+        Disconnect a board and remove it from the pool
+
+        :param name: the board's name
+        """
+        with self.lock:
+            board = self.boards.pop(name)
+        board.disconnect()
+
+    def close(self):
+        """
+        Disconnect all boards
+        """
+        for name in list(self):
+            self.remove(name)
+
+    def get_stats(self):
+        """
+        Retrieve the receive buffer statistics and stream error counters of every board
+
+        :return: A dictionary mapping each board name to a dictionary with 'receive_buffer'
+                 and 'errors' entries
+        """
+        return dict((name, {'receive_buffer': board.get_receive_buffer_stats(),
+                            'errors': board.get_error_counters()})
+                    for name, board in self.items())
@@ -0,0 +1,260 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+
+from collections import deque
+import threading
+import time
+import traceback
+
+try:
+    from concurrent.futures import ProcessPoolExecutor
+except ImportError:
+    # python 2.7 without the futures backport - process pools are not available
+    ProcessPoolExecutor = None
+
+
+class PyMataCallbackDispatcher(object):
+    """
+    This class runs user callbacks in worker threads, so that a slow callback does not hold up the
+    command handler, which goes on processing messages, or callers reading pin data.
+
+        dispatcher = PyMataCallbackDispatcher(workers=4, max_queue=1000,
+                                              overflow=PyMataCallbackDispatcher.DROP_OLDEST)
+        board = PyMata('/dev/ttyACM0', callback_dispatcher=dispatcher)
+        ...
+        board.disconnect()
+        dispatcher.close()
+
+    Each callback is queued with a key - the board and pin (or i2c address) that produced it. Callbacks with
+    the same key are always run by the same worker, so the callbacks of a pin run one at a time in the
+    order the data was received. Callbacks of different pins may run concurrently.
+
+    Each worker has a queue of at most max_queue callbacks. When a queue is full, the overflow policy
+    decides what happens:
+        BLOCK - the command handler waits until there is room (back pressure, nothing is lost)
+        DROP_NEWEST - the new callback is discarded
+        DROP_OLDEST - the oldest waiting callback of the queue is discarded
+
+    An exception raised by a callback is reported and counted, and does not affect other callbacks.
+    With use_processes=True, callbacks are run in a pool of worker processes; each worker thread waits
+    for its callback to complete, so ordering is preserved. The callbacks and their data must then be
+    picklable (functions defined at module level).
+
+    A dispatcher may be shared by several boards, and is not closed when a board is disconnected.
+    With BLOCK, callbacks must not disconnect their board: the disconnect waits for the command handler,
+    which may be waiting for room in the callback's own queue. A command handler that is stopped while
+    waiting drops the callback.
+    """
+    # time in seconds between checks of the stop event while blocked
+    STOP_CHECK_INTERVAL = .1
+
+    # overflow policies
+    BLOCK = 'block'
+    DROP_NEWEST = 'drop_newest'
+    DROP_OLDEST = 'drop_oldest'
+
+    def __init__(self, workers=1, max_queue=1000, overflow=BLOCK, use_processes=False, error_handler=None):
+        """
+        :param workers: Number of worker threads (and worker processes, if use_processes is True)
+
+        :param max_queue: Maximum number of callbacks waiting for each worker
+
+        :param overflow: BLOCK, DROP_NEWEST or DROP_OLDEST
+
+        :param use_processes: If True, callbacks are run in a pool of worker processes
+
+        :param error_handler: Optional function called with (exception, callback, data) when a callback
+                              raises an exception. By default the traceback is printed.
+        """
+        if overflow not in (self.BLOCK, self.DROP_NEWEST, self.DROP_OLDEST):
+            raise ValueError('Unknown overflow policy: %s' % overflow)
+        if use_processes and ProcessPoolExecutor is None:
+            raise ImportError('use_processes requires concurrent.futures')
+
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.error_handler = error_handler
+        self.process_pool = ProcessPoolExecutor(max_workers=workers) if use_processes else None
+
+        # one queue of (callback, data, time queued) and condition for each worker
+        self.queues = [deque() for _ in range(workers)]
+        self.conditions = [threading.Condition() for _ in range(workers)]
+        self.closed = False
+        # True while a worker is running a callback
+        self.busy = [False] * workers
+
+        # statistics. Each worker only updates its own entries.
+        self.dispatched = [0] * workers
+        self.dropped = [0] * workers
+        self.completed = [0] * workers
+        self.errors = [0] * workers
+        self.queue_high_water_marks = [0] * workers
+        self.total_latency = [0.0] * workers
+        self.max_latency = [0.0] * workers
+        self.total_run_time = [0.0] * workers
+
+        self.threads = []
+        for worker in range(workers):
+            thread = threading.Thread(target=self._run, args=(worker,))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def dispatch(self, key, callback, data, stop_event=None):
+        """
+        Queue a callback. Called by the command handler.
+
+        :param key: A hashable identifying the source of the data. Callbacks with the same key are run in order.
+
+        :param callback: The user's callback function
+
+        :param data: The data passed to the callback
+
+        :param stop_event: Optional threading.Event set when the caller is stopping. With BLOCK, the wait for
+                           room ends and the callback is dropped once it is set.
+
+        :return: True if the callback was queued, False if it was dropped
+        """
+        worker = hash(key) % len(self.queues)
+        queue = self.queues[worker]
+        with self.conditions[worker]:
+            if self.closed:
+                self.dropped[worker] += 1
+                return False
+            if len(queue) >= self.max_queue:
+                if self.overflow == self.BLOCK:
+                    while len(queue) >= self.max_queue and not self.closed:
+                        if stop_event is None:
+                            self.conditions[worker].wait()
+                        elif stop_event.is_set():
+                            self.dropped[worker] += 1
+                            return False
+                        else:
+                            self.conditions[worker].wait(self.STOP_CHECK_INTERVAL)
+                elif self.overflow == self.DROP_NEWEST:
+                    self.dropped[worker] += 1
+                    return False
+                else:
+                    queue.popleft()
+                    self.dropped[worker] += 1
+            queue.append((callback, data, time.time()))
+            self.dispatched[worker] += 1
+            if len(queue) > self.queue_high_water_marks[worker]:
+                self.queue_high_water_marks[worker] = len(queue)
+            self.conditions[worker].notify_all()
+        return True
+
+    def _run(self, worker):
+        """
+        A worker thread: run the callbacks of a queue in order
+        """
+        queue = self.queues[worker]
+        condition = self.conditions[worker]
+        while True:
+            with condition:
+                while not queue and not self.closed:
+                    condition.wait()
+                if not queue:
+                    # closed and drained
+                    return
+                callback, data, queued_time = queue.popleft()
+                self.busy[worker] = True
+                # wake up a command handler waiting for room
+                condition.notify_all()
+
+            start_time = time.time()
+            try:
+                if self.process_pool is not None:
+                    self.process_pool.submit(callback, data).result()
+                else:
+                    callback(data)
+            except Exception as e:
+                self.errors[worker] += 1
+                if self.error_handler is not None:
+                    self.error_handler(e, callback, data)
+                else:
+                    print('PyMataCallbackDispatcher: callback %r raised an exception' % callback)
+                    traceback.print_exc()
+            end_time = time.time()
+
+            self.completed[worker] += 1
+            self.busy[worker] = False
+            self.total_run_time[worker] += end_time - start_time
+            latency = end_time - queued_time
+            self.total_latency[worker] += latency
+            if latency > self.max_latency[worker]:
+                self.max_latency[worker] = latency
+
+    def wait_idle(self, timeout=None):
+        """
+        Wait until all queued callbacks have been run
+
+        :param timeout: Maximum time to wait in seconds, or None to wait indefinitely
+
+        :return: True if all callbacks have been run
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while any(self.queues) or any(self.busy):
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(.001)
+        return True
+
+    def get_stats(self):
+        """
+        Retrieve the dispatcher statistics
+
+        :return: A dictionary containing:
+                 dispatched - number of callbacks queued
+                 dropped - number of callbacks discarded by the overflow policy, or after close()
+                 completed - number of callbacks run
+                 errors - number of callbacks that raised an exception
+                 queue_depth - number of callbacks currently waiting
+                 queue_high_water_mark - the largest number of callbacks that waited for a single worker
+                 mean_latency, max_latency - time in seconds from queueing a callback to its completion
+                 mean_run_time - time in seconds spent running a callback
+        """
+        completed = sum(self.completed)
+        return {'dispatched': sum(self.dispatched),
+                'dropped': sum(self.dropped),
+                'completed': completed,
+                'errors': sum(self.errors),
+                'queue_depth': sum(len(queue) for queue in self.queues),
+                'queue_high_water_mark': max(self.queue_high_water_marks),
+                'mean_latency': sum(self.total_latency) / completed if completed else 0.0,
+                'max_latency': max(self.max_latency),
+                'mean_run_time': sum(self.total_run_time) / completed if completed else 0.0}
+
+    def close(self, wait=True):
+        """
+        Stop accepting callbacks and stop the workers
+
+        :param wait: If True, the callbacks already queued are run first. Otherwise they are discarded.
+        """
+        for worker, condition in enumerate(self.conditions):
+            with condition:
+                self.closed = True
+                if not wait:
+                    self.dropped[worker] += len(self.queues[worker])
+                    self.queues[worker].clear()
+                condition.notify_all()
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        if self.process_pool is not None:
+            self.process_pool.shutdown()
@@ -17,6 +17,11 @@
 
 import threading
 import time
+import traceback
+
+from .pymata_parser import PyMataParser
+from .pymata_tables import PyMataLatchTable, PyMataResponseTable, make_event_batch, make_pin_snapshot, \
+    require_numpy
 
 
 class PyMataCommandHandler(threading.Thread):
@@ -79,43 +84,30 @@ class PyMataCommandHandler(threading.Thread):
     SYSEX_REALTIME = 0x7F  # MIDI Reserved for realtime messages
 
     # The response tables hold response information for all pins
-    # Each table is a table of entries for each pin, which consists of the pin mode, its last value from firmata
+    # Each table holds, for each pin, the pin mode, its last value from firmata
     # and a callback function that the user attached to the pin
 
-    # This is a table that stores analog pin modes and data
-    # each entry represents ia mode (INPUT or OUTPUT), and its last current value
-    analog_response_table = []
+    # Each PyMata instance has its own command handler, and the tables and maps below are created
+    # for each command handler instance, so that several boards can be used in one process.
+
+    # This is a table (a PyMataResponseTable) that stores analog pin modes and data
+    # each pin has a mode (INPUT or OUTPUT), and its last current value
+    analog_response_table = None
 
-    # This is a table that stores digital pin modes and data
-    # each entry represents  its mode (INPUT or OUTPUT, PWM, SERVO, ENCODER), and its last current value
-    digital_response_table = []
+    # This is a table (a PyMataResponseTable) that stores digital pin modes and data
+    # each pin has a mode (INPUT or OUTPUT, PWM, SERVO, ENCODER), and its last current value
+    digital_response_table = None
 
     # The analog and digital latch tables  will store "latched" data for input pins.
     # If a pin is armed, the latest value will be stored and maintained until
     # the data is read, and the data is cleared from the latch and the latch rearmed.
 
-    # The table consists of a list of lists  sized by the number of pins for the board. It is ordered by pin number
-    # and each list entry contains a latch state, a value and a date stamp when latched.
-    # An armed state = 0 and a latched state = 1
-
-    # analog_latch_table entry = [latched_state, threshold_type, threshold_value, latched_data, time_stamp]
-    # digital_latch_table_entry = [latched_state, threshold_type, latched_data, time_stamp]
-
-    analog_latch_table = []
-    digital_latch_table = []
-
-    # index into latch tables
-    LATCH_STATE = 0
-    LATCHED_THRESHOLD_TYPE = 1
+    # The tables are PyMataLatchTables sized by the number of pins for the board. They are indexed by pin number
+    # and hold for each pin a latch state, a threshold type and value, the latched value and a time stamp
+    # when latched.
 
-    ANALOG_LATCH_DATA_TARGET = 2
-    ANALOG_LATCHED_DATA = 3
-    ANALOG_TIME_STAMP = 4
-    ANALOG_LATCH_CALLBACK = 5
-
-    DIGITAL_LATCHED_DATA = 2
-    DIGITAL_TIME_STAMP = 3
-    DIGITAL_LATCH_CALLBACK = 4
+    analog_latch_table = None
+    digital_latch_table = None
 
     # latch states
     LATCH_IGNORE = 0  # this pin will be ignored for latching
@@ -140,23 +132,27 @@ class PyMataCommandHandler(threading.Thread):
     MSB = 2
     LSB = 1
 
+    # board discovery: the default time allowed, and the analog mapping query backoff schedule.
+    # The interval between queries starts at PROBE_INITIAL_INTERVAL and doubles up to PROBE_MAX_INTERVAL.
+    DISCOVERY_TIMEOUT = 30
+    PROBE_INITIAL_INTERVAL = .025
+    PROBE_MAX_INTERVAL = .4
+    # how often the board is checked for readiness while waiting for a response
+    PROBE_READY_CHECK_INTERVAL = .05
+
     # This is a map that allows the look up of command handler methods using a command as the key.
-    # This is populated in the run method after the python interpreter sees all of the command handler method
-    # defines (python does not have forward referencing)
+    # This is populated in the constructor. The parser converts it into a dispatch table indexed
+    # directly by the received command byte.
 
     # The "key" is the command, and the value contains is a list containing the  method name and the number of
     # parameter bytes that the method will require to process the message (in some cases the value is unused)
-    command_dispatch = {}
-
-    # this deque is used by the methods that assemble messages to be sent to Firmata. The deque is filled outside of
-    # of the message processing loop and emptied within the loop.
-    command_deque = None
+    command_dispatch = None
 
     # firmata version information - saved as a list - [major, minor]
-    firmata_version = []
+    firmata_version = None
 
     # firmata firmware version information saved as a list [major, minor, file_name]
-    firmata_firmware = []
+    firmata_firmware = None
 
     # a lock to protect the data tables when they are being accessed
     data_lock = None
@@ -172,13 +168,31 @@ class PyMataCommandHandler(threading.Thread):
     # 1. A callback reference. This reference will be set to None if no callback was registered.
     # 2. Data returned from a an i2c read request.
 
-    i2c_map = {}
+    i2c_map = None
 
     # the active_sonar_map maps the sonar trigger pin number (the key) to the current data value returned
     # if a callback was specified, it is stored in the map as well.
     # an entry in the map consists of:
     #   pin: [callback,[current_data_returned]]
-    active_sonar_map = {}
+    active_sonar_map = None
+
+    # an optional PyMataStateExporter that mirrors the response tables into shared memory
+    exporter = None
+
+    # incremented, with the data lock held, each time data values in the response tables are updated
+    generation = 0
+
+    # an optional PyMataCallbackDispatcher that runs user callbacks in worker threads
+    dispatcher = None
+
+    # batched event delivery, see set_batch_callback(). batch_events is None when there is no batch callback,
+    # otherwise the list of (mode, pin, value, time_stamp) events not yet delivered.
+    batch_callback = None
+    batch_events = None
+    batch_interval = 0
+    batch_as_numpy = False
+    # time.time() value before which the next batch is not delivered
+    batch_deadline = 0
 
     # the stepper library version number.
     stepper_library_version = 0
@@ -202,10 +216,53 @@ class PyMataCommandHandler(threading.Thread):
         # this stores the results of an analog mapping query
         self.analog_mapping_query_results = []
 
+        # set when an analog mapping, capability or report firmware response arrives
+        self.analog_mapping_event = threading.Event()
+        self.capability_event = threading.Event()
+        self.firmware_event = threading.Event()
+
         self.total_pins_discovered = 0
 
         self.number_of_analog_pins_discovered = 0
 
+        # the response and latch tables, the version information and the i2c and sonar maps belong to
+        # this board, so that several PyMata instances can be used at the same time
+        self.analog_response_table = PyMataResponseTable()
+        self.digital_response_table = PyMataResponseTable()
+        self.analog_latch_table = PyMataLatchTable()
+        self.digital_latch_table = PyMataLatchTable()
+        self.firmata_version = []
+        self.firmata_firmware = []
+        self.i2c_map = {}
+        self.active_sonar_map = {}
+        self.stepper_library_version = 0
+        self.exporter = None
+        self.generation = 0
+        self.dispatcher = None
+        self.batch_callback = None
+        self.batch_events = None
+        self.batch_interval = 0
+        self.batch_as_numpy = False
+        self.batch_deadline = 0
+
+        # To add a command to the command dispatch table, append here.
+        self.command_dispatch = {}
+        self.command_dispatch.update({self.REPORT_VERSION: [self.report_version, 2]})
+        self.command_dispatch.update({self.REPORT_FIRMWARE: [self.report_firmware, 1]})
+        self.command_dispatch.update({self.ANALOG_MESSAGE: [self.analog_message, 2]})
+        self.command_dispatch.update({self.DIGITAL_MESSAGE: [self.digital_message, 2]})
+        self.command_dispatch.update({self.ENCODER_DATA: [self.encoder_data, 3]})
+        self.command_dispatch.update({self.SONAR_DATA: [self.sonar_data, 3]})
+        self.command_dispatch.update({self.STRING_DATA: [self._string_data, 2]})
+        self.command_dispatch.update({self.I2C_REPLY: [self.i2c_reply, 2]})
+        self.command_dispatch.update({self.CAPABILITY_RESPONSE: [self.capability_response, 2]})
+        self.command_dispatch.update({self.PIN_STATE_RESPONSE: [self.pin_state_response, 2]})
+        self.command_dispatch.update({self.ANALOG_MAPPING_RESPONSE: [self.analog_mapping_response, 2]})
+        self.command_dispatch.update({self.STEPPER_DATA: [self.stepper_version_response, 2]})
+
+        # the Firmata stream parser. Its dispatch table is built from command_dispatch once, here.
+        self.parser = PyMataParser(self.command_dispatch)
+
         threading.Thread.__init__(self)
         self.daemon = True
 
@@ -213,31 +270,107 @@ class PyMataCommandHandler(threading.Thread):
 
     def stop(self):
         self.stop_event.set()
+        # wake up the receive loop if it is waiting for data. Asynchronous boards have no receive buffer.
+        if self.pymata.receive_buffer is not None:
+            self.pymata.receive_buffer.wake()
 
     def is_stopped(self):
         return self.stop_event.is_set()
 
-    def auto_discover_board(self, verbose):
+    def auto_discover_board(self, verbose, deadline=None, timing=None):
         """
-        This method will allow up to 30 seconds for discovery (communicating with) an Arduino board
-        and then will determine a pin configuration table for the board.
+        This method discovers (communicates with) an Arduino board and then determines a pin configuration
+        table for the board from its response to an analog mapping query.
+
+        :param verbose: If True, status messages are printed
+
+        :param deadline: time.time() value at which discovery is abandoned.
+                         If None, DISCOVERY_TIMEOUT seconds are allowed.
+
+        :param timing: An optional dictionary that is filled in with the discovery timing breakdown:
+                       'first_message' - seconds from the first query until the first valid message arrived
+                       'discovery' - seconds from the first query until the analog mapping response arrived
+                       'queries_sent' - number of queries sent
+
         :return: True if board is successfully discovered or False upon timeout
         """
-        # get current time
+        if timing is None:
+            timing = {}
         start_time = time.time()
+        if not self.probe_board(self.ANALOG_MAPPING_QUERY, self.analog_mapping_event, deadline, timing):
+            return False
+        timing['discovery'] = time.time() - start_time
+
+        if verbose:
+            print("Board initialized in %.3f seconds" % timing['discovery'])
+
+        self.initialize_pin_tables(verbose)
+        return True
+
+    def probe_board(self, sysex_query, response_event, deadline=None, timing=None):
+        """
+        Send a sysex query on an exponential backoff schedule until the board responds, so that
+        a board that is already running is found immediately and a board that is still starting up is not
+        flooded with queries. When the first valid Firmata message arrives, the board is ready and the next
+        query is sent without waiting for the rest of the backoff interval.
+
+        :param sysex_query: the sysex query command
+
+        :param response_event: a threading.Event set by the handler of the response
 
-        # wait for up to 30 seconds for a successful capability query to occur
+        :param deadline: time.time() value at which probing is abandoned.
+                         If None, DISCOVERY_TIMEOUT seconds are allowed.
 
-        while len(self.analog_mapping_query_results) == 0:
-            if time.time() - start_time > 30:
+        :param timing: An optional dictionary. 'queries_sent' is incremented for each query sent, and
+                       'first_message' is set to the time from the first query until the first valid
+                       message arrived, if it has not been set already.
+
+        :return: True if the response arrived or False upon timeout
+        """
+        start_time = time.time()
+        if deadline is None:
+            deadline = start_time + self.DISCOVERY_TIMEOUT
+        if timing is None:
+            timing = {}
+        timing.setdefault('queries_sent', 0)
+
+        interval = self.PROBE_INITIAL_INTERVAL
+        board_ready = self.parser.first_message_time is not None
+        while True:
+            # keep sending out the query until there is a response
+            self.send_sysex(sysex_query)
+            timing['queries_sent'] += 1
+            next_query_time = min(time.time() + interval, deadline)
+            interval = min(interval * 2, self.PROBE_MAX_INTERVAL)
+
+            # wait for the response in short slices, to notice the board becoming ready
+            while not response_event.is_set():
+                remaining = next_query_time - time.time()
+                if remaining <= 0:
+                    break
+                response_event.wait(min(remaining, self.PROBE_READY_CHECK_INTERVAL))
+                if not board_ready and self.parser.first_message_time is not None:
+                    # the board is up - query again right away
+                    board_ready = True
+                    interval = self.PROBE_INITIAL_INTERVAL
+                    break
+
+            if response_event.is_set():
+                break
+            if time.time() >= deadline:
                 return False
-                # keep sending out a capability query until there is a response
-            self.send_sysex(self.ANALOG_MAPPING_QUERY)
-            time.sleep(.1)
 
-        if verbose:
-            print("Board initialized in %d seconds" % (time.time() - start_time))
+        if 'first_message' not in timing and self.parser.first_message_time is not None:
+            timing['first_message'] = max(0.0, self.parser.first_message_time - start_time)
+        return True
+
+    def initialize_pin_tables(self, verbose):
+        """
+        This method determines the pin configuration of the board from the analog mapping query results
+        and creates the response and latch tables.
 
+        :param verbose: If True, the pin counts are printed
+        """
         for pin in self.analog_mapping_query_results:
             self.total_pins_discovered += 1
             # non analog pins will be marked as IGNORE
@@ -250,24 +383,12 @@ class PyMataCommandHandler(threading.Thread):
 
         # response table initialization
         # for each pin set the mode to input and the last read data value to zero
-        for pin in range(0, self.total_pins_discovered):
-            response_entry = [self.pymata.INPUT, 0, None]
-            self.digital_response_table.append(response_entry)
-
-        for pin in range(0, self.number_of_analog_pins_discovered):
-            response_entry = [self.pymata.INPUT, 0, None]
-            self.analog_response_table.append(response_entry)
+        self.digital_response_table.reset(self.total_pins_discovered, self.pymata.INPUT)
+        self.analog_response_table.reset(self.number_of_analog_pins_discovered, self.pymata.INPUT)
 
         # set up latching tables
-        for pin in range(0, self.total_pins_discovered):
-            digital_latch_table_entry = [0, 0, 0, 0, None]
-            self.digital_latch_table.append(digital_latch_table_entry)
-
-        for pin in range(0, self.number_of_analog_pins_discovered):
-            analog_latch_table_entry = [0, 0, 0, 0, 0, None]
-            self.analog_latch_table.append(analog_latch_table_entry)
-
-        return True
+        self.digital_latch_table.reset(self.total_pins_discovered)
+        self.analog_latch_table.reset(self.number_of_analog_pins_discovered)
 
     def report_version(self, data):
         """
@@ -296,7 +417,7 @@ class PyMataCommandHandler(threading.Thread):
         :param cb: User provided callback function
         """
         with self.pymata.data_lock:
-            self.analog_latch_table[pin] = [self.LATCH_ARMED, threshold_type, threshold_value, 0, 0, cb]
+            self.analog_latch_table.arm(pin, self.LATCH_ARMED, threshold_type, threshold_value, cb)
 
     def set_digital_latch(self, pin, threshold_type, cb):
         """
@@ -309,7 +430,7 @@ class PyMataCommandHandler(threading.Thread):
         :param cb: User provided callback function
         """
         with self.pymata.data_lock:
-            self.digital_latch_table[pin] = [self.LATCH_ARMED, threshold_type, 0, 0, cb]
+            self.digital_latch_table.arm(pin, self.LATCH_ARMED, threshold_type, 0, cb)
 
     def get_analog_latch_data(self, pin):
         """
@@ -321,17 +442,7 @@ class PyMataCommandHandler(threading.Thread):
 
         :return: [latch_state, latched_data, and time_stamp]
         """
-        with self.pymata.data_lock:
-            pin_data = self.analog_latch_table[pin]
-            current_latch_data = [pin,
-                                  pin_data[self.LATCH_STATE],
-                                  pin_data[self.ANALOG_LATCHED_DATA],
-                                  pin_data[self.ANALOG_TIME_STAMP],
-                                  pin_data[self.ANALOG_LATCH_CALLBACK]]
-            # if this is latched data, clear the latch table entry for this pin
-            if pin_data[self.LATCH_STATE] == self.LATCH_LATCHED:
-                self.analog_latch_table[pin] = [0, 0, 0, 0, 0, None]
-        return current_latch_data
+        return self._get_latch_data(self.analog_latch_table, pin)
 
     def get_digital_latch_data(self, pin):
         """
@@ -343,15 +454,27 @@ class PyMataCommandHandler(threading.Thread):
 
         :return: [latch_state, latched_data, and time_stamp]
         """
+        return self._get_latch_data(self.digital_latch_table, pin)
+
+    def _get_latch_data(self, latch_table, pin):
+        """
+        This method reads a pin's entry in a latch table and clears it if the latch state is latched
+
+        :param latch_table: The analog or digital latch table
+
+        :param pin: pin number
+
+        :return: [pin, latch_state, latched_data, time_stamp, callback]
+        """
         with self.pymata.data_lock:
-            pin_data = self.digital_latch_table[pin]
             current_latch_data = [pin,
-                                  pin_data[self.LATCH_STATE],
-                                  pin_data[self.DIGITAL_LATCHED_DATA],
-                                  pin_data[self.DIGITAL_TIME_STAMP],
-                                  pin_data[self.DIGITAL_LATCH_CALLBACK]]
-            if pin_data[self.LATCH_STATE] == self.LATCH_LATCHED:
-                self.digital_latch_table[pin] = [0, 0, 0, 0, None]
+                                  latch_table.states[pin],
+                                  latch_table.latched_data[pin],
+                                  latch_table.time_stamps[pin],
+                                  latch_table.callbacks[pin]]
+            # if this is latched data, clear the latch table entry for this pin
+            if latch_table.states[pin] == self.LATCH_LATCHED:
+                latch_table.clear(pin)
         return current_latch_data
 
     def report_firmware(self, data):
@@ -382,6 +505,7 @@ class PyMataCommandHandler(threading.Thread):
 
         # add filename to tuple
         self.firmata_firmware.append("".join(file_name))
+        self.firmware_event.set()
 
     def analog_message(self, data):
         """
@@ -391,101 +515,108 @@ class PyMataCommandHandler(threading.Thread):
         This method also checks to see if latching was requested for the pin. If the latch criteria was met,
         the latching table is updated. If a latching callback function was provided by the user, a latching
         notification callback message is sent to the user in place of updating the latching table.
+        Callbacks are invoked after the data lock is released.
 
         :param data: Message data from Firmata
 
         :return: No return value.
         """
+        pin = data[0]
+        value = (data[self.MSB] << 7) + data[self.LSB]
+        table = self.analog_response_table
+        callback = None
+        latch_callback = None
         with self.pymata.data_lock:
             # hold on to the previous value
-            previous_value = \
-                self.analog_response_table[data[self.RESPONSE_TABLE_MODE]][self.RESPONSE_TABLE_PIN_DATA_VALUE]
-            self.analog_response_table[data[self.RESPONSE_TABLE_MODE]][self.RESPONSE_TABLE_PIN_DATA_VALUE] \
-                = (data[self.MSB] << 7) + data[self.LSB]
-            pin = data[0]
-            pin_response_data_data = self.analog_response_table[pin]
-            value = pin_response_data_data[self.RESPONSE_TABLE_PIN_DATA_VALUE]
+            previous_value = table.values[pin]
+            table.values[pin] = value
+            table.time_stamps[pin] = time_stamp = time.time()
+            self.generation += 1
+            if self.exporter is not None:
+                self.exporter.update(self.exporter.ANALOG, pin, table.modes[pin], value)
             # check to see if there is a callback function attached to this pin
-            callback = self.analog_response_table[data[self.RESPONSE_TABLE_MODE]][self.RESPONSE_TABLE_CALLBACK]
-            # send the pin mode, pin number, and current data value
-            if callback is not None:
-                if value != previous_value:
-                    # has the value changed since the last report
-                    callback([self.pymata.ANALOG, pin, value])
+            # and if the value has changed since the last report
+            if value != previous_value:
+                callback = table.callbacks[pin]
+                if self.batch_events is not None:
+                    self.batch_events.append((self.pymata.ANALOG, pin, value, time_stamp))
 
             # check if data is to be latched
-            # get the analog latching table entry for this pin
-            latching_entry = self.analog_latch_table[pin]
-            if latching_entry[self.LATCH_STATE] == self.LATCH_ARMED:
+            latch_table = self.analog_latch_table
+            if latch_table.states[pin] == self.LATCH_ARMED:
                 # Has the latching criteria been met
-                if latching_entry[self.LATCHED_THRESHOLD_TYPE] == self.ANALOG_LATCH_GT:
-                    if value > latching_entry[self.ANALOG_LATCH_DATA_TARGET]:
-                        if latching_entry[self.ANALOG_LATCH_CALLBACK] is not None:
-                            self.analog_latch_table[pin] = [0, 0, 0, 0, 0, None]
-                            latching_entry[self.ANALOG_LATCH_CALLBACK]([self.pymata.ANALOG | self.pymata.LATCH_MODE,
-                                                                        pin, value, time.time()])
-                        else:
-                            updated_latch_entry = latching_entry
-                            updated_latch_entry[self.LATCH_STATE] = self.LATCH_LATCHED
-                            updated_latch_entry[self.ANALOG_LATCHED_DATA] = value
-                            # time stamp it
-                            updated_latch_entry[self.ANALOG_TIME_STAMP] = time.time()
-                            self.analog_latch_table[pin] = updated_latch_entry
-                    else:
-                        pass  # haven't hit target
-                elif latching_entry[self.LATCHED_THRESHOLD_TYPE] == self.ANALOG_LATCH_GTE:
-                    if value >= latching_entry[self.ANALOG_LATCH_DATA_TARGET]:
-                        if latching_entry[self.ANALOG_LATCH_CALLBACK] is not None:
-                            self.analog_latch_table[pin] = [0, 0, 0, 0, 0, None]
-                            latching_entry[self.ANALOG_LATCH_CALLBACK]([self.pymata.ANALOG | self.pymata.LATCH_MODE,
-                                                                        pin, value, time.time()])
-                        else:
-                            updated_latch_entry = latching_entry
-                            updated_latch_entry[self.LATCH_STATE] = self.LATCH_LATCHED
-                            updated_latch_entry[self.ANALOG_LATCHED_DATA] = value
-                            # time stamp it
-                            updated_latch_entry[self.ANALOG_TIME_STAMP] = time.time()
-                            self.analog_latch_table[pin] = updated_latch_entry
-                    else:
-                        pass  # haven't hit target:
-                elif latching_entry[self.LATCHED_THRESHOLD_TYPE] == self.ANALOG_LATCH_LT:
-                    if value < latching_entry[self.ANALOG_LATCH_DATA_TARGET]:
-                        if latching_entry[self.ANALOG_LATCH_CALLBACK] is not None:
-                            latching_entry[self.ANALOG_LATCH_CALLBACK]([self.pymata.ANALOG | self.pymata.LATCH_MODE,
-                                                                        pin, value, time.time()])
-                            self.analog_latch_table[pin] = [0, 0, 0, 0, 0, None]
-                        else:
-                            updated_latch_entry = latching_entry
-                            updated_latch_entry[self.LATCH_STATE] = self.LATCH_LATCHED
-                            updated_latch_entry[self.ANALOG_LATCHED_DATA] = value
-                            # time stamp it
-                            updated_latch_entry[self.ANALOG_TIME_STAMP] = time.time()
-                            self.analog_latch_table[pin] = updated_latch_entry
-                    else:
-                        pass  # haven't hit target:
-                elif latching_entry[self.LATCHED_THRESHOLD_TYPE] == self.ANALOG_LATCH_LTE:
-                    if value <= latching_entry[self.ANALOG_LATCH_DATA_TARGET]:
-                        if latching_entry[self.ANALOG_LATCH_CALLBACK] is not None:
-                            latching_entry[self.ANALOG_LATCH_CALLBACK]([self.pymata.ANALOG | self.pymata.LATCH_MODE,
-                                                                        pin, value, time.time()])
-                            self.analog_latch_table[pin] = [0, 0, 0, 0, 0, None]
-                        else:
-                            updated_latch_entry = latching_entry
-                            updated_latch_entry[self.LATCH_STATE] = self.LATCH_LATCHED
-                            updated_latch_entry[self.ANALOG_LATCHED_DATA] = value
-                            # time stamp it
-                            updated_latch_entry[self.ANALOG_TIME_STAMP] = time.time()
-                            self.analog_latch_table[pin] = updated_latch_entry
-                    else:
-                        pass  # haven't hit target:
+                threshold_type = latch_table.threshold_types[pin]
+                threshold = latch_table.thresholds[pin]
+                if threshold_type == self.ANALOG_LATCH_GT:
+                    latched = value > threshold
+                elif threshold_type == self.ANALOG_LATCH_GTE:
+                    latched = value >= threshold
+                elif threshold_type == self.ANALOG_LATCH_LT:
+                    latched = value < threshold
+                elif threshold_type == self.ANALOG_LATCH_LTE:
+                    latched = value <= threshold
                 else:
-                    pass
+                    latched = False
+                if latched:
+                    latch_callback = self._latch(latch_table, pin, value)
+
+        # send the pin mode, pin number, and current data value
+        if callback is not None:
+            self._callback(callback, self.ANALOG_MESSAGE, pin, [self.pymata.ANALOG, pin, value])
+        if latch_callback is not None:
+            self._callback(latch_callback, self.ANALOG_MESSAGE, pin,
+                           [self.pymata.ANALOG | self.pymata.LATCH_MODE, pin, value, time.time()])
+
+    def _callback(self, callback, message_type, pin, data):
+        """
+        This method invokes a user callback. If a callback dispatcher was provided, the callback is queued
+        to the dispatcher instead, keyed by this board, the message type and the pin, so that the callbacks
+        for a pin are run in order. Must be called without the data lock held.
+
+        :param callback: The user's callback function
+
+        :param message_type: The Firmata message type that produced the data
+
+        :param pin: The pin number, or i2c device address
+
+        :param data: The data passed to the callback
+        """
+        if self.dispatcher is None:
+            callback(data)
+        else:
+            self.dispatcher.dispatch((id(self), message_type, pin), callback, data, self.stop_event)
+
+    def _latch(self, latch_table, pin, latched_data):
+        """
+        This method latches the data for a pin whose latch criteria was met.
+        If a latching callback function was provided by the user, the latch is cleared and the callback
+        returned, to be invoked by the caller once the data lock is released.
+        Otherwise the latched data and a time stamp are stored until read. Called with the data lock held.
+
+        :param latch_table: The analog or digital latch table
+
+        :param pin: pin number
+
+        :param latched_data: The value stored in the latch table
+
+        :return: The latching callback function, or None
+        """
+        callback = latch_table.callbacks[pin]
+        if callback is not None:
+            latch_table.clear(pin)
+        else:
+            latch_table.states[pin] = self.LATCH_LATCHED
+            latch_table.latched_data[pin] = latched_data
+            # time stamp it
+            latch_table.time_stamps[pin] = time.time()
+        return callback
 
     def digital_message(self, data):
         """
         This method handles the incoming digital message.
         It stores the data values in the digital response table.
         Data is stored for all 8 bits of a  digital port
+        Callbacks are invoked, in pin order, after the data lock is released.
 
         :param data: Message data from Firmata
 
@@ -493,63 +624,55 @@ class PyMataCommandHandler(threading.Thread):
         """
         port = data[0]
         port_data = (data[self.MSB] << 7) + data[self.LSB]
+        table = self.digital_response_table
+        latch_table = self.digital_latch_table
 
         # set all the pins for this reporting port
         # get the first pin number for this report
         pin = port * 8
-        for pin in range(pin, min(pin + 8, self.total_pins_discovered)):
-            # shift through all the bit positions and set the digital response table
-            with self.pymata.data_lock:
+        time_stamp = time.time()
+        # the callbacks to invoke as [callback, pin, callback data]
+        callbacks = []
+        with self.pymata.data_lock:
+            self.generation += 1
+            batch_events = self.batch_events
+            for pin in range(pin, min(pin + 8, self.total_pins_discovered)):
+                # shift through all the bit positions and set the digital response table
+                value = port_data & 0x01
                 # look at the previously stored value for this pin
-                prev_data = self.digital_response_table[pin][self.RESPONSE_TABLE_PIN_DATA_VALUE]
+                prev_data = table.values[pin]
                 # get the current value
-                self.digital_response_table[pin][self.RESPONSE_TABLE_PIN_DATA_VALUE] = port_data & 0x01
+                table.values[pin] = value
+                table.time_stamps[pin] = time_stamp
+                if self.exporter is not None:
+                    self.exporter.update(self.exporter.DIGITAL, pin, table.modes[pin], value)
                 # if the values differ and callback is enabled for the pin, then send out the callback
-                if prev_data != port_data & 0x01:
-                    callback = self.digital_response_table[pin][self.RESPONSE_TABLE_CALLBACK]
+                if prev_data != value:
+                    callback = table.callbacks[pin]
                     if callback:
-                        callback([self.pymata.DIGITAL, pin,
-                                  self.digital_response_table[pin][self.RESPONSE_TABLE_PIN_DATA_VALUE]])
+                        callbacks.append([callback, pin, [self.pymata.DIGITAL, pin, value]])
+                    if batch_events is not None:
+                        batch_events.append((self.pymata.DIGITAL, pin, value, time_stamp))
 
                 # determine if the latch data table needs to be updated for each pin
-                latching_entry = self.digital_latch_table[pin]
-                if latching_entry[self.LATCH_STATE] == self.LATCH_ARMED:
-                    if latching_entry[self.LATCHED_THRESHOLD_TYPE] == self.DIGITAL_LATCH_LOW:
-                        if (port_data & 0x01) == 0:
-                            if latching_entry[self.DIGITAL_LATCH_CALLBACK] is not None:
-                                self.digital_latch_table[pin] = [0, 0, 0, 0, None]
-                                latching_entry[self.DIGITAL_LATCH_CALLBACK](
-                                    [self.pymata.OUTPUT | self.pymata.LATCH_MODE,
-                                     pin, 0, time.time()])
-
-                            else:
-                                updated_latch_entry = latching_entry
-                                updated_latch_entry[self.LATCH_STATE] = self.LATCH_LATCHED
-                                updated_latch_entry[self.DIGITAL_LATCHED_DATA] = self.DIGITAL_LATCH_LOW
-                                # time stamp it
-                                updated_latch_entry[self.DIGITAL_TIME_STAMP] = time.time()
-                        else:
-                            pass
-                    elif latching_entry[self.LATCHED_THRESHOLD_TYPE] == self.DIGITAL_LATCH_HIGH:
-                        if port_data & 0x01:
-                            if latching_entry[self.DIGITAL_LATCH_CALLBACK] is not None:
-                                self.digital_latch_table[pin] = [0, 0, 0, 0, None]
-                                latching_entry[self.DIGITAL_LATCH_CALLBACK](
-                                    [self.pymata.OUTPUT | self.pymata.LATCH_MODE,
-                                     pin, 1, time.time()])
-                            else:
-                                updated_latch_entry = latching_entry
-                                updated_latch_entry[self.LATCH_STATE] = self.LATCH_LATCHED
-                                updated_latch_entry[self.DIGITAL_LATCHED_DATA] = self.DIGITAL_LATCH_HIGH
-                                # time stamp it
-                                updated_latch_entry[self.DIGITAL_TIME_STAMP] = time.time()
-                        else:
-                            pass
-                else:
-                    pass
-
-            # get the next data bit
-            port_data >>= 1
+                if latch_table.states[pin] == self.LATCH_ARMED:
+                    threshold_type = latch_table.threshold_types[pin]
+                    latch_callback = None
+                    if threshold_type == self.DIGITAL_LATCH_LOW:
+                        if value == 0:
+                            latch_callback = self._latch(latch_table, pin, self.DIGITAL_LATCH_LOW)
+                    elif threshold_type == self.DIGITAL_LATCH_HIGH:
+                        if value:
+                            latch_callback = self._latch(latch_table, pin, self.DIGITAL_LATCH_HIGH)
+                    if latch_callback is not None:
+                        callbacks.append([latch_callback, pin, [self.pymata.OUTPUT | self.pymata.LATCH_MODE,
+                                                                pin, value, time.time()]])
+
+                # get the next data bit
+                port_data >>= 1
+
+        for callback, pin, callback_data in callbacks:
+            self._callback(callback, self.DIGITAL_MESSAGE, pin, callback_data)
 
     def encoder_data(self, data):
         """
@@ -560,19 +683,26 @@ class PyMataCommandHandler(threading.Thread):
 
         :return: No return value.
         """
-        prev_val = self.digital_response_table[data[self.RESPONSE_TABLE_MODE]][self.RESPONSE_TABLE_PIN_DATA_VALUE]
         val = int((data[self.MSB] << 7) + data[self.LSB])
         # set value so that it shows positive and negative values
         if val > 8192:
             val -= 16384
         pin = data[0]
+        table = self.digital_response_table
+        callback = None
         with self.pymata.data_lock:
-            self.digital_response_table[data[self.RESPONSE_TABLE_MODE]][self.RESPONSE_TABLE_PIN_DATA_VALUE] = val
+            prev_val = table.values[pin]
+            table.values[pin] = val
+            table.time_stamps[pin] = time_stamp = time.time()
+            self.generation += 1
+            if self.exporter is not None:
+                self.exporter.update(self.exporter.DIGITAL, pin, table.modes[pin], val)
             if prev_val != val:
-                callback = self.digital_response_table[pin][self.RESPONSE_TABLE_CALLBACK]
-                if callback is not None:
-                    callback([self.pymata.ENCODER, pin,
-                              self.digital_response_table[pin][self.RESPONSE_TABLE_PIN_DATA_VALUE]])
+                callback = table.callbacks[pin]
+                if self.batch_events is not None:
+                    self.batch_events.append((self.pymata.ENCODER, pin, val, time_stamp))
+        if callback is not None:
+            self._callback(callback, self.ENCODER_DATA, pin, [self.pymata.ENCODER, pin, val])
 
     def sonar_data(self, data):
         """
@@ -585,37 +715,175 @@ class PyMataCommandHandler(threading.Thread):
         """
         val = int((data[self.MSB] << 7) + data[self.LSB])
         pin_number = data[0]
+        callback = None
         with self.pymata.data_lock:
             sonar_pin_entry = self.active_sonar_map[pin_number]
             # also write it into the digital response table
-            self.digital_response_table[data[self.RESPONSE_TABLE_MODE]][self.RESPONSE_TABLE_PIN_DATA_VALUE] = val
+            self.digital_response_table.values[pin_number] = val
+            self.digital_response_table.time_stamps[pin_number] = time_stamp = time.time()
+            self.generation += 1
+            if self.exporter is not None:
+                self.exporter.update(self.exporter.DIGITAL, pin_number,
+                                     self.digital_response_table.modes[pin_number], val)
             # send data through callback if there is a callback function for the pin
-            if sonar_pin_entry[0] is not None:
-                # check if value changed since last reading
-                if sonar_pin_entry[1] != val:
-                    self.active_sonar_map[pin_number][0]([self.pymata.SONAR, pin_number, val])
+            # and the value changed since last reading
+            if sonar_pin_entry[1] != val:
+                callback = sonar_pin_entry[0]
+                if self.batch_events is not None:
+                    self.batch_events.append((self.pymata.SONAR, pin_number, val, time_stamp))
             # update the data in the table with latest value
             sonar_pin_entry[1] = val
             self.active_sonar_map[pin_number] = sonar_pin_entry
+        if callback is not None:
+            self._callback(callback, self.SONAR_DATA, pin_number, [self.pymata.SONAR, pin_number, val])
 
     def get_analog_response_table(self):
         """
         This method returns the entire analog response table to the caller
-        :return: The analog response table.
+        :return: The analog response table, as a list of [mode, value, callback] for each pin
         """
         with self.pymata.data_lock:
-            data = self.analog_response_table
+            data = self.analog_response_table.entries()
         return data
 
     def get_digital_response_table(self):
         """
         This method returns the entire digital response table to the caller
-        :return: The digital response table.
+        :return: The digital response table, as a list of [mode, value, callback] for each pin
         """
         with self.pymata.data_lock:
-            data = self.digital_response_table
+            data = self.digital_response_table.entries()
         return data
 
+    def get_pin_snapshot(self, as_numpy=False):
+        """
+        This method returns an immutable, point in time copy of the modes and values of all pins.
+        The data lock is only held while the table columns are copied, one memory copy each, so the parser
+        is not held up while the snapshot is built.
+
+        :param as_numpy: If True the modes and values are read only NumPy arrays instead of tuples
+
+        :return: A PyMataPinSnapshot
+        """
+        with self.pymata.data_lock:
+            generation = self.generation
+            time_stamp = time.time()
+            columns = self.analog_response_table.copy_columns() + self.digital_response_table.copy_columns()
+        return make_pin_snapshot(generation, time_stamp, columns, as_numpy)
+
+    def read_values(self, table, pins=None, time_stamps=False):
+        """
+        This method reads the data values of several pins of a response table with a single acquisition of
+        the data lock
+
+        :param table: The analog or digital response table
+
+        :param pins: A list of pin numbers, or None for all pins
+
+        :param time_stamps: If True, the time each value was received is returned as well
+
+        :return: A list of values, or if time_stamps is True, a list of values and a list of time stamps
+        """
+        with self.pymata.data_lock:
+            if pins is None:
+                values = table.values.tolist()
+                if time_stamps:
+                    return values, table.time_stamps.tolist()
+            else:
+                column = table.values
+                values = [column[pin] for pin in pins]
+                if time_stamps:
+                    column = table.time_stamps
+                    return values, [column[pin] for pin in pins]
+        return values
+
+    def set_exporter(self, exporter):
+        """
+        This method starts or stops mirroring the response tables into a PyMataStateExporter
+        :param exporter: A PyMataStateExporter, or None to stop
+        """
+        with self.pymata.data_lock:
+            self.exporter = exporter
+        self.export_tables()
+
+    def export_tables(self):
+        """
+        This method publishes the modes and values of all pins to the exporter, if there is one.
+        It is called when the tables are rebuilt and when pin modes are set.
+        """
+        with self.pymata.data_lock:
+            if self.exporter is not None:
+                self.exporter.sync(self.analog_response_table, self.digital_response_table)
+
+    def set_batch_callback(self, callback, interval=0, as_numpy=False):
+        """
+        Set or remove the batch callback. Any events not yet delivered to the previous batch callback are
+        discarded.
+
+        :param callback: The user's batch callback function, or None to stop batching
+
+        :param interval: Minimum time in seconds between batches
+
+        :param as_numpy: If True batches are delivered as NumPy record arrays
+        """
+        if as_numpy:
+            require_numpy()
+        with self.pymata.data_lock:
+            self.batch_callback = callback
+            self.batch_interval = interval
+            self.batch_as_numpy = as_numpy
+            self.batch_deadline = 0
+            self.batch_events = None if callback is None else []
+
+    def feed(self, data):
+        """
+        This method decodes a chunk of data received from Firmata and, if a batch callback was set,
+        delivers the events decoded so far once the batch interval has passed.
+
+        :param data: The received data
+        """
+        self.parser.feed(data)
+        self.deliver_due_batch()
+
+    def get_batch_wait_time(self):
+        """
+        This method tells the receive loops how long they may wait for data before a batch of events is due.
+
+        :return: Time in seconds until the waiting events are due for delivery, or None if no events are waiting
+        """
+        if not self.batch_events:
+            return None
+        return max(0, self.batch_deadline - time.time())
+
+    def deliver_due_batch(self):
+        """
+        This method delivers the waiting events if the batch interval has passed. It is called after each chunk
+        of data is decoded, and by the receive loops when they time out waiting for data, so that events are
+        not held while the board is quiet.
+        """
+        if self.batch_events and time.time() >= self.batch_deadline:
+            self._deliver_batch()
+
+    def _deliver_batch(self):
+        """
+        This method passes the events waiting for the batch callback to it, in a single call, after the
+        data lock is released. An exception raised by the callback is reported and counted in the
+        handler_errors error counter, like an exception raised by a message handler.
+        """
+        with self.pymata.data_lock:
+            events = self.batch_events
+            callback = self.batch_callback
+            if not events or callback is None:
+                return
+            self.batch_events = []
+            as_numpy = self.batch_as_numpy
+            self.batch_deadline = time.time() + self.batch_interval
+        try:
+            self._callback(callback, None, None, make_event_batch(events, as_numpy))
+        except Exception:
+            self.parser.handler_errors += 1
+            traceback.print_exc()
+
     def send_sysex(self, sysex_command, sysex_data=None):
         """
         This method will send a Sysex command to Firmata with any accompanying data
@@ -626,19 +894,13 @@ class PyMataCommandHandler(threading.Thread):
 
         :return : No return value.
         """
-        if not sysex_data:
-            sysex_data = []
-
-        # convert the message command and data to characters
-        sysex_message = chr(self.START_SYSEX)
-        sysex_message += chr(sysex_command)
-        if len(sysex_data):
-            for d in sysex_data:
-                sysex_message += chr(d)
-        sysex_message += chr(self.END_SYSEX)
+        # assemble the complete frame so that it is written to the transport in a single operation
+        sysex_message = bytearray([self.START_SYSEX, sysex_command])
+        if sysex_data:
+            sysex_message.extend(sysex_data)
+        sysex_message.append(self.END_SYSEX)
 
-        for data in sysex_message:
-            self.pymata.transport.write(data)
+        self.pymata.transport.write(sysex_message)
 
     def send_command(self, command):
         """
@@ -648,12 +910,7 @@ class PyMataCommandHandler(threading.Thread):
 
         :return : No return value.
         """
-        send_message = ""
-        for i in command:
-            send_message += chr(i)
-
-        for data in send_message:
-            self.pymata.transport.write(data)
+        self.pymata.transport.write(bytearray(command))
 
     def system_reset(self):
         """
@@ -662,27 +919,15 @@ class PyMataCommandHandler(threading.Thread):
 
         :return: No return value
         """
-        data = chr(self.SYSTEM_RESET)
-        self.pymata.transport.write(data)
+        self.pymata.transport.write(bytearray([self.SYSTEM_RESET]))
 
         # response table re-initialization
         # for each pin set the mode to input and the last read data value to zero
         with self.pymata.data_lock:
-            # remove all old entries from existing tables
-            for _ in range(len(self.digital_response_table)):
-                self.digital_response_table.pop()
-
-            for _ in range(len(self.analog_response_table)):
-                self.analog_response_table.pop()
-
-            # reinitialize tables
-            for pin in range(0, self.total_pins_discovered):
-                response_entry = [self.pymata.INPUT, 0, None]
-                self.digital_response_table.append(response_entry)
-
-            for pin in range(0, self.number_of_analog_pins_discovered):
-                response_entry = [self.pymata.INPUT, 0, None]
-                self.analog_response_table.append(response_entry)
+            self.digital_response_table.reset(self.total_pins_discovered, self.pymata.INPUT)
+            self.analog_response_table.reset(self.number_of_analog_pins_discovered, self.pymata.INPUT)
+            self.generation += 1
+        self.export_tables()
 
     # noinspection PyMethodMayBeStatic
     # keeps pycharm happy
@@ -727,7 +972,7 @@ class PyMataCommandHandler(threading.Thread):
             # is there a call back for this entry?
             # if yes, return a list of bytes through the callback
             if i2c_data[0] is not None:
-                i2c_data[0]([self.pymata.I2C, address, reply_data])
+                self._callback(i2c_data[0], self.I2C_REPLY, address, [self.pymata.I2C, address, reply_data])
 
     def capability_response(self, data):
         """
@@ -737,6 +982,7 @@ class PyMataCommandHandler(threading.Thread):
         :param data: raw capability data
         """
         self.capability_query_results = data
+        self.capability_event.set()
 
     def pin_state_response(self, data):
         """
@@ -755,6 +1001,7 @@ class PyMataCommandHandler(threading.Thread):
         :param data: raw analog mapping data
         """
         self.analog_mapping_query_results = data
+        self.analog_mapping_event.set()
 
     def stepper_version_response(self, data):
         """
@@ -762,106 +1009,61 @@ class PyMataCommandHandler(threading.Thread):
         """
         self.stepper_library_version = (data[0] & 0x7f) + (data[1] << 7)
 
+    # noinspection PyExceptClausesOrder
+    def _run_single_thread(self):
+        """
+        The receive loop used when PyMata runs in single thread mode.
+        Data is read from the transport and fed to the parser by this thread, so there is no
+        hand-off between a receive thread and the command handler.
+        """
+        transport = self.pymata.transport
+        while not self.is_stopped() and not transport.is_stopped():
+            # we can get an OSError: [Errno9] Bad file descriptor when shutting down
+            # just ignore it
+            try:
+                # only time out when a batch of events is due, so that transports without a timeout still work
+                batch_wait_time = self.get_batch_wait_time()
+                if batch_wait_time is None:
+                    data = transport.read_chunk()
+                else:
+                    data = transport.read_chunk(batch_wait_time)
+            except OSError:
+                continue
+            except IOError:
+                transport.stop()
+                break
+            if data:
+                self.feed(data)
+            else:
+                self.deliver_due_batch()
+        transport.close()
+
     def run(self):
         """
         This method starts the thread that continuously runs to receive and interpret
         messages coming from Firmata. This must be the last method in this file
-        It also checks the deque for messages to be sent to Firmata.
         """
-        # To add a command to the command dispatch table, append here.
-        self.command_dispatch.update({self.REPORT_VERSION: [self.report_version, 2]})
-        self.command_dispatch.update({self.REPORT_FIRMWARE: [self.report_firmware, 1]})
-        self.command_dispatch.update({self.ANALOG_MESSAGE: [self.analog_message, 2]})
-        self.command_dispatch.update({self.DIGITAL_MESSAGE: [self.digital_message, 2]})
-        self.command_dispatch.update({self.ENCODER_DATA: [self.encoder_data, 3]})
-        self.command_dispatch.update({self.SONAR_DATA: [self.sonar_data, 3]})
-        self.command_dispatch.update({self.STRING_DATA: [self._string_data, 2]})
-        self.command_dispatch.update({self.I2C_REPLY: [self.i2c_reply, 2]})
-        self.command_dispatch.update({self.CAPABILITY_RESPONSE: [self.capability_response, 2]})
-        self.command_dispatch.update({self.PIN_STATE_RESPONSE: [self.pin_state_response, 2]})
-        self.command_dispatch.update({self.ANALOG_MAPPING_RESPONSE: [self.analog_mapping_response, 2]})
-        self.command_dispatch.update({self.STEPPER_DATA: [self.stepper_version_response, 2]})
+        if self.pymata.single_thread:
+            self._run_single_thread()
+            return
 
+        receive_buffer = self.pymata.receive_buffer
         while not self.is_stopped():
-            if len(self.pymata.command_deque):
-                # get next byte from the deque and process it
-                data = self.pymata.command_deque.popleft()
-
-                # this list will be populated with the received data for the command
-                command_data = []
-
-                # process sysex commands
-                if data == self.START_SYSEX:
-                    # next char is the actual sysex command
-                    # wait until we can get data from the deque
-                    while len(self.pymata.command_deque) == 0:
-                        pass
-                    sysex_command = self.pymata.command_deque.popleft()
-                    # retrieve the associated command_dispatch entry for this command
-                    dispatch_entry = self.command_dispatch.get(sysex_command)
-
-                    # get a "pointer" to the method that will process this command
-                    method = dispatch_entry[0]
-
-                    # now get the rest of the data excluding the END_SYSEX byte
-                    end_of_sysex = False
-                    while not end_of_sysex:
-                        # wait for more data to arrive
-                        while len(self.pymata.command_deque) == 0:
-                            pass
-                        data = self.pymata.command_deque.popleft()
-                        if data != self.END_SYSEX:
-                            command_data.append(data)
-                        else:
-                            end_of_sysex = True
-
-                            # invoke the method to process the command
-                            method(command_data)
-                            # go to the beginning of the loop to process the next command
-                    continue
-
-                # is this a command byte in the range of 0x80-0xff - these are the non-sysex messages
-
-                elif 0x80 <= data <= 0xff:
-                    # look up the method for the command in the command dispatch table
-                    # for the digital reporting the command value is modified with port number
-                    # the handler needs the port to properly process, so decode that from the command and
-                    # place in command_data
-                    if 0x90 <= data <= 0x9f:
-                        port = data & 0xf
-                        command_data.append(port)
-                        data = 0x90
-                    # the pin number for analog data is embedded in the command so, decode it
-                    elif 0xe0 <= data <= 0xef:
-                        pin = data & 0xf
-                        command_data.append(pin)
-                        data = 0xe0
-                    else:
-                        pass
-
-                    dispatch_entry = self.command_dispatch.get(data)
-
-                    # this calls the method retrieved from the dispatch table
-                    method = dispatch_entry[0]
-
-                    # get the number of parameters that this command provides
-                    num_args = dispatch_entry[1]
-
-                    # look at the number of args that the selected method requires
-                    # now get that number of bytes to pass to the called method
-                    for i in range(num_args):
-                        while len(self.pymata.command_deque) == 0:
-                            pass
-                        data = self.pymata.command_deque.popleft()
-                        command_data.append(data)
-                        # go execute the command with the argument list
-                    method(command_data)
-
-                    # go to the beginning of the loop to process the next command
-                    continue
+            # process the received data in place. Partial messages are held
+            # by the parser until the rest of the message arrives.
+            data = receive_buffer.peek()
+            if len(data):
+                try:
+                    self.feed(data)
+                finally:
+                    receive_buffer.consume(len(data))
             else:
-                time.sleep(.1)
-
-
-
-
+                # wait for the transport to signal that data has arrived.
+                # An event driven transport always signals, so there is no need to time out,
+                # unless a batch of events is due before then.
+                timeout = None if self.pymata.transport.event_driven else .1
+                batch_wait_time = self.get_batch_wait_time()
+                if batch_wait_time is not None:
+                    timeout = batch_wait_time if timeout is None else min(timeout, batch_wait_time)
+                receive_buffer.wait(timeout)
+                self.deliver_due_batch()
@@ -0,0 +1,267 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import glob
+import sys
+import threading
+import time
+
+from .pymata_board_cache import PyMataBoardCache
+from .pymata_command_handler import PyMataCommandHandler
+from .pymata_parser import PyMataParser
+from .pymata_ring_buffer import PyMataRingBuffer
+from .pymata_serial import PyMataSerial
+
+try:
+    from serial.tools import list_ports
+except ImportError:
+    list_ports = None
+
+
+class PyMataDiscovery(object):
+    """
+    This class finds the Firmata boards attached to a computer.
+
+    Each candidate serial port is probed in its own thread. The firmware report and analog mapping
+    queries are sent on the same backoff schedule PyMata uses, so the total discovery time is that of
+    the slowest port rather than the sum of all of them.
+
+    Note that the queries are written to every candidate port. Exclude ports connected to other
+    devices by passing an explicit port list.
+
+        discovery = PyMataDiscovery()
+        boards = discovery.discover()
+        # {'/dev/ttyACM0': {'identity': ..., 'firmware': [2, 5, 'FirmataPlus.ino'], 'total_pins': 20, ...}}
+        connected, failures = discovery.connect_all(boards, bluetooth=False)
+        # {'/dev/ttyACM0': <PyMata instance>, ...}, {'/dev/ttyACM1': PyMataConnectionError(...), ...}
+    """
+    # serial port name patterns searched for boards
+    DEFAULT_PATTERNS = ['/dev/ttyACM*', '/dev/ttyUSB*', '/dev/tty.usbmodem*', '/dev/tty.usbserial*']
+
+    # time in seconds allowed for each port to respond
+    DEFAULT_TIMEOUT = 5
+
+    START_SYSEX = PyMataCommandHandler.START_SYSEX
+    END_SYSEX = PyMataCommandHandler.END_SYSEX
+
+    def __init__(self, baud_rate=57600, timeout=DEFAULT_TIMEOUT, verbose=False):
+        """
+        Constructor:
+
+        :param baud_rate: must match that of the Firmata sketch on the boards
+
+        :param timeout: time in seconds allowed for each port to respond. All ports are probed at the same time.
+
+        :param verbose: If True, the result for each port is printed
+        """
+        self.baud_rate = baud_rate
+        self.timeout = timeout
+        self.verbose = verbose
+
+    def candidate_ports(self, patterns=None):
+        """
+        List the serial ports that may have a board attached
+
+        :param patterns: a list of glob patterns for port names. Defaults to DEFAULT_PATTERNS.
+                         On Windows, all COM ports are listed.
+
+        :return: A sorted list of port names
+        """
+        if sys.platform.startswith('win'):
+            if list_ports is None:
+                return []
+            return sorted(port_info[0] for port_info in list_ports.comports())
+
+        ports = set()
+        for pattern in patterns or self.DEFAULT_PATTERNS:
+            ports.update(glob.glob(pattern))
+        return sorted(ports)
+
+    def discover(self, ports=None):
+        """
+        Probe the ports concurrently and return the boards found
+
+        :param ports: the ports to probe. Defaults to candidate_ports().
+
+        :return: A dictionary mapping each port with a board to a dictionary of:
+                 'identity' - the device identity (port and usb information)
+                 'firmware' - [major, minor, file_name], or None if the firmware did not report
+                 'protocol_version' - [major, minor], or None if the board did not report it
+                 'analog_mapping' - the analog mapping query results
+                 'total_pins' - total number of pins
+                 'analog_pins' - number of analog pins
+                 'discovery_time' - seconds taken to discover the board
+        """
+        if ports is None:
+            ports = self.candidate_ports()
+
+        results = {}
+        threads = []
+        for port_id in ports:
+            thread = threading.Thread(target=self._probe_port, args=(port_id, results))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        for thread in threads:
+            thread.join()
+        return results
+
+    def connect_all(self, boards, **pymata_options):
+        """
+        Connect a PyMata instance to each board found by discover(). The boards are connected concurrently.
+        Requires concurrent.futures (Python 3, or the futures backport for Python 2.7).
+
+        If boards is the dictionary returned by discover() and no board_cache option is given, the discovered
+        analog mappings are passed to the PyMata instances through an in memory PyMataBoardCache, so each
+        board only has to confirm its firmware instead of being discovered again.
+
+        :param boards: the dictionary returned by discover(), or a list of port names
+
+        :param pymata_options: keyword arguments passed to the PyMata constructor
+
+        :return: A tuple of two dictionaries. The first maps each connected port to its PyMata instance,
+                 the second maps each port that failed to connect to its exception.
+        """
+        # imported here, since pymata imports this module's dependencies
+        from .pymata import PyMata
+
+        if isinstance(boards, dict) and pymata_options.get('board_cache') is None:
+            board_cache = PyMataBoardCache(None)
+            for board in boards.values():
+                # the firmware identifies the cache entry. The capability map was not queried, so the board
+                # queries it when it connects.
+                if board['identity'] is not None and board['firmware'] is not None:
+                    board_cache.store(board['identity'], board['firmware'], board['analog_mapping'], [],
+                                      board['total_pins'], board['analog_pins'])
+            pymata_options['board_cache'] = board_cache
+
+        pymata_options['auto_connect'] = False
+        futures = dict((port_id, PyMata(port_id, **pymata_options).connect()) for port_id in boards)
+        connected = {}
+        failures = {}
+        for port_id, future in futures.items():
+            exception = future.exception()
+            if exception is not None:
+                failures[port_id] = exception
+            else:
+                connected[port_id] = future.result()
+        return connected, failures
+
+    def _probe_port(self, port_id, results):
+        """
+        Probe a single port. This method runs in its own thread.
+
+        :param port_id: the port
+
+        :param results: the dictionary in which the result is stored if a board is found
+        """
+        start_time = time.time()
+        try:
+            board = self._handshake(port_id, start_time + self.timeout)
+        except Exception as e:
+            # the port could not be opened or is in use
+            if self.verbose:
+                print('%s: %s' % (port_id, e))
+            return
+
+        if board is None:
+            if self.verbose:
+                print('%s: no Firmata board found' % port_id)
+            return
+
+        board['discovery_time'] = time.time() - start_time
+        if self.verbose:
+            print('%s: %s, %d pins, %d analog pins' % (port_id, board['firmware'], board['total_pins'],
+                                                       board['analog_pins']))
+        results[port_id] = board
+
+    def _handshake(self, port_id, deadline):
+        """
+        Ask the board on a port for its firmware and analog mapping
+
+        :param port_id: the port
+
+        :param deadline: time.time() value at which the port is abandoned
+
+        :return: A dictionary describing the board, or None if no board responded
+        """
+        board = {'firmware': None, 'protocol_version': None, 'analog_mapping': None}
+
+        def report_version(data):
+            board['protocol_version'] = [data[0], data[1]]
+
+        def report_firmware(data):
+            # the file name is sent with each character as 2 bytes
+            board['firmware'] = [data[0], data[1], ''.join(chr(c) for c in data[2::2])]
+
+        def analog_mapping_response(data):
+            board['analog_mapping'] = list(data)
+
+        parser = PyMataParser({PyMataCommandHandler.REPORT_VERSION: [report_version, 2],
+                               PyMataCommandHandler.REPORT_FIRMWARE: [report_firmware, 1],
+                               PyMataCommandHandler.ANALOG_MAPPING_RESPONSE: [analog_mapping_response, 2]})
+
+        # the firmware query is sent first, so that its reply arrives before the analog mapping
+        query = bytearray([self.START_SYSEX, PyMataCommandHandler.REPORT_FIRMWARE, self.END_SYSEX,
+                           self.START_SYSEX, PyMataCommandHandler.ANALOG_MAPPING_QUERY, self.END_SYSEX])
+
+        receive_buffer = PyMataRingBuffer()
+        transport = PyMataSerial(port_id, receive_buffer, self.baud_rate, event_driven=True)
+        try:
+            transport.open(False)
+            identity = transport.get_device_identity()
+            transport.start()
+
+            interval = PyMataCommandHandler.PROBE_INITIAL_INTERVAL
+            board_ready = False
+            while board['analog_mapping'] is None:
+                now = time.time()
+                if now >= deadline:
+                    return None
+                transport.write(query)
+                next_query_time = min(now + interval, deadline)
+                interval = min(interval * 2, PyMataCommandHandler.PROBE_MAX_INTERVAL)
+
+                while board['analog_mapping'] is None:
+                    remaining = next_query_time - time.time()
+                    if remaining <= 0:
+                        break
+                    receive_buffer.wait(remaining)
+                    data = receive_buffer.read()
+                    if data:
+                        parser.feed(data)
+                    if not board_ready and parser.first_message_time is not None:
+                        # the board is up. The message may be the firmware reply, with the analog mapping
+                        # on its way, so allow a short time for it before querying again.
+                        board_ready = True
+                        interval = PyMataCommandHandler.PROBE_INITIAL_INTERVAL
+                        next_query_time = min(next_query_time, time.time() + interval)
+        finally:
+            transport.stop()
+            receive_buffer.close()
+            if transport.is_alive():
+                transport.join()
+            else:
+                transport.close()
+
+        analog_mapping = board['analog_mapping']
+        board['identity'] = identity
+        board['total_pins'] = len(analog_mapping)
+        # digital only pins are marked with 0x7f (IGNORE)
+        board['analog_pins'] = len([pin for pin in analog_mapping if pin != 0x7f])
+        return board
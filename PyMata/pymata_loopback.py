@@ -0,0 +1,134 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+from collections import deque
+import threading
+
+from .pymata_transport import PyMataTransport
+
+
+class PyMataLoopbackTransport(PyMataTransport):
+    """
+    This class is an in-memory transport. No board or serial port is involved.
+
+    Data passed to inject() is received by PyMata as if it had been sent by a board.
+    Frames written by PyMata are passed to an optional responder, and any data the responder
+    returns is injected. Analog mapping queries are answered automatically, so that a PyMata
+    instance can be constructed with this transport.
+
+    This allows the command handler, latching and callback machinery to be exercised at full speed.
+    """
+    ANALOG_MAPPING_QUERY = bytearray([0xF0, 0x69, 0xF7])
+
+    # analog mapping of an Arduino Uno: 14 digital pins followed by A0 - A5
+    UNO_ANALOG_MAPPING = [0x7f] * 14 + [0, 1, 2, 3, 4, 5]
+
+    def __init__(self, analog_mapping=UNO_ANALOG_MAPPING, responder=None, receive_buffer=None):
+        """
+        Constructor:
+
+        :param analog_mapping: The analog mapping (a list with the analog pin number for each pin,
+                               or 0x7f for digital only pins) sent in reply to an analog mapping query.
+                               If None, analog mapping queries are not answered.
+
+        :param responder: An optional callable that is passed each frame written by PyMata (as bytes).
+                          Any data it returns is injected as received data.
+
+        :param receive_buffer: A reference to the PyMataRingBuffer shared with the _command_handler.
+                               PyMata sets this when the transport is passed to its constructor.
+        """
+        PyMataTransport.__init__(self, receive_buffer, event_driven=True)
+
+        self.analog_mapping = analog_mapping
+        self.responder = responder
+
+        # injected data waiting to be read
+        self.incoming = deque()
+        self.condition = threading.Condition()
+
+        # write statistics
+        self.frames_written = 0
+        self.bytes_written = 0
+
+        self.is_open = False
+
+    def open(self, verbose):
+        """
+        Open the transport
+
+        :param verbose: If True, status messages are printed
+        """
+        if verbose:
+            print('\nOpening loopback transport')
+        self.is_open = True
+
+    def close(self):
+        """
+        Close the transport
+        """
+        self.is_open = False
+
+    def stop(self):
+        PyMataTransport.stop(self)
+        with self.condition:
+            self.condition.notify_all()
+
+    def inject(self, data):
+        """
+        Make data available to PyMata as if it had been received from a board
+
+        :param data: bytes or bytearray containing Firmata messages
+        """
+        with self.condition:
+            self.incoming.append(bytes(data))
+            self.condition.notify()
+
+    def write(self, data):
+        """
+        Accept a frame written by PyMata
+
+        :param data: bytes or bytearray
+        """
+        self.frames_written += 1
+        self.bytes_written += len(data)
+
+        if self.analog_mapping is not None and data == self.ANALOG_MAPPING_QUERY:
+            self.inject(bytearray([0xF0, 0x6A]) + bytearray(self.analog_mapping) + bytearray([0xF7]))
+
+        if self.responder is not None:
+            reply = self.responder(bytes(data))
+            if reply:
+                self.inject(reply)
+
+    def read_chunk(self, timeout=None):
+        """
+        Wait for injected data and return all of it
+
+        :param timeout: Maximum time in seconds to wait for data, or None to wait until data is injected
+
+        :return: The data. Empty if the transport was stopped or the timeout expired.
+        """
+        with self.condition:
+            while not self.incoming:
+                if self.is_stopped():
+                    return b''
+                self.condition.wait(timeout)
+                if timeout is not None and not self.incoming:
+                    return b''
+            data = b''.join(self.incoming)
+            self.incoming.clear()
+        return data
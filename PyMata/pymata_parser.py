@@ -0,0 +1,269 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import sys
+import time
+import traceback
+
+
+class PyMataParser(object):
+    """
+    This class is an incremental Firmata stream parser.
+
+    Data received from Firmata is passed to feed() in chunks of any size. A message that is split
+    across chunks is held in the parser until the rest of it arrives, so the parser never has to wait
+    for data. Each completed message is handed to the method found for its command in the
+    dispatch table.
+    """
+    START_SYSEX = 0xF0  # start a MIDI Sysex message
+    END_SYSEX = 0xF7  # end a MIDI Sysex message
+
+    # messages that carry a port or pin number in the low nibble of the command byte
+    DIGITAL_MESSAGE = 0x90  # send or receive data for a digital pin
+    ANALOG_MESSAGE = 0xE0  # send or receive data for a PWM configured pin
+
+    # parser states
+    WAIT_FOR_COMMAND = 0  # waiting for a command byte
+    WAIT_FOR_SYSEX_COMMAND = 1  # START_SYSEX received, waiting for the sysex command
+    WAIT_FOR_SYSEX_DATA = 2  # collecting sysex data until END_SYSEX
+    WAIT_FOR_MESSAGE_DATA = 3  # collecting the data bytes for a non-sysex message
+
+    # These values are indexes into the dispatch table entries
+    DISPATCH_METHOD = 0
+    DISPATCH_NUM_ARGS = 1
+    DISPATCH_CHANNEL = 2
+
+    def __init__(self, command_dispatch):
+        """
+        constructor for Parser class
+
+        :param command_dispatch: A map of command: [method, number of data bytes].
+                                 The number of data bytes is not used for sysex commands.
+        """
+        self.command_dispatch = command_dispatch
+
+        # The dispatch table is indexed directly by a received byte value.
+        # Entries 0x80 - 0xFF are indexed by message command byte, entries 0x00 - 0x7F by sysex command.
+        # Each entry is a tuple of (method, number of data bytes, channel), where channel is True if the
+        # low nibble of the command byte carries a port or pin number that is passed to the method.
+        # Unused entries are None.
+        self.dispatch_table = None
+        self.build_dispatch_table()
+
+        # current parser state
+        self.state = self.WAIT_FOR_COMMAND
+
+        # the method that will process the message being assembled
+        self.method = None
+
+        # number of data bytes still needed to complete a non-sysex message
+        self.bytes_needed = 0
+
+        # True if the message being assembled carries a port or pin number from its command byte
+        self.channel = False
+
+        # the data collected so far for the message being assembled
+        self.command_data = []
+
+        # stream error counters
+        self.dropped_bytes = 0  # bytes discarded while resynchronizing
+        self.unknown_sysex = 0  # sysex messages with a sysex command that is not in the dispatch table
+        self.truncated_frames = 0  # messages interrupted by a command byte before they were complete
+        self.handler_errors = 0  # messages whose handler raised an exception
+
+        # time at which the first complete message was dispatched - used to detect that the board is ready
+        self.first_message_time = None
+
+    def build_dispatch_table(self):
+        """
+        Build the dispatch table from the command_dispatch map.
+        Call this method again if the command_dispatch map is modified.
+        """
+        table = [None] * 256
+        for command, dispatch_entry in self.command_dispatch.items():
+            method, num_args = dispatch_entry[0], dispatch_entry[1]
+            if command in (self.DIGITAL_MESSAGE, self.ANALOG_MESSAGE):
+                for channel_command in range(command, command + 16):
+                    table[channel_command] = (method, num_args, True)
+            else:
+                table[command] = (method, num_args, False)
+        self.dispatch_table = table
+
+    def reset(self):
+        """
+        Discard any partially assembled message and wait for the next command byte
+        """
+        self.state = self.WAIT_FOR_COMMAND
+        self.method = None
+        self.bytes_needed = 0
+        self.channel = False
+        self.command_data = []
+
+    def get_error_counters(self):
+        """
+        Retrieve the stream error counters
+        :return: A dictionary with the counts of dropped bytes, unknown sysex commands, truncated frames
+                 and message handlers that raised an exception.
+        """
+        return {'dropped_bytes': self.dropped_bytes,
+                'unknown_sysex': self.unknown_sysex,
+                'truncated_frames': self.truncated_frames,
+                'handler_errors': self.handler_errors}
+
+    def reset_error_counters(self):
+        """
+        Set all stream error counters to zero
+        """
+        self.dropped_bytes = 0
+        self.unknown_sysex = 0
+        self.truncated_frames = 0
+        self.handler_errors = 0
+
+    def dispatch(self, method, command_data):
+        """
+        Invoke a message handler. An exception raised by the handler (for example, a corrupted
+        pin number) is reported and counted, and the parser carries on with the next message.
+
+        :param method: message handler
+
+        :param command_data: message data
+        """
+        try:
+            method(command_data)
+        except Exception:
+            self.handler_errors += 1
+            traceback.print_exc()
+
+    def feed(self, data):
+        """
+        Process a chunk of data received from Firmata.
+        Each message completed by this chunk is dispatched. An incomplete message at the end of
+        the chunk is kept and completed by a subsequent call.
+
+        The parser resynchronizes on corrupted data: data bytes received while waiting for a command,
+        unknown commands and sysex messages with an unknown sysex command are skipped, and a message
+        that is interrupted by a command byte is discarded and parsing restarts at that command byte.
+
+        :param data: bytes, bytearray, memoryview or any iterable of byte values
+
+        :return: The number of messages dispatched
+        """
+        # the parser state is kept in local variables while the chunk is processed
+        table = self.dispatch_table
+        dispatch = self.dispatch
+        state = self.state
+        method = self.method
+        bytes_needed = self.bytes_needed
+        channel = self.channel
+        command_data = self.command_data
+        messages = 0
+        dropped_bytes = 0
+
+        # python 2 iterates bytes and memoryview objects as characters
+        if sys.version_info[0] < 3:
+            data = bytearray(data)
+
+        try:
+            for byte in data:
+                if state == 3:  # WAIT_FOR_MESSAGE_DATA
+                    if byte < 0x80:
+                        command_data.append(byte)
+                        bytes_needed -= 1
+                        if not bytes_needed:
+                            state = 0
+                            message_data = command_data
+                            command_data = []
+                            dispatch(method, message_data)
+                            messages += 1
+                        continue
+                    # message is truncated - discard it and resynchronize on this command byte
+                    self.truncated_frames += 1
+                    dropped_bytes += 1 + len(command_data) - channel
+                    command_data = []
+                    state = 0
+
+                elif state == 2:  # WAIT_FOR_SYSEX_DATA
+                    if byte < 0x80:
+                        if method is not None:
+                            command_data.append(byte)
+                        else:
+                            # unknown sysex command - skip its data
+                            dropped_bytes += 1
+                        continue
+                    if byte == 0xF7:
+                        state = 0
+                        if method is not None:
+                            message_data = command_data
+                            command_data = []
+                            dispatch(method, message_data)
+                            messages += 1
+                        else:
+                            dropped_bytes += 1
+                        continue
+                    # sysex message is truncated - discard it and resynchronize on this command byte
+                    if method is not None:
+                        self.truncated_frames += 1
+                        dropped_bytes += 2 + len(command_data)
+                    command_data = []
+                    state = 0
+
+                elif state == 1:  # WAIT_FOR_SYSEX_COMMAND
+                    if byte < 0x80:
+                        dispatch_entry = table[byte]
+                        if dispatch_entry is not None:
+                            method = dispatch_entry[0]
+                        else:
+                            method = None
+                            self.unknown_sysex += 1
+                            dropped_bytes += 2
+                        state = 2
+                        continue
+                    # sysex message is truncated - resynchronize on this command byte
+                    self.truncated_frames += 1
+                    dropped_bytes += 1
+                    state = 0
+
+                # WAIT_FOR_COMMAND
+                if byte == 0xF0:
+                    # next byte is the actual sysex command
+                    state = 1
+                    continue
+                dispatch_entry = table[byte] if byte >= 0x80 else None
+                if dispatch_entry is None:
+                    # a data byte or an unknown command - skip it
+                    dropped_bytes += 1
+                    continue
+                method, bytes_needed, channel = dispatch_entry
+                if channel:
+                    command_data = [byte & 0xf]
+                if bytes_needed:
+                    state = 3
+                else:
+                    message_data = command_data
+                    command_data = []
+                    dispatch(method, message_data)
+                    messages += 1
+        finally:
+            self.state = state
+            self.method = method
+            self.bytes_needed = bytes_needed
+            self.channel = channel
+            self.command_data = command_data
+            self.dropped_bytes += dropped_bytes
+            if messages and self.first_message_time is None:
+                self.first_message_time = time.time()
+        return messages
@@ -0,0 +1,307 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+
+import multiprocessing
+import os
+import sys
+import threading
+import traceback
+
+from .pymata import PyMata, PyMataConnectionError
+from .pymata_shared_state import PyMataStateReader, resource_tracker, shared_memory
+
+
+class PyMataProcess(object):
+    """
+    This class runs a board in a worker process of its own and acts as a proxy for it in the calling process.
+
+    The worker process runs the transport, the command handler and the callbacks for the board, so boards
+    with heavy callback work use separate cores instead of sharing one interpreter lock. The worker
+    exports the pin modes and data values of the response tables with PyMata.export_pin_state():
+    analog_read(), digital_read() and the get_*_response_table() methods read them with a
+    PyMataStateReader, without involving the worker. All other PyMata methods are sent to the worker
+    over a pipe. The write methods listed in WRITE_METHODS do not wait for the worker, other methods
+    return the worker's result.
+
+        board = PyMataProcess('/dev/ttyACM0', bluetooth=False, verbose=False)
+        board.set_pin_mode(2, board.INPUT, board.ANALOG, on_analog_change)
+        value = board.analog_read(2)
+        board.disconnect()
+
+    Callbacks are run in the worker process. They are passed to it by pickling, so they must be
+    functions defined at module level, and changes they make to objects are not seen by the caller.
+
+    Requires Python 3.8 or later.
+    """
+    # methods sent to the worker without waiting for it. Errors are reported by the worker.
+    WRITE_METHODS = ('analog_write', 'digital_write', 'extended_analog', 'play_tone', 'stepper_step')
+
+    def __init__(self, port_id='/dev/ttyACM0', **pymata_options):
+        """
+        Start the worker process and wait until the board has been discovered.
+        A PyMataConnectionError is raised if the board does not respond.
+
+        :param port_id: the board's serial port
+
+        :param pymata_options: keyword arguments passed to the PyMata constructor in the worker process.
+                               The transport and reactor options are not supported.
+        """
+        if shared_memory is None:
+            raise ImportError('PyMataProcess requires multiprocessing.shared_memory')
+
+        self.port_id = port_id
+        self.reader = None
+
+        # one request is on the pipe at a time
+        self.lock = threading.Lock()
+        if os.name == 'posix':
+            # start the resource tracker now, so that the worker shares it rather than starting its own
+            resource_tracker.ensure_running()
+        self.connection, worker_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_run_worker, args=(worker_connection, port_id, pymata_options))
+        self.process.daemon = True
+        self.process.start()
+        worker_connection.close()
+
+        try:
+            # the worker replies with the name of the pin state segment once the board is connected.
+            # The worker was started by multiprocessing, so it shares this process's resource tracker.
+            self.reader = PyMataStateReader(self._receive(), shared_tracker=True)
+        except BaseException:
+            self._release()
+            raise
+
+    def __getattr__(self, name):
+        # PyMata constants, and methods that are run by the worker process
+        value = getattr(PyMata, name)
+        if not callable(value) or name.startswith('_'):
+            return value
+
+        def method(*args, **kwargs):
+            return self._call(name, args, kwargs)
+
+        method.__name__ = name
+        method.__doc__ = value.__doc__
+        return method
+
+    def _call(self, name, args, kwargs):
+        """
+        Run a PyMata method in the worker process.
+
+        :return: The method's result. Methods in WRITE_METHODS return None at once.
+        """
+        reply = name not in self.WRITE_METHODS
+        with self.lock:
+            if self.connection is None:
+                raise PyMataConnectionError('PyMataProcess for %s has been disconnected' % self.port_id)
+            self.connection.send((name, args, kwargs, reply))
+            if reply:
+                return self._receive()
+
+    def _check_connected(self):
+        if self.connection is None:
+            raise PyMataConnectionError('PyMataProcess for %s has been disconnected' % self.port_id)
+
+    def _receive(self):
+        """
+        Receive a result from the worker process. Exceptions raised in the worker are raised again here.
+        """
+        try:
+            result, error = self.connection.recv()
+        except EOFError:
+            raise PyMataConnectionError('PyMataProcess worker for %s has ended' % self.port_id)
+        if error is not None:
+            raise error
+        return result
+
+    def _release(self):
+        """
+        Wait for the worker process to end and detach from the pin state segment.
+        The worker removes the segment when it disconnects the board.
+        """
+        self.connection.close()
+        self.connection = None
+        self.process.join()
+        if self.reader is not None:
+            self.reader.close()
+
+    def analog_read(self, pin):
+        """
+        Retrieve the last analog data value received for the specified pin, from shared memory.
+
+        :param pin: Selected pin
+
+        :return: The last value entered into the analog response table.
+        """
+        self._check_connected()
+        return self.reader.analog_read(pin)
+
+    def close(self):
+        """
+        Disconnect the board and exit the program.
+        """
+        self.disconnect()
+        sys.exit(0)
+
+    def digital_read(self, pin):
+        """
+        Retrieve the last digital data value received for the specified pin, from shared memory.
+
+        :param pin: Selected pin
+
+        :return: The last value entered into the digital response table.
+        """
+        self._check_connected()
+        return self.reader.digital_read(pin)
+
+    def disconnect(self):
+        """
+        Disconnect the board, end the worker process and free the shared memory.
+        """
+        with self.lock:
+            if self.connection is None:
+                return
+            try:
+                self.connection.send(('disconnect', (), {}, False))
+            except (IOError, OSError):
+                # the worker has already ended
+                pass
+            self._release()
+
+    def get_analog_response_table(self):
+        """
+        Retrieve the pin mode and data value of every analog pin, from shared memory.
+        :return: A list of [pin mode, data value] for each analog pin
+        """
+        self._check_connected()
+        return [record[:2] for record in self.reader.snapshot()['analog']]
+
+    def get_digital_response_table(self):
+        """
+        Retrieve the pin mode and data value of every digital pin, from shared memory.
+        :return: A list of [pin mode, data value] for each digital pin
+        """
+        self._check_connected()
+        return [record[:2] for record in self.reader.snapshot()['digital']]
+
+    def get_stats(self):
+        """
+        Retrieve the worker process statistics
+        :return: A dictionary with the worker's process id, the number of method calls it has run, and the
+                 number of user callbacks it has invoked
+        """
+        return self._call('get_stats', (), {})
+
+
+class _PyMataWorker(object):
+    """
+    The part of PyMataProcess that runs in the worker process.
+    """
+    # position of the callback argument of the methods whose callbacks report pin data changes
+    CALLBACK_ARGUMENTS = {'set_pin_mode': 3, 'encoder_config': 2, 'sonar_config': 2}
+
+    def __init__(self, board):
+        self.board = board
+        self.calls = 0
+        self.callbacks = 0
+
+    def wrap_callback(self, cb):
+        """
+        :return: A callback that counts the calls to the user's callback
+        """
+        def callback(data):
+            self.callbacks += 1
+            cb(data)
+        return callback
+
+    def call(self, name, args, kwargs):
+        """
+        Run a PyMata method for PyMataProcess
+        """
+        self.calls += 1
+        if name == 'get_stats':
+            return {'pid': multiprocessing.current_process().pid,
+                    'calls': self.calls,
+                    'callbacks': self.callbacks}
+        if name == 'get_sonar_data':
+            # the callbacks are not passed back
+            with self.board.data_lock:
+                return dict((pin, [None, entry[1]]) for pin, entry in self.board.get_sonar_data().items())
+
+        position = self.CALLBACK_ARGUMENTS.get(name)
+        if position is not None:
+            if len(args) > position and args[position] is not None:
+                args = args[:position] + (self.wrap_callback(args[position]),) + args[position + 1:]
+            elif kwargs.get('cb') is not None:
+                kwargs['cb'] = self.wrap_callback(kwargs['cb'])
+
+        try:
+            return getattr(self.board, name)(*args, **kwargs)
+        finally:
+            # any method may change pin modes or reset the response tables - publish the modes and values
+            self.board._command_handler.export_tables()
+
+    def run(self, connection):
+        """
+        Run the methods requested by PyMataProcess until it disconnects
+        """
+        while True:
+            try:
+                name, args, kwargs, reply = connection.recv()
+            except EOFError:
+                # the calling process has ended
+                break
+            if name in ('close', 'disconnect'):
+                break
+            try:
+                result = self.call(name, args, kwargs)
+            except Exception as e:
+                if not reply:
+                    traceback.print_exc()
+                    continue
+                result, error = None, e
+            else:
+                error = None
+            if reply:
+                try:
+                    connection.send((result, error))
+                except Exception as e:
+                    # the result could not be pickled
+                    connection.send((None, e))
+
+
+def _run_worker(connection, port_id, pymata_options):
+    """
+    The worker process: connect to the board and export its pin state, then run the methods requested by
+    PyMataProcess
+    """
+    pymata_options['auto_connect'] = False
+    board = PyMata(port_id, **pymata_options)
+    try:
+        board.connect().result()
+        exporter = board.export_pin_state()
+    except Exception as e:
+        connection.send((None, e))
+    else:
+        worker = _PyMataWorker(board)
+        connection.send((exporter.name, None))
+        worker.run(connection)
+        # removes the pin state segment
+        board.disconnect()
+    finally:
+        connection.close()
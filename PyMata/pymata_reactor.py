@@ -0,0 +1,223 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+from collections import deque
+import os
+import selectors
+import threading
+import traceback
+
+
+class PyMataReactor(threading.Thread):
+    """
+    This class reads many boards from a single I/O thread.
+
+    Every board's transport file descriptor is registered with one selector. When a descriptor becomes
+    readable, the data waiting on it is read and fed to that board's parser, which dispatches the
+    messages - so callbacks run in the reactor thread. A board using the reactor starts no threads of its own,
+    and the reactor only wakes up when data arrives: the thread count and idle wake ups stay the same
+    however many boards are added.
+
+        reactor = PyMataReactor()
+        boards = [PyMata(port, reactor=reactor) for port in ports]
+
+    The reactor thread is started when the first board is registered.
+    Requires Python 3.4 or later and transports that provide a file descriptor (serial ports on Linux and
+    macOS, TCP sockets).
+    """
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.selector = selectors.DefaultSelector()
+
+        # a pipe used to wake up the reactor thread when boards are registered or unregistered, or stop() is called
+        self.wakeup_pipe = os.pipe()
+        self.selector.register(self.wakeup_pipe[0], selectors.EVENT_READ)
+
+        # registration requests waiting to be applied by the reactor thread: (board, register, done event)
+        self.requests = deque()
+        self.lock = threading.Lock()
+
+        self.stop_event = threading.Event()
+
+        # set when the reactor thread is started, and when it has ended
+        self.started = False
+        self.finished = False
+
+        # the registered boards, mapped to the file descriptors they were registered with.
+        # A closed transport may no longer report its descriptor.
+        self.boards = {}
+
+        # statistics
+        self.wakeups = 0
+        self.chunks_read = 0
+        self.bytes_read = 0
+
+    def stop(self):
+        self.stop_event.set()
+        self._wake()
+
+    def is_stopped(self):
+        return self.stop_event.is_set()
+
+    def _wake(self):
+        with self.lock:
+            if self.wakeup_pipe is not None:
+                os.write(self.wakeup_pipe[1], b'\x00')
+
+    def register(self, board):
+        """
+        Start reading a board. Returns once the reactor thread has registered the board.
+
+        :param board: A PyMata instance whose transport has been opened
+        """
+        if board.transport.fileno() is None:
+            raise ValueError('%s does not provide a file descriptor' % board.transport.__class__.__name__)
+        self._request(board, True)
+
+    def unregister(self, board):
+        """
+        Stop reading a board. Returns once the reactor thread has unregistered the board,
+        so the board's transport may then be closed.
+
+        :param board: A registered PyMata instance
+        """
+        self._request(board, False)
+
+    def _request(self, board, register):
+        """
+        Pass a registration request to the reactor thread and wait until it has been applied.
+        Requests made by the reactor thread itself (for example from a callback) are applied at once.
+        """
+        if threading.current_thread() is self:
+            self._apply(board, register)
+            return
+
+        done = threading.Event()
+        with self.lock:
+            if self.finished:
+                # the reactor no longer reads any board, so there is nothing to unregister
+                if not register:
+                    return
+                raise RuntimeError('PyMataReactor has been stopped')
+            if not self.started:
+                self.started = True
+                self.start()
+            self.requests.append((board, register, done))
+            os.write(self.wakeup_pipe[1], b'\x00')
+        done.wait()
+
+    def _apply(self, board, register):
+        """
+        Register or unregister a board's file descriptor. Called by the reactor thread.
+        """
+        if register:
+            if board not in self.boards:
+                fd = board.transport.fileno()
+                self.selector.register(fd, selectors.EVENT_READ, board)
+                self.boards[board] = fd
+        elif board in self.boards:
+            self.selector.unregister(self.boards.pop(board))
+
+    def get_stats(self):
+        """
+        Retrieve the reactor statistics
+        :return: A dictionary with the number of registered boards, the number of times the reactor thread
+                 woke up, and the number of chunks and bytes read
+        """
+        return {'boards': len(self.boards),
+                'wakeups': self.wakeups,
+                'chunks_read': self.chunks_read,
+                'bytes_read': self.bytes_read}
+
+    def _batch_wait_time(self):
+        """
+        :return: Time in seconds until the first board's batch of events is due, or None if no events are waiting
+        """
+        wait_time = None
+        for board in self.boards:
+            board_wait_time = board._command_handler.get_batch_wait_time()
+            if board_wait_time is not None and (wait_time is None or board_wait_time < wait_time):
+                wait_time = board_wait_time
+        return wait_time
+
+    def run(self):
+        """
+        The reactor thread. Waits for any registered board to become readable and processes its data.
+        """
+        while not self.is_stopped():
+            events = self.selector.select(self._batch_wait_time())
+            self.wakeups += 1
+            for key, mask in events:
+                board = key.data
+                if board is None:
+                    # registration requests or stop()
+                    os.read(self.wakeup_pipe[0], 512)
+                    while self.requests:
+                        board, register, done = self.requests.popleft()
+                        try:
+                            self._apply(board, register)
+                        except Exception:
+                            if board.verbose:
+                                traceback.print_exc()
+                        done.set()
+                    continue
+
+                if board not in self.boards:
+                    # unregistered while processing this batch of events
+                    continue
+                try:
+                    data = board.transport.read_ready()
+                except (IOError, OSError) as e:
+                    # the device is gone - stop reading it
+                    if board.verbose:
+                        print('PyMataReactor: %s' % e)
+                    self._apply(board, False)
+                    board.transport.stop()
+                    continue
+                if data:
+                    self.chunks_read += 1
+                    self.bytes_read += len(data)
+                    try:
+                        board._command_handler.feed(data)
+                    except Exception:
+                        # keep serving the other boards - stop reading this one. The error is counted
+                        # in the board's handler_errors error counter.
+                        board._command_handler.parser.handler_errors += 1
+                        if board.verbose:
+                            print('PyMataReactor: error processing data from %s' %
+                                  (board.transport.get_device_identity() or board.transport.__class__.__name__))
+                            traceback.print_exc()
+                        self._apply(board, False)
+                        board.transport.stop()
+
+            # deliver the batches of events that became due while the boards were quiet
+            # (a copy of the boards, since a callback may unregister a board)
+            for board in list(self.boards):
+                board._command_handler.deliver_due_batch()
+
+        self.selector.close()
+        with self.lock:
+            self.finished = True
+            # release any callers still waiting for a registration request
+            while self.requests:
+                self.requests.popleft()[2].set()
+            for fd in self.wakeup_pipe:
+                os.close(fd)
+            self.wakeup_pipe = None
@@ -0,0 +1,242 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import threading
+
+
+class PyMataRingBuffer(object):
+    """
+    This class is a fixed capacity receive buffer shared by a transport (the writer) and the
+    command handler (the reader).
+
+    Data is stored in a single bytearray. The reader retrieves the data waiting in the buffer with
+    peek(), which returns a memoryview of the buffer storage without copying it, and releases that
+    data with consume() once it has been processed.
+
+    When the buffer is full, the overflow policy determines what happens to newly received data:
+        BLOCK - the writer waits until the reader has made room
+        DROP_OLDEST - the oldest unread data is discarded to make room. Data handed to the reader by
+                      peek() is never discarded; while the reader holds it, the oldest data received
+                      after it is discarded. New data is only discarded when all of the buffered data
+                      is held by the reader.
+        RAISE - a BufferError is raised in the writer
+    """
+    # overflow policies
+    BLOCK = 'block'
+    DROP_OLDEST = 'drop_oldest'
+    RAISE = 'raise'
+
+    DEFAULT_CAPACITY = 65536
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, overflow_policy=BLOCK):
+        """
+        constructor for RingBuffer class
+
+        :param capacity: buffer size in bytes
+
+        :param overflow_policy: BLOCK, DROP_OLDEST or RAISE
+        """
+        if overflow_policy not in (self.BLOCK, self.DROP_OLDEST, self.RAISE):
+            raise ValueError('Unknown overflow policy: %s' % overflow_policy)
+
+        self.capacity = int(capacity)
+        self.overflow_policy = overflow_policy
+
+        self.storage = bytearray(self.capacity)
+        self.view = memoryview(self.storage)
+
+        # index of the oldest unread byte and number of unread bytes
+        self.head = 0
+        self.count = 0
+
+        # number of bytes, starting at head, that have been handed to the reader by peek()
+        # and not yet consumed
+        self.reserved = 0
+
+        # the largest number of unread bytes held by the buffer
+        self.high_water_mark = 0
+
+        # number of received bytes discarded because the buffer was full
+        self.dropped_bytes = 0
+
+        # set by wake() to release a waiting reader
+        self.woken = False
+
+        # set by close() - writers no longer block and waiting readers are released
+        self.closed = False
+
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+
+    def __len__(self):
+        return self.count
+
+    def write(self, data):
+        """
+        Copy received data into the buffer and wake up a waiting reader.
+
+        :param data: bytes or bytearray
+        """
+        data = memoryview(data)
+        with self.lock:
+            while len(data):
+                free = self.capacity - self.count
+                if free == 0:
+                    if self.closed:
+                        self.dropped_bytes += len(data)
+                        return
+                    if self.overflow_policy == self.BLOCK:
+                        self.not_full.wait()
+                        continue
+                    elif self.overflow_policy == self.RAISE:
+                        raise BufferError('PyMata receive buffer overflow: %d bytes not stored' % len(data))
+                    else:
+                        # data held by the reader cannot be discarded
+                        unreserved = self.count - self.reserved
+                        if not unreserved:
+                            self.dropped_bytes += len(data)
+                            return
+                        discard = min(len(data), unreserved)
+                        self._discard_unreserved(discard)
+                        self.dropped_bytes += discard
+                        continue
+
+                # copy as much as fits before the end of the storage
+                tail = (self.head + self.count) % self.capacity
+                length = min(len(data), free, self.capacity - tail)
+                self.view[tail:tail + length] = data[:length]
+                data = data[length:]
+                self.count += length
+                if self.count > self.high_water_mark:
+                    self.high_water_mark = self.count
+                self.not_empty.notify()
+
+    def _discard_unreserved(self, length):
+        """
+        Discard the oldest unread bytes that follow the data held by the reader. The newer bytes are moved
+        down over them, so the data returned by peek() is not moved. Called with the lock held.
+
+        :param length: number of bytes to discard
+        """
+        start = (self.head + self.reserved) % self.capacity
+        keep = self.count - self.reserved - length
+        if keep:
+            source = (start + length) % self.capacity
+            first = min(keep, self.capacity - source)
+            kept = self.view[source:source + first].tobytes() + self.view[:keep - first].tobytes()
+            first = min(keep, self.capacity - start)
+            self.view[start:start + first] = kept[:first]
+            self.view[:keep - first] = kept[first:]
+        self.count -= length
+
+    def peek(self):
+        """
+        Retrieve the unread data stored contiguously at the head of the buffer without copying it.
+        If the unread data wraps around the end of the storage, the remainder is returned by the
+        next call after consume().
+
+        :return: A memoryview of the unread data. It is empty if there is no data.
+        """
+        with self.lock:
+            length = min(self.count, self.capacity - self.head)
+            self.reserved = length
+            return self.view[self.head:self.head + length]
+
+    def consume(self, length):
+        """
+        Release data returned by peek() after it has been processed
+
+        :param length: number of bytes processed
+        """
+        with self.lock:
+            length = min(length, self.count)
+            self.head = (self.head + length) % self.capacity
+            self.count -= length
+            self.reserved = 0
+            self.not_full.notify_all()
+
+    def read(self, max_bytes=None):
+        """
+        Remove and return a copy of the unread data
+
+        :param max_bytes: upper limit on the number of bytes returned
+
+        :return: bytes
+        """
+        with self.lock:
+            length = self.count if max_bytes is None else min(self.count, max_bytes)
+            first = min(length, self.capacity - self.head)
+            data = self.view[self.head:self.head + first].tobytes() + self.view[:length - first].tobytes()
+            self.head = (self.head + length) % self.capacity
+            self.count -= length
+            self.not_full.notify_all()
+        return data
+
+    def wait(self, timeout=None):
+        """
+        Wait for data to arrive. Returns early if wake() or close() is called.
+
+        :param timeout: maximum wait time in seconds. None waits without a time limit.
+
+        :return: True if there is unread data
+        """
+        with self.lock:
+            if not self.count and not self.woken and not self.closed:
+                self.not_empty.wait(timeout)
+            self.woken = False
+            return self.count > 0
+
+    def wake(self):
+        """
+        Release a reader waiting in wait()
+        """
+        with self.lock:
+            self.woken = True
+            self.not_empty.notify_all()
+
+    def close(self):
+        """
+        Release all waiting readers and writers. Data written after the buffer is closed
+        is discarded if there is no room for it.
+        """
+        with self.lock:
+            self.closed = True
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+
+    def clear(self):
+        """
+        Discard all unread data
+        """
+        with self.lock:
+            self.head = 0
+            self.count = 0
+            self.reserved = 0
+            self.not_full.notify_all()
+
+    def get_stats(self):
+        """
+        Retrieve the buffer usage statistics
+        :return: A dictionary with the capacity, the number of unread bytes, the high water mark
+                 and the number of dropped bytes
+        """
+        with self.lock:
+            return {'capacity': self.capacity,
+                    'unread_bytes': self.count,
+                    'high_water_mark': self.high_water_mark,
+                    'dropped_bytes': self.dropped_bytes}
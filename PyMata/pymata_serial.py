@@ -15,13 +15,27 @@
  Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
 """
 
+import os
 import threading
 import time
 import sys
 import serial
 
+try:
+    from serial.tools import list_ports
+except ImportError:
+    list_ports = None
 
-class PyMataSerial(threading.Thread):
+from .pymata_transport import PyMataTransport
+
+try:
+    import selectors
+except ImportError:
+    # python 2.7 - event driven reads are not available
+    selectors = None
+
+
+class PyMataSerial(PyMataTransport):
     """
      This class manages the serial port for Arduino serial communications
     """
@@ -32,37 +46,112 @@ class PyMataSerial(threading.Thread):
     port_id = ""
     baud_rate = 57600
     timeout = 1
-    command_deque = None
+    receive_buffer = None
 
-    def __init__(self, port_id, command_deque, baud_rate):
+    # when bulk reads are enabled, this is the default upper limit for the number of bytes
+    # drained from the serial port in a single read
+    MAX_CHUNK_SIZE = 1024
+
+    def __init__(self, port_id, receive_buffer, baud_rate, bulk_read=True, max_chunk_size=MAX_CHUNK_SIZE,
+                 event_driven=False):
         """
         Constructor:
 
-        :param command_deque: A reference to the deque shared with the _command_handler
+        :param receive_buffer: A reference to the PyMataRingBuffer shared with the _command_handler
 
         :param baud_rate: must match that of Arduino Sketch
+
+        :param bulk_read: If True, all bytes waiting on the port (up to max_chunk_size) are read
+                          and placed in the receive_buffer in a single operation.
+                          If False, the port is read one byte at a time.
+
+        :param max_chunk_size: Maximum number of bytes to read from the port in a single bulk read
+
+        :param event_driven: If True, the receive thread blocks on the port's file descriptor and
+                             wakes up as soon as data arrives instead of polling the port.
+                             Only available on platforms where pyserial exposes fileno() (Linux, macOS).
+                             If unavailable, the polling receive loop is used.
         """
+        PyMataTransport.__init__(self, receive_buffer)
+
         self.port_id = port_id
-        self.command_deque = command_deque
         self.baud_rate = baud_rate
+        self.bulk_read = bulk_read
+        self.max_chunk_size = max(1, int(max_chunk_size))
 
-        threading.Thread.__init__(self)
-        self.daemon = True
         self.arduino = serial.Serial(self.port_id, self.baud_rate,
                                      timeout=int(self.timeout), writeTimeout=0)
 
-        self.stop_event = threading.Event()
-
         # without this, running python 3.4 is extremely sluggish
         if sys.platform == 'linux':
             # noinspection PyUnresolvedReferences
             self.arduino.nonblocking()
 
+        # the selector used for event driven reads and a pipe used to wake it up when stop() is called
+        self.selector = None
+        self.wakeup_pipe = None
+        self.wakeup_lock = threading.Lock()
+        self.event_driven = event_driven and self._fileno_available()
+        if self.event_driven:
+            self.wakeup_pipe = os.pipe()
+
+    def _fileno_available(self):
+        """
+        Check if the serial port file descriptor can be used with selectors
+        :return: True if event driven reads are supported
+        """
+        if selectors is None:
+            return False
+        try:
+            self.arduino.fileno()
+        except (AttributeError, IOError, OSError, serial.SerialException):
+            return False
+        return True
+
     def stop(self):
-        self.stop_event.set()
+        PyMataTransport.stop(self)
+        with self.wakeup_lock:
+            if self.wakeup_pipe is not None:
+                os.write(self.wakeup_pipe[1], b'\x00')
+
+    def fileno(self):
+        """
+        :return: The serial port file descriptor, or None if the platform does not provide one
+        """
+        if not self._fileno_available():
+            return None
+        return self.arduino.fileno()
+
+    def read_ready(self):
+        """
+        Read the data waiting on the serial port (up to max_chunk_size bytes) without blocking.
+
+        :return: The data read. Empty if no data is waiting.
+        """
+        waiting = self.arduino.inWaiting()
+        if not waiting:
+            # the port reported that it is readable but has no data - the device is gone
+            raise IOError('No data on readable serial port %s' % self.port_id)
+        return self.arduino.read(min(waiting, self.max_chunk_size))
 
-    def is_stopped(self):
-        return self.stop_event.is_set()
+    def get_device_identity(self):
+        """
+        Identify the device by port name and, for USB devices, by vendor id, product id and serial number,
+        so that a different board plugged into the same port is not mistaken for the previous one.
+
+        :return: A string identifying the device
+        """
+        identity = 'serial:%s' % self.port_id
+        if list_ports is not None:
+            try:
+                for port_info in list_ports.comports():
+                    if port_info.device == self.port_id and port_info.vid is not None:
+                        identity += ':%04x:%04x:%s' % (port_info.vid, port_info.pid, port_info.serial_number)
+                        break
+            except (AttributeError, OSError):
+                # older pyserial versions do not provide the usb information
+                pass
+        return identity
 
     def open(self, verbose):
         """
@@ -75,12 +164,12 @@ class PyMataSerial(threading.Thread):
 
         try:
 
-            # in case the port is already open, let's close it and then
-            # reopen it
-            self.arduino.close()
-            time.sleep(1)
-            self.arduino.open()
-            time.sleep(1)
+            # the port is opened when this class is instantiated. Reopening it would reset the
+            # Arduino a second time, so just discard any stale data.
+            if self.arduino.isOpen():
+                self.arduino.flushInput()
+            else:
+                self.arduino.open()
             return self.arduino
 
         except Exception:
@@ -97,45 +186,60 @@ class PyMataSerial(threading.Thread):
         except OSError:
             pass
 
+        # release the resources used for event driven reads
+        with self.wakeup_lock:
+            if self.selector is not None:
+                self.selector.close()
+                self.selector = None
+            if self.wakeup_pipe is not None:
+                for fd in self.wakeup_pipe:
+                    os.close(fd)
+                self.wakeup_pipe = None
+
     def write(self, data):
         """
             write the data to the serial port
+            A complete frame (bytes or bytearray) is written with a single call.
             return: None
         """
-        if sys.version_info[0] < 3:
-            self.arduino.write(data)
-        else:
-            self.arduino.write(bytes([ord(data)]))
+        if not isinstance(data, (bytes, bytearray)):
+            # a single character
+            data = bytearray([ord(data)])
+        self.arduino.write(data)
 
-    # noinspection PyExceptClausesOrder
-    def run(self):
-        """
-        This method continually runs. If an incoming character is available on the serial port
-        it is read and placed on the _command_deque
-        @return: Never Returns
+    def read_chunk(self, timeout=None):
         """
-        while not self.is_stopped():
-            # we can get an OSError: [Errno9] Bad file descriptor when shutting down
-            # just ignore it
-            try:
-                if self.arduino.inWaiting():
-                    c = self.arduino.read()
-                    self.command_deque.append(ord(c))
-                else:
-                    time.sleep(.1)
-            except OSError:
-                pass
-            except IOError:
-                self.stop()
-        self.close()
-
-
-
-
-
-
-
-
+        Wait for data to arrive on the serial port and return it.
+        In bulk read mode, everything waiting on the port (up to max_chunk_size bytes) is
+        returned by a single read.
 
+        In event driven mode this method blocks until data arrives or stop() is called. Otherwise,
+        if no data is waiting, it sleeps for the polling interval and returns no data.
+        In both modes the wait is limited to timeout seconds, if a timeout is given.
 
+        This method is called by the receive thread, or directly by the _command_handler when
+        PyMata runs in single thread mode.
 
+        :return: The data read. Empty if no data arrived.
+        """
+        if self.event_driven:
+            if self.selector is None:
+                # created on first use, since open() may replace the port file descriptor
+                self.selector = selectors.DefaultSelector()
+                self.selector.register(self.arduino.fileno(), selectors.EVENT_READ)
+                self.selector.register(self.wakeup_pipe[0], selectors.EVENT_READ)
+            if not self.selector.select(timeout) or self.is_stopped():
+                return b''
+
+        waiting = self.arduino.inWaiting()
+        if waiting:
+            if self.bulk_read:
+                return self.arduino.read(min(waiting, self.max_chunk_size))
+            return self.arduino.read()
+
+        if self.event_driven:
+            # the port reported that it is readable but has no data - the device is gone
+            self.stop()
+        else:
+            time.sleep(.1 if timeout is None else min(.1, timeout))
+        return b''
@@ -0,0 +1,289 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+
+import struct
+import time
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    # python older than 3.8 - shared state export is not available
+    resource_tracker = shared_memory = None
+
+
+class PyMataStateExporter(object):
+    """
+    This class mirrors a board's analog and digital response tables into a shared memory segment, so that
+    other processes can read the live pin state of a board whose port is owned by this process.
+
+    The segment has a fixed layout:
+
+        header   8 unsigned 32 bit integers: MAGIC, FORMAT_VERSION, sequence number, max_pins,
+                 number of analog pins, number of digital pins, 2 unused
+        analog   max_pins records of: pin mode (int32), data value (int32), update time (float64)
+        digital  max_pins records, laid out like the analog records
+
+    The update time is the time.time() at which the pin's value was last received from the board.
+    All values are little endian.
+
+    The sequence number is a seqlock: it is odd while the segment is being written and is incremented
+    again when the write is complete. Readers copy the segment and keep the copy only if the sequence
+    number was even and unchanged around the copy (see PyMataStateReader). There is a single writer -
+    the exporter is only called while the board's data_lock is held.
+
+    The exporter is created by PyMata.export_pin_state().
+    Requires Python 3.8 or later.
+    """
+    MAGIC = 0x544d5950  # 'PYMT'
+    FORMAT_VERSION = 1
+
+    # header word indexes
+    HEADER_MAGIC = 0
+    HEADER_FORMAT_VERSION = 1
+    HEADER_SEQUENCE = 2
+    HEADER_MAX_PINS = 3
+    HEADER_ANALOG_PINS = 4
+    HEADER_DIGITAL_PINS = 5
+    HEADER_SIZE = 32
+
+    RECORD_FORMAT = '<iid'
+    RECORD_SIZE = struct.calcsize(RECORD_FORMAT)
+
+    # Firmata pin numbers are 7 bits
+    MAX_PINS = 128
+
+    # table selectors for update()
+    ANALOG = 0
+    DIGITAL = 1
+
+    def __init__(self, name=None, max_pins=MAX_PINS):
+        """
+        Create the shared memory segment.
+
+        :param name: Name of the segment, used by readers to find it. A unique name is generated if None.
+
+        :param max_pins: Number of records in each table
+        """
+        if shared_memory is None:
+            raise ImportError('PyMataStateExporter requires multiprocessing.shared_memory')
+
+        self.max_pins = max_pins
+        self.memory = shared_memory.SharedMemory(name=name, create=True,
+                                                 size=self.HEADER_SIZE + 2 * max_pins * self.RECORD_SIZE)
+        self.name = self.memory.name
+        self.header = self.memory.buf[:self.HEADER_SIZE].cast('I')
+        self.table_offsets = (self.HEADER_SIZE, self.HEADER_SIZE + max_pins * self.RECORD_SIZE)
+
+        self.header[self.HEADER_MAGIC] = self.MAGIC
+        self.header[self.HEADER_FORMAT_VERSION] = self.FORMAT_VERSION
+        self.header[self.HEADER_MAX_PINS] = max_pins
+
+        # statistics
+        self.updates = 0
+
+    def update(self, table, pin, mode, value):
+        """
+        Publish a pin value received from the board. Called by the command handler with the data lock held.
+
+        :param table: ANALOG or DIGITAL
+
+        :param pin: Pin number
+
+        :param mode: The pin's mode in the response table
+
+        :param value: The pin's data value
+        """
+        if pin >= self.max_pins:
+            return
+        header = self.header
+        header[self.HEADER_SEQUENCE] = (header[self.HEADER_SEQUENCE] + 1) & 0xffffffff
+        struct.pack_into(self.RECORD_FORMAT, self.memory.buf, self.table_offsets[table] + pin * self.RECORD_SIZE,
+                         mode, value, time.time())
+        header[self.HEADER_SEQUENCE] = (header[self.HEADER_SEQUENCE] + 1) & 0xffffffff
+        self.updates += 1
+
+    def sync(self, analog_response_table, digital_response_table):
+        """
+        Publish the modes and values of all pins and the number of pins in each table.
+        Update times are not changed. Called with the data lock held, after the tables have been
+        rebuilt or pin modes have been set.
+
+        :param analog_response_table: The command handler's analog PyMataResponseTable
+
+        :param digital_response_table: The command handler's digital PyMataResponseTable
+        """
+        header = self.header
+        header[self.HEADER_SEQUENCE] = (header[self.HEADER_SEQUENCE] + 1) & 0xffffffff
+        for count_index, offset, response_table in ((self.HEADER_ANALOG_PINS, self.table_offsets[0],
+                                                     analog_response_table),
+                                                    (self.HEADER_DIGITAL_PINS, self.table_offsets[1],
+                                                     digital_response_table)):
+            count = min(len(response_table), self.max_pins)
+            header[count_index] = count
+            for pin in range(count):
+                # mode and value are the first two fields of the record
+                struct.pack_into('<ii', self.memory.buf, offset + pin * self.RECORD_SIZE,
+                                 response_table.modes[pin], response_table.values[pin])
+        header[self.HEADER_SEQUENCE] = (header[self.HEADER_SEQUENCE] + 1) & 0xffffffff
+
+    def close(self):
+        """
+        Close and remove the shared memory segment. Readers that are attached keep their mapping.
+        """
+        if self.header is None:
+            return
+        self.header.release()
+        self.header = None
+        self.memory.close()
+        self.memory.unlink()
+
+
+class PyMataStateReader(object):
+    """
+    This class reads the pin state exported by a PyMataStateExporter, from any process.
+
+        reader = PyMataStateReader('pymata_uno')
+        state = reader.snapshot()
+        # {'sequence': 5120, 'analog': [[mode, value, update_time], ...], 'digital': [...]}
+        value = reader.analog_read(2)
+
+    Reads are consistent: a snapshot never mixes data from before and after an update.
+    Reading does not take any lock, and does not slow down the process that owns the board.
+    """
+    # seqlock retries made at once, before waiting for the writer between retries
+    SPIN_ATTEMPTS = 100
+    # time in seconds to wait between retries, and before giving up
+    RETRY_INTERVAL = .00005
+    READ_TIMEOUT = 1
+
+    def __init__(self, name, shared_tracker=False):
+        """
+        Attach to an exported segment.
+
+        :param name: The exporter's name
+
+        :param shared_tracker: Set to True if this process was started with multiprocessing by the exporting
+                               process, and so shares its resource tracker. Not needed with Python 3.13 or later.
+        """
+        if shared_memory is None:
+            raise ImportError('PyMataStateReader requires multiprocessing.shared_memory')
+
+        # the segment belongs to the exporter - the resource tracker of this process must not remove it
+        try:
+            self.memory = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # python older than 3.13 - attaching always registers the segment with the resource tracker
+            self.memory = shared_memory.SharedMemory(name=name)
+            if not shared_tracker:
+                resource_tracker.unregister(self.memory._name, 'shared_memory')
+
+        self.header = self.memory.buf[:PyMataStateExporter.HEADER_SIZE].cast('I')
+        if (self.header[PyMataStateExporter.HEADER_MAGIC] != PyMataStateExporter.MAGIC or
+                self.header[PyMataStateExporter.HEADER_FORMAT_VERSION] != PyMataStateExporter.FORMAT_VERSION):
+            self.close()
+            raise ValueError('%s is not a PyMata pin state segment' % name)
+        self.max_pins = self.header[PyMataStateExporter.HEADER_MAX_PINS]
+        self.table_offsets = (PyMataStateExporter.HEADER_SIZE,
+                              PyMataStateExporter.HEADER_SIZE + self.max_pins * PyMataStateExporter.RECORD_SIZE)
+        self.size = self.table_offsets[1] + self.max_pins * PyMataStateExporter.RECORD_SIZE
+
+        # statistics
+        self.retries = 0
+
+    def _read(self, start, end):
+        """
+        Copy a part of the segment consistently
+
+        :return: (sequence number, header copy, bytes)
+        """
+        header = self.header
+        attempts = 0
+        deadline = None
+        while True:
+            sequence = header[PyMataStateExporter.HEADER_SEQUENCE]
+            if not sequence & 1:
+                header_copy = header.tolist()
+                data = self.memory.buf[start:end].tobytes()
+                if header[PyMataStateExporter.HEADER_SEQUENCE] == sequence:
+                    return sequence, header_copy, data
+            self.retries += 1
+            attempts += 1
+            if attempts > self.SPIN_ATTEMPTS:
+                # the writer may have been preempted in the middle of an update - let it run
+                if deadline is None:
+                    deadline = time.time() + self.READ_TIMEOUT
+                elif time.time() > deadline:
+                    raise RuntimeError('PyMataStateReader: the pin state is being updated continuously')
+                time.sleep(self.RETRY_INTERVAL)
+
+    def _read_record(self, table, pin):
+        count_index = (PyMataStateExporter.HEADER_ANALOG_PINS, PyMataStateExporter.HEADER_DIGITAL_PINS)[table]
+        if not 0 <= pin < self.header[count_index]:
+            raise IndexError('pin %d out of range' % pin)
+        start = self.table_offsets[table] + pin * PyMataStateExporter.RECORD_SIZE
+        return struct.unpack(PyMataStateExporter.RECORD_FORMAT,
+                             self._read(start, start + PyMataStateExporter.RECORD_SIZE)[2])
+
+    def analog_read(self, pin):
+        """
+        :param pin: Analog pin number
+
+        :return: The last value received for the pin
+        """
+        return self._read_record(PyMataStateExporter.ANALOG, pin)[1]
+
+    def digital_read(self, pin):
+        """
+        :param pin: Digital pin number
+
+        :return: The last value received for the pin
+        """
+        return self._read_record(PyMataStateExporter.DIGITAL, pin)[1]
+
+    def get_sequence(self):
+        """
+        :return: The current sequence number. It changes whenever the exported state changes.
+        """
+        return self.header[PyMataStateExporter.HEADER_SEQUENCE]
+
+    def snapshot(self):
+        """
+        Take a consistent copy of the state of all pins
+
+        :return: A dictionary with the 'sequence' number of the snapshot, and 'analog' and 'digital' lists
+                 of [pin mode, data value, update time] for each pin. The update time is 0 for pins
+                 whose value has not been received.
+        """
+        sequence, header, data = self._read(0, self.size)
+        snapshot = {'sequence': sequence}
+        for key, count_index, offset in (('analog', PyMataStateExporter.HEADER_ANALOG_PINS, self.table_offsets[0]),
+                                         ('digital', PyMataStateExporter.HEADER_DIGITAL_PINS, self.table_offsets[1])):
+            end = offset + header[count_index] * PyMataStateExporter.RECORD_SIZE
+            snapshot[key] = [list(record) for record in
+                             struct.iter_unpack(PyMataStateExporter.RECORD_FORMAT, data[offset:end])]
+        return snapshot
+
+    def close(self):
+        """
+        Detach from the segment
+        """
+        if self.header is None:
+            return
+        self.header.release()
+        self.header = None
+        self.memory.close()
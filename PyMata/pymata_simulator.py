@@ -0,0 +1,659 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import errno
+import fcntl
+import os
+import pty
+import select
+import sys
+import threading
+import time
+import tty
+
+
+class PyMataSimulator(threading.Thread):
+    """
+    This class simulates an Arduino running FirmataPlus (a superset of StandardFirmata) on a
+    pseudo-terminal, so that PyMata can be exercised without a board. Linux/macOS only.
+
+    Pass port_id to PyMata in place of a serial port name:
+
+        simulator = PyMataSimulator(report_rate=1000)
+        simulator.start()
+        board = PyMata(simulator.port_id, bluetooth=False)
+
+    The simulator answers the analog mapping, capability, pin state, firmware and version queries.
+    It also handles the I2C, encoder, sonar and stepper sysex commands.
+
+    Once reporting is enabled for a pin, the simulator streams synthetic reports for it: a ramp for analog pins,
+    alternating levels for digital input ports, a counting encoder position and a cycling sonar distance.
+    Continuous I2C reads are repeated at the same rate. The values change with every report, so that
+    PyMata invokes the pin callbacks for each of them.
+    """
+    # commands
+    REPORT_ANALOG = 0xC0  # enable analog input by pin #
+    REPORT_DIGITAL = 0xD0  # enable digital input by port pair
+    SET_PIN_MODE = 0xF4  # set a pin to INPUT/OUTPUT/PWM/etc
+    SET_DIGITAL_PIN_VALUE = 0xF5  # set the value of a single digital pin
+    START_SYSEX = 0xF0  # start a MIDI Sysex message
+    END_SYSEX = 0xF7  # end a MIDI Sysex message
+    SYSTEM_RESET = 0xFF  # reset from MIDI
+    DIGITAL_MESSAGE = 0x90  # send or receive data for a digital pin
+    ANALOG_MESSAGE = 0xE0  # send or receive data for a PWM configured pin
+    REPORT_VERSION = 0xF9  # report protocol version
+
+    # the number of data bytes that follow each non-sysex command
+    COMMAND_DATA_LENGTHS = {DIGITAL_MESSAGE: 2, ANALOG_MESSAGE: 2, REPORT_ANALOG: 1, REPORT_DIGITAL: 1,
+                            SET_PIN_MODE: 2, SET_DIGITAL_PIN_VALUE: 2, REPORT_VERSION: 0, SYSTEM_RESET: 0}
+
+    # sysex commands
+    TONE_PLAY = 0x5F  # play a tone at a specified frequency and duration
+    ENCODER_CONFIG = 0x60  # create and enable encoder object
+    ENCODER_DATA = 0x61  # current encoder position data
+    SONAR_CONFIG = 0x62  # configure pins to control a Ping type sonar distance device
+    SONAR_DATA = 0x63  # distance data returned
+    ANALOG_MAPPING_QUERY = 0x69  # ask for mapping of analog to pin numbers
+    ANALOG_MAPPING_RESPONSE = 0x6A  # reply with analog mapping data
+    CAPABILITY_QUERY = 0x6B  # ask for supported modes and resolution of all pins
+    CAPABILITY_RESPONSE = 0x6C  # reply with supported modes and resolution
+    PIN_STATE_QUERY = 0x6D  # ask for a pin's current mode and value
+    PIN_STATE_RESPONSE = 0x6E  # reply with pin's current mode and value
+    EXTENDED_ANALOG = 0x6F  # analog write (PWM, Servo, etc) to any pin
+    SERVO_CONFIG = 0x70  # set servo pin and max and min angles
+    STEPPER_DATA = 0x72  # Stepper motor command
+    I2C_REQUEST = 0x76  # send an I2C read/write request
+    I2C_REPLY = 0x77  # a reply to an I2C read request
+    I2C_CONFIG = 0x78  # config I2C settings such as delay times and power pins
+    REPORT_FIRMWARE = 0x79  # report name and version of the firmware
+    SAMPLING_INTERVAL = 0x7A  # modify the sampling interval
+
+    # pin modes
+    INPUT = 0x00
+    OUTPUT = 0x01
+    ANALOG = 0x02
+    PWM = 0x03
+    SERVO = 0x04
+    I2C = 0x06
+    STEPPER = 0x08
+    ENCODER = 0x09
+    PULLUP = 0x0b
+    SONAR = 0x0c
+    TONE = 0x0d
+
+    # i2c modes
+    I2C_WRITE = 0B00000000
+    I2C_READ = 0B00001000
+    I2C_READ_CONTINUOUSLY = 0B00010000
+    I2C_STOP_READING = 0B00011000
+    I2C_READ_WRITE_MODE_MASK = 0B00011000
+
+    # stepper commands
+    STEPPER_CONFIGURE = 0
+    STEPPER_STEP = 1
+    STEPPER_LIBRARY_VERSION = 2
+
+    # board profiles: pin counts, pwm capable pins and i2c pins
+    UNO = {'digital_pins': 14, 'analog_pins': 6, 'pwm_pins': [3, 5, 6, 9, 10, 11], 'i2c_pins': [18, 19]}
+    MEGA = {'digital_pins': 54, 'analog_pins': 16, 'pwm_pins': list(range(2, 14)) + [44, 45, 46],
+            'i2c_pins': [20, 21]}
+
+    # the Firmata default sampling interval in milliseconds
+    DEFAULT_SAMPLING_INTERVAL = 19
+
+    # upper limit for the number of report rounds sent in a single write
+    MAX_ROUNDS_PER_WRITE = 256
+
+    def __init__(self, board=UNO, report_rate=None, firmware_name='FirmataPlus.ino', firmware_version=(2, 5),
+                 protocol_version=(2, 5), stepper_library_version=2, boot_delay=0, verbose=False):
+        """
+        Constructor:
+
+        :param board: The board profile - PyMataSimulator.UNO, PyMataSimulator.MEGA or a dictionary with the same keys
+
+        :param report_rate: Number of reports per second sent for each pin with reporting enabled.
+                            If None, the rate follows the sampling interval set by PyMata (19 ms by default).
+
+        :param firmware_name: Sketch name returned by the report firmware query
+
+        :param firmware_version: (major, minor) returned by the report firmware query
+
+        :param protocol_version: (major, minor) returned by the report version query
+
+        :param stepper_library_version: value returned by the stepper library version query
+
+        :param boot_delay: Time in seconds, after the simulator is started, during which data from PyMata is
+                           discarded - like an Arduino in its bootloader after a reset. When the delay ends,
+                           the version and firmware reports are sent, as StandardFirmata does on start up.
+
+        :param verbose: If True, the commands received are printed
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.board = board
+        self.total_pins = board['digital_pins'] + board['analog_pins']
+        self.report_rate = report_rate
+        self.firmware_name = firmware_name
+        self.firmware_version = firmware_version
+        self.protocol_version = protocol_version
+        self.stepper_library_version = stepper_library_version
+        self.boot_delay = boot_delay
+        self.verbose = verbose
+
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        self.port_id = os.ttyname(self.slave_fd)
+        # the simulator holds the slave side open, so a blocking write would wait forever once PyMata stops
+        # reading - writes are non-blocking and retried until the simulator is stopped
+        fcntl.fcntl(self.master_fd, fcntl.F_SETFL, fcntl.fcntl(self.master_fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+
+        # a pipe used to wake up the simulator thread when stop() is called
+        self.wakeup_pipe = os.pipe()
+        self.stop_event = threading.Event()
+
+        # serializes writes to the pseudo-terminal between the simulator thread and the send methods
+        self.write_lock = threading.Lock()
+
+        # statistics
+        self.messages_received = 0
+        self.reports_sent = 0
+
+        # incoming message assembly
+        self.command = None
+        self.command_data = bytearray()
+        self.bytes_needed = 0
+        self.in_sysex = False
+
+        self.reset()
+
+    def reset(self):
+        """
+        Return the simulated board to its power up state
+        """
+        # the mode and value of each pin
+        self.pin_modes = [self.OUTPUT] * self.total_pins
+        self.pin_values = [0] * self.total_pins
+
+        # analog pin numbers (A0 = 0) and digital port numbers with reporting enabled
+        self.analog_reporting = set()
+        self.digital_reporting = set()
+
+        # encoder pin_a: position, sonar trigger pin: distance
+        self.encoders = {}
+        self.sonars = {}
+
+        # address: (register, number of bytes) for continuous i2c reads
+        self.i2c_continuous = {}
+
+        # address: {register: value} for i2c devices - filled in by i2c writes
+        self.i2c_devices = {}
+
+        # steps_per_revolution set by the stepper configure command and the last step command received
+        self.stepper_configuration = None
+        self.stepper_last_step = None
+
+        # the last tone command received
+        self.last_tone = None
+
+        self.sampling_interval = self.DEFAULT_SAMPLING_INTERVAL
+
+        # number of report rounds sent since reporting (re)started
+        self.report_round = 0
+        self.report_start_time = None
+
+    def stop(self):
+        self.stop_event.set()
+        os.write(self.wakeup_pipe[1], b'\x00')
+
+    def is_stopped(self):
+        return self.stop_event.is_set()
+
+    def close(self):
+        """
+        Release the pseudo-terminal. Call after the simulator thread has ended.
+        """
+        for fd in (self.master_fd, self.slave_fd) + self.wakeup_pipe:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def send_analog(self, pin, value):
+        """
+        Send an analog report to PyMata
+
+        :param pin: analog pin number (A0 = 0)
+
+        :param value: 14 bit value
+        """
+        self._write(bytearray([self.ANALOG_MESSAGE | pin, value & 0x7f, (value >> 7) & 0x7f]))
+
+    def send_digital(self, port, value):
+        """
+        Send a digital port report to PyMata
+
+        :param port: port number (pins 0-7 = port 0)
+
+        :param value: port value, one bit per pin
+        """
+        self._write(bytearray([self.DIGITAL_MESSAGE | port, value & 0x7f, (value >> 7) & 0x7f]))
+
+    def _write(self, data):
+        """
+        Write all of the data to the pseudo-terminal, waiting for PyMata to make room if necessary.
+        Gives up if the simulator is stopped.
+
+        :param data: bytearray
+        """
+        data = memoryview(data)
+        with self.write_lock:
+            while len(data) and not self.is_stopped():
+                if not select.select([], [self.master_fd], [], .1)[1]:
+                    continue
+                try:
+                    written = os.write(self.master_fd, data)
+                except OSError as e:
+                    if e.errno == errno.EAGAIN:
+                        continue
+                    return
+                data = data[written:]
+
+    def _sysex(self, command, data=None):
+        """
+        Build a sysex frame
+        """
+        frame = bytearray([self.START_SYSEX, command])
+        if data:
+            frame.extend(data)
+        frame.append(self.END_SYSEX)
+        return frame
+
+    def _capability_response(self):
+        """
+        :return: capability response data: a list of (mode, resolution) pairs terminated by 0x7f for each pin
+        """
+        data = bytearray()
+        digital_pins = self.board['digital_pins']
+        for pin in range(self.total_pins):
+            if pin > 1:
+                data.extend([self.INPUT, 1, self.OUTPUT, 1, self.PULLUP, 1])
+                if pin in self.board['pwm_pins']:
+                    data.extend([self.PWM, 8])
+                data.extend([self.SERVO, 14])
+            if pin >= digital_pins:
+                data.extend([self.ANALOG, 10])
+            if pin in self.board['i2c_pins']:
+                data.extend([self.I2C, 1])
+            data.append(0x7f)
+        return data
+
+    def _analog_mapping_response(self):
+        """
+        :return: analog mapping response data: the analog pin number for each pin, or 0x7f
+        """
+        digital_pins = self.board['digital_pins']
+        return bytearray([0x7f] * digital_pins + list(range(self.board['analog_pins'])))
+
+    def _pin_state_response(self, pin):
+        """
+        :return: pin state response data: pin number, mode and value in 7 bit chunks
+        """
+        data = bytearray([pin, self.pin_modes[pin], self.pin_values[pin] & 0x7f])
+        value = self.pin_values[pin] >> 7
+        while value:
+            data.append(value & 0x7f)
+            value >>= 7
+        return data
+
+    def _firmware_response(self):
+        """
+        :return: report firmware response data: major, minor and the file name as 2 bytes per character
+        """
+        data = bytearray(self.firmware_version)
+        for char in self.firmware_name:
+            data.extend([ord(char) & 0x7f, (ord(char) >> 7) & 0x7f])
+        return data
+
+    def _i2c_reply(self, address, register, number_of_bytes):
+        """
+        Build an i2c reply frame. Registers that were written by PyMata return the data written,
+        others return synthetic data that changes with each report round.
+        """
+        device = self.i2c_devices.get(address, {})
+        data = bytearray([address & 0x7f, (address >> 7) & 0x7f, register & 0x7f, (register >> 7) & 0x7f])
+        for i in range(number_of_bytes):
+            value = device.get(register + i, (register + i + self.report_round) & 0xff)
+            data.extend([value & 0x7f, (value >> 7) & 0x7f])
+        return self._sysex(self.I2C_REPLY, data)
+
+    def _process_sysex(self, command, data):
+        """
+        Process a sysex command received from PyMata
+
+        :param command: sysex command
+        :param data: bytearray of sysex data
+        :return: the reply to write, or None
+        """
+        if command == self.ANALOG_MAPPING_QUERY:
+            return self._sysex(self.ANALOG_MAPPING_RESPONSE, self._analog_mapping_response())
+        elif command == self.CAPABILITY_QUERY:
+            return self._sysex(self.CAPABILITY_RESPONSE, self._capability_response())
+        elif command == self.PIN_STATE_QUERY:
+            if data and data[0] < self.total_pins:
+                return self._sysex(self.PIN_STATE_RESPONSE, self._pin_state_response(data[0]))
+        elif command == self.REPORT_FIRMWARE:
+            return self._sysex(self.REPORT_FIRMWARE, self._firmware_response())
+        elif command == self.SAMPLING_INTERVAL:
+            if len(data) >= 2:
+                self.sampling_interval = max(1, data[0] + (data[1] << 7))
+                self.report_start_time = None
+        elif command == self.EXTENDED_ANALOG:
+            if len(data) >= 2 and data[0] < self.total_pins:
+                value = 0
+                for i, item in enumerate(data[1:]):
+                    value |= item << (7 * i)
+                self.pin_values[data[0]] = value
+        elif command == self.SERVO_CONFIG:
+            if data and data[0] < self.total_pins:
+                self.pin_modes[data[0]] = self.SERVO
+        elif command == self.TONE_PLAY:
+            self.last_tone = bytes(data)
+        elif command == self.ENCODER_CONFIG:
+            if len(data) >= 2:
+                self.pin_modes[data[0]] = self.ENCODER
+                self.pin_modes[data[1]] = self.ENCODER
+                self.encoders[data[0]] = 0
+        elif command == self.SONAR_CONFIG:
+            if len(data) >= 2:
+                self.pin_modes[data[0]] = self.SONAR
+                self.pin_modes[data[1]] = self.SONAR
+                self.sonars[data[0]] = 0
+        elif command == self.STEPPER_DATA:
+            if data and data[0] == self.STEPPER_LIBRARY_VERSION:
+                version = self.stepper_library_version
+                return self._sysex(self.STEPPER_DATA, [version & 0x7f, (version >> 7) & 0x7f])
+            elif data and data[0] == self.STEPPER_CONFIGURE and len(data) >= 3:
+                self.stepper_configuration = data[1] + (data[2] << 7)
+            elif data and data[0] == self.STEPPER_STEP:
+                self.stepper_last_step = bytes(data[1:])
+        elif command == self.I2C_CONFIG:
+            pass
+        elif command == self.I2C_REQUEST:
+            return self._process_i2c_request(data)
+        elif self.verbose:
+            print('Simulator: unsupported sysex command 0x%02x' % command)
+        return None
+
+    def _process_i2c_request(self, data):
+        """
+        Process an i2c request
+
+        :param data: address, read/write mode, followed by the request data
+        :return: the reply to write, or None
+        """
+        if len(data) < 2:
+            return None
+        address = data[0]
+        mode = data[1] & self.I2C_READ_WRITE_MODE_MASK
+        # the remaining data is sent as 7 bit pairs
+        values = [data[i] + (data[i + 1] << 7) for i in range(2, len(data) - 1, 2)]
+
+        if mode == self.I2C_WRITE:
+            # the first value is the register, followed by the data written to consecutive registers
+            if values:
+                device = self.i2c_devices.setdefault(address, {})
+                for i, value in enumerate(values[1:]):
+                    device[values[0] + i] = value
+        elif mode == self.I2C_STOP_READING:
+            self.i2c_continuous.pop(address, None)
+        elif len(values) >= 2:
+            register, number_of_bytes = values[0], values[1]
+            if mode == self.I2C_READ_CONTINUOUSLY:
+                self.i2c_continuous[address] = (register, number_of_bytes)
+            return self._i2c_reply(address, register, number_of_bytes)
+        return None
+
+    def _process_command(self, command, data):
+        """
+        Process a non-sysex command received from PyMata
+
+        :param command: command byte
+        :param data: bytearray of command data
+        :return: the reply to write, or None
+        """
+        message = command & 0xF0
+        if message == self.DIGITAL_MESSAGE:
+            # set the values of the output pins in the port
+            port_value = data[0] + (data[1] << 7)
+            for bit in range(8):
+                pin = (command & 0x0F) * 8 + bit
+                if pin < self.total_pins and self.pin_modes[pin] == self.OUTPUT:
+                    self.pin_values[pin] = (port_value >> bit) & 1
+        elif message == self.ANALOG_MESSAGE:
+            pin = command & 0x0F
+            if pin < self.total_pins:
+                self.pin_values[pin] = data[0] + (data[1] << 7)
+        elif message == self.REPORT_ANALOG:
+            if data[0]:
+                self.analog_reporting.add(command & 0x0F)
+            else:
+                self.analog_reporting.discard(command & 0x0F)
+        elif message == self.REPORT_DIGITAL:
+            if data[0]:
+                self.digital_reporting.add(command & 0x0F)
+            else:
+                self.digital_reporting.discard(command & 0x0F)
+        elif command == self.SET_PIN_MODE:
+            if data[0] < self.total_pins:
+                self.pin_modes[data[0]] = data[1]
+        elif command == self.SET_DIGITAL_PIN_VALUE:
+            if data[0] < self.total_pins:
+                self.pin_values[data[0]] = data[1]
+        elif command == self.REPORT_VERSION:
+            return bytearray([self.REPORT_VERSION, self.protocol_version[0], self.protocol_version[1]])
+        elif command == self.SYSTEM_RESET:
+            self.reset()
+        return None
+
+    def _receive(self, data):
+        """
+        Assemble the data received from PyMata into commands and process them
+
+        :param data: bytearray of received data
+        :return: bytearray of replies
+        """
+        replies = bytearray()
+        for byte in data:
+            if byte & 0x80:
+                # a command byte always starts a new message
+                if byte == self.END_SYSEX:
+                    if self.in_sysex and self.command_data:
+                        self.messages_received += 1
+                        if self.verbose:
+                            print('Simulator: sysex %s' % list(self.command_data))
+                        reply = self._process_sysex(self.command_data[0], self.command_data[1:])
+                        if reply:
+                            replies.extend(reply)
+                    self.in_sysex = False
+                    self.command = None
+                    continue
+
+                self.command_data = bytearray()
+                if byte == self.START_SYSEX:
+                    self.in_sysex = True
+                    self.command = None
+                    continue
+
+                self.in_sysex = False
+                self.command = byte
+                key = byte if byte >= self.START_SYSEX else byte & 0xF0
+                self.bytes_needed = self.COMMAND_DATA_LENGTHS.get(key)
+                if self.bytes_needed is None:
+                    if self.verbose:
+                        print('Simulator: unsupported command 0x%02x' % byte)
+                    self.command = None
+                    continue
+            elif self.in_sysex:
+                self.command_data.append(byte)
+                continue
+            elif self.command is None:
+                # data byte with no command - discard
+                continue
+            else:
+                self.command_data.append(byte)
+
+            if len(self.command_data) == self.bytes_needed:
+                self.messages_received += 1
+                if self.verbose:
+                    print('Simulator: command 0x%02x %s' % (self.command, list(self.command_data)))
+                reply = self._process_command(self.command, self.command_data)
+                if reply:
+                    replies.extend(reply)
+                # running status is not used by Firmata, a new command byte is expected
+                self.command = None
+        return replies
+
+    def _report_period(self):
+        """
+        :return: time in seconds between report rounds
+        """
+        if self.report_rate:
+            return 1.0 / self.report_rate
+        return self.sampling_interval / 1000.0
+
+    def _reporting_active(self):
+        return bool(self.analog_reporting or self.digital_reporting or self.encoders or self.sonars or
+                    self.i2c_continuous)
+
+    def _build_reports(self, rounds):
+        """
+        Build the synthetic reports for a number of report rounds
+
+        :param rounds: number of rounds
+        :return: bytearray of reports
+        """
+        reports = bytearray()
+        analog_pins = sorted(self.analog_reporting)
+        digital_ports = sorted(self.digital_reporting)
+        for _ in range(rounds):
+            self.report_round += 1
+            n = self.report_round
+
+            for pin in analog_pins:
+                # a 10 bit ramp, offset for each pin
+                value = (n + pin * 64) & 0x3ff
+                reports.extend([self.ANALOG_MESSAGE | pin, value & 0x7f, value >> 7])
+                self.pin_values[self.board['digital_pins'] + pin] = value
+
+            for port in digital_ports:
+                # the input pins of the port alternate between high and low
+                value = 0
+                for bit in range(8):
+                    pin = port * 8 + bit
+                    if pin < self.total_pins and self.pin_modes[pin] in (self.INPUT, self.PULLUP):
+                        level = (n + bit) & 1
+                        self.pin_values[pin] = level
+                        value |= level << bit
+                reports.extend([self.DIGITAL_MESSAGE | port, value & 0x7f, value >> 7])
+
+            for pin in self.encoders:
+                self.encoders[pin] = (self.encoders[pin] + 1) & 0x3fff
+                position = self.encoders[pin]
+                reports.extend(self._sysex(self.ENCODER_DATA, [pin, position & 0x7f, position >> 7]))
+
+            for pin in self.sonars:
+                # distance cycles between 1 and 200 centimeters
+                distance = n % 200 + 1
+                self.sonars[pin] = distance
+                reports.extend(self._sysex(self.SONAR_DATA, [pin, distance & 0x7f, distance >> 7]))
+
+            for address, (register, number_of_bytes) in self.i2c_continuous.items():
+                reports.extend(self._i2c_reply(address, register, number_of_bytes))
+
+            self.reports_sent += (len(analog_pins) + len(digital_ports) + len(self.encoders) + len(self.sonars) +
+                                  len(self.i2c_continuous))
+        return reports
+
+    def _boot(self):
+        """
+        Discard the data received during the boot delay, then announce the firmware
+        """
+        boot_end_time = time.time() + self.boot_delay
+        while not self.is_stopped():
+            remaining = boot_end_time - time.time()
+            if remaining <= 0:
+                break
+            readable = select.select([self.master_fd, self.wakeup_pipe[0]], [], [], remaining)[0]
+            if self.master_fd in readable:
+                try:
+                    os.read(self.master_fd, 4096)
+                except OSError:
+                    time.sleep(.01)
+        self._write(bytearray([self.REPORT_VERSION, self.protocol_version[0], self.protocol_version[1]]) +
+                    self._sysex(self.REPORT_FIRMWARE, self._firmware_response()))
+
+    def run(self):
+        """
+        The simulator thread. Processes commands from PyMata and streams reports.
+        """
+        if self.boot_delay:
+            self._boot()
+
+        while not self.is_stopped():
+            timeout = None
+            if self._reporting_active():
+                now = time.time()
+                if self.report_start_time is None:
+                    self.report_start_time = now
+                    self.report_round = 0
+                # send all rounds that are due, so that the requested rate is kept even if
+                # the thread falls behind
+                due = int((now - self.report_start_time) / self._report_period()) - self.report_round
+                if due > 0:
+                    self._write(self._build_reports(min(due, self.MAX_ROUNDS_PER_WRITE)))
+                    continue
+                timeout = self.report_start_time + (self.report_round + 1) * self._report_period() - now
+            else:
+                self.report_start_time = None
+
+            readable = select.select([self.master_fd, self.wakeup_pipe[0]], [], [], timeout)[0]
+            if self.master_fd in readable:
+                try:
+                    data = bytearray(os.read(self.master_fd, 4096))
+                except OSError:
+                    # the slave side is closed - wait for it to be reopened
+                    time.sleep(.01)
+                    continue
+                replies = self._receive(data)
+                if replies:
+                    self._write(replies)
+
+
+if __name__ == "__main__":
+    # run a simulated board until interrupted
+    rate = float(sys.argv[1]) if len(sys.argv) > 1 else None
+    simulator = PyMataSimulator(report_rate=rate)
+    simulator.start()
+    print('Simulated board on %s' % simulator.port_id)
+    try:
+        while simulator.is_alive():
+            time.sleep(1)
+    except KeyboardInterrupt:
+        simulator.stop()
+        simulator.join()
+        simulator.close()
@@ -0,0 +1,214 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import errno
+import select
+import socket
+import threading
+
+from .pymata_transport import PyMataTransport
+
+
+class PyMataSocket(PyMataTransport):
+    """
+    This class manages a TCP connection to a networked Firmata board, such as an ESP8266/ESP32
+    running StandardFirmataWiFi or a serial-to-WiFi bridge in front of an Arduino.
+
+    The socket is non-blocking with TCP_NODELAY set, so that each frame is sent as soon as it is written.
+    The receive thread blocks until data arrives and drains the socket with bulk recv calls.
+    """
+
+    # StandardFirmataWiFi listens on this port
+    DEFAULT_PORT = 3030
+
+    # upper limit for the number of bytes drained from the socket in a single recv
+    MAX_CHUNK_SIZE = 4096
+
+    def __init__(self, host, port=DEFAULT_PORT, receive_buffer=None, connect_timeout=5,
+                 max_chunk_size=MAX_CHUNK_SIZE, write_timeout=5):
+        """
+        Constructor:
+
+        :param host: The board's IP address or host name
+
+        :param port: The board's TCP port
+
+        :param receive_buffer: A reference to the PyMataRingBuffer shared with the _command_handler.
+                               PyMata sets this when the transport is passed to its constructor.
+
+        :param connect_timeout: Maximum time in seconds to wait for the connection to be established
+
+        :param max_chunk_size: Maximum number of bytes to read from the socket in a single recv
+
+        :param write_timeout: Maximum time in seconds to wait for the board to accept a frame. An IOError is
+                              raised if the board stops reading.
+        """
+        PyMataTransport.__init__(self, receive_buffer, event_driven=True)
+
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.max_chunk_size = max(1, int(max_chunk_size))
+        self.write_timeout = write_timeout
+
+        self.sock = None
+
+        # set by open() - if True, status messages are printed
+        self.verbose = False
+
+        # serializes writers, so that frames written from different threads are not interleaved
+        self.write_lock = threading.Lock()
+
+        # a socket pair used to wake up the receive thread when stop() is called
+        self.wakeup_lock = threading.Lock()
+        self.wakeup_pair = None
+
+    def stop(self):
+        PyMataTransport.stop(self)
+        with self.wakeup_lock:
+            if self.wakeup_pair is not None:
+                try:
+                    self.wakeup_pair[1].send(b'\x00')
+                except socket.error:
+                    pass
+
+    def fileno(self):
+        """
+        :return: The socket file descriptor
+        """
+        return self.sock.fileno()
+
+    def read_ready(self):
+        """
+        Read the data waiting on the socket (up to max_chunk_size bytes) without blocking.
+
+        :return: The data read. Empty if no data is waiting.
+        """
+        try:
+            data = self.sock.recv(self.max_chunk_size)
+        except socket.error as e:
+            if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return b''
+            raise IOError('Connection to Firmata board at %s:%d reset' % (self.host, self.port))
+        if not data:
+            raise IOError('Connection to Firmata board at %s:%d closed' % (self.host, self.port))
+        return data
+
+    def get_device_identity(self):
+        """
+        :return: A string identifying the device by host and port
+        """
+        return 'tcp:%s:%d' % (self.host, self.port)
+
+    def open(self, verbose):
+        """
+        Connect to the board
+
+        :param verbose: If True, status messages are printed
+        """
+        self.verbose = verbose
+        if verbose:
+            print('\nConnecting to Firmata board at %s:%d ' % (self.host, self.port))
+
+        # in case the connection is already open, let's close it and then reopen it
+        if self.sock is not None:
+            self.close()
+
+        self.sock = socket.create_connection((self.host, self.port), self.connect_timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setblocking(False)
+
+        if hasattr(socket, 'socketpair'):
+            with self.wakeup_lock:
+                self.wakeup_pair = socket.socketpair()
+
+    def close(self):
+        """
+        Close the connection
+        """
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except socket.error:
+                pass
+            self.sock = None
+
+        with self.wakeup_lock:
+            if self.wakeup_pair is not None:
+                for sock in self.wakeup_pair:
+                    sock.close()
+                self.wakeup_pair = None
+
+    def write(self, data):
+        """
+        Send a complete frame (bytes or bytearray) to the board.
+        The frame is handed to the socket in a single send. If the socket send buffer is full,
+        this method waits until the remainder can be sent, for at most write_timeout seconds.
+
+        :param data: bytes or bytearray
+        """
+        if not isinstance(data, (bytes, bytearray)):
+            # a single character
+            data = bytearray([ord(data)])
+        data = memoryview(data)
+        with self.write_lock:
+            while len(data):
+                try:
+                    sent = self.sock.send(data)
+                except socket.error as e:
+                    if e.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                        raise
+                    sent = 0
+                data = data[sent:]
+                if len(data):
+                    if not select.select([], [self.sock], [], self.write_timeout)[1]:
+                        raise IOError('Write to Firmata board at %s:%d timed out' % (self.host, self.port))
+
+    def read_chunk(self, timeout=None):
+        """
+        Wait for data to arrive on the socket and return everything waiting (up to max_chunk_size bytes).
+        This method blocks until data arrives, stop() is called or the timeout, if given, expires.
+
+        This method is called by the receive thread, or directly by the _command_handler when
+        PyMata runs in single thread mode.
+
+        :param timeout: Maximum time in seconds to wait for data, or None
+
+        :return: The data read. Empty if no data arrived.
+        """
+        if self.wakeup_pair is not None:
+            readable = select.select([self.sock, self.wakeup_pair[0]], [], [], timeout)[0]
+        else:
+            # no socketpair (python 2.7 on Windows) - check for stop() periodically
+            readable = select.select([self.sock], [], [], .1 if timeout is None else min(.1, timeout))[0]
+        if not readable or self.is_stopped():
+            return b''
+
+        try:
+            data = self.sock.recv(self.max_chunk_size)
+        except socket.error as e:
+            if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return b''
+            # the connection was reset
+            data = b''
+
+        if not data:
+            # the board closed the connection
+            if self.verbose:
+                print('Connection to Firmata board at %s:%d closed' % (self.host, self.port))
+            self.stop()
+        return data
@@ -0,0 +1,221 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+
+from array import array
+from collections import namedtuple
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def require_numpy():
+    """
+    Raise ImportError if NumPy is not installed
+    """
+    if numpy is None:
+        raise ImportError('NumPy is not installed')
+
+
+# An immutable, point in time copy of the pin modes and data values of both response tables.
+# generation is the command handler's generation number when the copy was made, and time_stamp the time.
+# The modes and values are tuples indexed by pin number, or read only NumPy arrays.
+PyMataPinSnapshot = namedtuple('PyMataPinSnapshot', ['generation', 'time_stamp',
+                                                     'analog_modes', 'analog_values',
+                                                     'digital_modes', 'digital_values'])
+
+
+def make_pin_snapshot(generation, time_stamp, columns, as_numpy=False):
+    """
+    Build a PyMataPinSnapshot from copies of the response table columns
+
+    :param generation: The generation number of the copies
+
+    :param time_stamp: The time the copies were made
+
+    :param columns: Private copies of the analog modes, analog values, digital modes and digital values arrays
+
+    :param as_numpy: If True the columns are returned as read only NumPy arrays, sharing the copies' memory
+
+    :return: A PyMataPinSnapshot
+    """
+    if as_numpy:
+        require_numpy()
+        arrays = []
+        for column in columns:
+            column_array = numpy.frombuffer(column, dtype=numpy.dtype(column.typecode))
+            column_array.flags.writeable = False
+            arrays.append(column_array)
+        columns = arrays
+    else:
+        columns = [tuple(column) for column in columns]
+    return PyMataPinSnapshot(generation, time_stamp, *columns)
+
+
+# The NumPy record type of a batch of events delivered by make_event_batch(as_numpy=True)
+EVENT_RECORD_TYPE = [('mode', 'u1'), ('pin', 'u1'), ('value', 'i4'), ('time_stamp', 'f8')]
+
+
+def make_event_batch(events, as_numpy=False):
+    """
+    Build the batch delivered to a batch callback
+
+    :param events: A list of (mode, pin, value, time_stamp) tuples, in the order they were received
+
+    :param as_numpy: If True the events are returned as a NumPy record array with the fields mode, pin,
+                     value and time_stamp
+
+    :return: The list of events, or a NumPy record array
+    """
+    if as_numpy:
+        require_numpy()
+        return numpy.rec.array(events, dtype=EVENT_RECORD_TYPE)
+    return events
+
+
+class PyMataResponseTable(object):
+    """
+    This class holds a response table: the mode, the last data value, the time the value was received
+    and the user callback of each pin.
+
+    The table is stored as columns indexed by pin number. Modes and values are typed arrays, so a pin is
+    read or written with a single index and the values are not kept as separate int objects.
+    Callbacks are kept in a list.
+
+        table.values[pin] = value
+
+    entries() returns the table in the list of [mode, value, callback] lists form returned by
+    get_analog_response_table() and get_digital_response_table().
+    """
+    # array type codes
+    MODE_TYPE = 'B'
+    VALUE_TYPE = 'i'
+    TIME_STAMP_TYPE = 'd'
+
+    def __init__(self, pins=0, mode=0):
+        """
+        :param pins: Number of pins
+
+        :param mode: Initial mode of every pin
+        """
+        self.modes = None
+        self.values = None
+        # time.time() when each value was received, 0 if no value has been received
+        self.time_stamps = None
+        self.callbacks = None
+        self.reset(pins, mode)
+
+    def __len__(self):
+        return len(self.modes)
+
+    def reset(self, pins, mode=0):
+        """
+        Size the table for a number of pins, and set every pin to the mode with a value of 0, no time stamp
+        and no callback
+
+        :param pins: Number of pins
+
+        :param mode: Mode of every pin
+        """
+        self.modes = array(self.MODE_TYPE, [mode]) * pins
+        self.values = array(self.VALUE_TYPE, [0]) * pins
+        self.time_stamps = array(self.TIME_STAMP_TYPE, [0]) * pins
+        self.callbacks = [None] * pins
+
+    def copy_columns(self):
+        """
+        :return: Copies of the modes and values arrays. Each copy is a single memory copy.
+        """
+        return self.modes[:], self.values[:]
+
+    def entries(self):
+        """
+        :return: A list of [mode, value, callback] for each pin
+        """
+        return list(map(list, zip(self.modes, self.values, self.callbacks)))
+
+
+class PyMataLatchTable(object):
+    """
+    This class holds a latch table: the latch state, threshold, latched value, time stamp and callback of each
+    pin, stored as columns indexed by pin number in the same way as PyMataResponseTable.
+    Thresholds are only used for analog pins.
+    """
+    # array type codes
+    STATE_TYPE = 'B'
+    THRESHOLD_TYPE = 'd'
+    DATA_TYPE = 'i'
+    TIME_STAMP_TYPE = 'd'
+
+    def __init__(self, pins=0):
+        """
+        :param pins: Number of pins
+        """
+        self.states = None
+        self.threshold_types = None
+        self.thresholds = None
+        self.latched_data = None
+        self.time_stamps = None
+        self.callbacks = None
+        self.reset(pins)
+
+    def __len__(self):
+        return len(self.states)
+
+    def reset(self, pins):
+        """
+        Size the table for a number of pins, and clear every pin
+
+        :param pins: Number of pins
+        """
+        self.states = array(self.STATE_TYPE, [0]) * pins
+        self.threshold_types = array(self.STATE_TYPE, [0]) * pins
+        self.thresholds = array(self.THRESHOLD_TYPE, [0]) * pins
+        self.latched_data = array(self.DATA_TYPE, [0]) * pins
+        self.time_stamps = array(self.TIME_STAMP_TYPE, [0]) * pins
+        self.callbacks = [None] * pins
+
+    def arm(self, pin, state, threshold_type, threshold, callback):
+        """
+        Arm a pin's latch
+
+        :param pin: Pin number
+
+        :param state: The armed latch state
+
+        :param threshold_type: The latch threshold type
+
+        :param threshold: The threshold value, for analog pins
+
+        :param callback: The user's latch callback, or None
+        """
+        self.states[pin] = state
+        self.threshold_types[pin] = threshold_type
+        self.thresholds[pin] = threshold
+        self.latched_data[pin] = 0
+        self.time_stamps[pin] = 0
+        self.callbacks[pin] = callback
+
+    def clear(self, pin):
+        """
+        Clear a pin's latch
+
+        :param pin: Pin number
+        """
+        self.arm(pin, 0, 0, 0, None)
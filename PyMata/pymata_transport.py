@@ -0,0 +1,141 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+import threading
+
+
+class PyMataTransport(threading.Thread):
+    """
+    This is the base class for the transports that carry Firmata messages between PyMata and a board.
+
+    A transport implements:
+        open() and close() - establish and release the connection
+        write() - send a complete Firmata frame
+        read_chunk() - wait for data from the board and return it
+
+    The receive thread (run) places the data returned by read_chunk() in the receive_buffer shared with
+    the _command_handler. In single thread mode the receive thread is not started, and the _command_handler
+    calls read_chunk() itself and feeds the data to its parser.
+
+    Transports that also implement fileno() and read_ready() can be driven by a PyMataReactor, which
+    reads many boards from one thread.
+    """
+
+    def __init__(self, receive_buffer=None, event_driven=False):
+        """
+        Constructor:
+
+        :param receive_buffer: A reference to the PyMataRingBuffer shared with the _command_handler.
+                               PyMata sets this when the transport is passed to its constructor.
+
+        :param event_driven: True if read_chunk() blocks until data arrives. If False, read_chunk()
+                             polls and the _command_handler waits for data with a timeout.
+        """
+        threading.Thread.__init__(self)
+        self.daemon = True
+
+        self.receive_buffer = receive_buffer
+        self.event_driven = event_driven
+
+        self.stop_event = threading.Event()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def is_stopped(self):
+        return self.stop_event.is_set()
+
+    def open(self, verbose):
+        """
+        Open the connection to the board
+
+        :param verbose: If True, status messages are printed
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Close the connection to the board
+        """
+        raise NotImplementedError
+
+    def write(self, data):
+        """
+        Send a complete Firmata frame to the board
+
+        :param data: bytes or bytearray
+        """
+        raise NotImplementedError
+
+    def read_chunk(self, timeout=None):
+        """
+        Wait for data from the board and return it.
+        Must return promptly with no data once stop() has been called.
+
+        :param timeout: Maximum time in seconds to wait for data. None waits as long as the transport's
+                        default. Single thread mode passes a timeout when a batch of events is due.
+
+        :return: The data received. Empty if no data arrived.
+        """
+        raise NotImplementedError
+
+    def fileno(self):
+        """
+        The file descriptor that becomes readable when data arrives. Required to use the transport
+        with a PyMataReactor.
+
+        :return: The file descriptor, or None if the transport does not have one
+        """
+        return None
+
+    def read_ready(self):
+        """
+        Read the data waiting on the transport without blocking. Called by a PyMataReactor when
+        fileno() is readable.
+
+        :return: The data read. Empty if no data is waiting.
+                 IOError is raised if the connection has been closed.
+        """
+        raise NotImplementedError
+
+    def get_device_identity(self):
+        """
+        Identify the device this transport is connected to. The identity is used as the key for
+        cached board information.
+
+        :return: A string identifying the device, or None if the device cannot be identified
+        """
+        return None
+
+    # noinspection PyExceptClausesOrder
+    def run(self):
+        """
+        This method continually runs. Data received from the board is placed in the receive_buffer
+        @return: Never Returns
+        """
+        while not self.is_stopped():
+            # we can get an OSError: [Errno9] Bad file descriptor when shutting down
+            # just ignore it
+            try:
+                data = self.read_chunk()
+                if data:
+                    self.receive_buffer.write(data)
+            except OSError:
+                pass
+            except IOError:
+                self.stop()
+        self.close()
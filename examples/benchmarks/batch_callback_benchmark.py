@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+
+This benchmark compares the rate at which a consumer receives pin changes through one callback call per
+change, registered with set_pin_mode(), with batched delivery through set_batch_callback(), which passes
+all of the changes decoded from a chunk of data, or from a time window, to a single call.
+
+Analog reports for 16 pins are injected through the in-memory PyMataLoopbackTransport and the consumer
+sums the values it receives. No Arduino, serial port or pseudo-terminal is needed.
+"""
+
+import time
+
+from PyMata.pymata import PyMata
+from PyMata.pymata_loopback import PyMataLoopbackTransport
+
+# analog mapping of an Arduino Mega: 54 digital pins followed by A0 - A15
+MEGA_ANALOG_MAPPING = [0x7f] * 54 + list(range(16))
+
+# number of analog reports injected per run
+REPORTS = 200000
+
+PINS = 16
+
+
+class Consumer(object):
+    def __init__(self):
+        self.events = 0
+        self.total = 0
+
+    def callback(self, data):
+        self.events += 1
+        self.total += data[2]
+
+    def batch_callback(self, events):
+        self.events += len(events)
+        for event in events:
+            self.total += event[2]
+
+
+def analog_reports(count):
+    block = bytearray()
+    for i in range(count):
+        # every report changes the value, so that every report is delivered
+        value = (i // PINS + 1) & 0x3ff
+        block += bytearray([0xE0 | (i % PINS), value & 0x7f, value >> 7])
+    return block
+
+
+def run(reports, batched, interval=0):
+    """
+    :return: events delivered per second
+    """
+    transport = PyMataLoopbackTransport(analog_mapping=MEGA_ANALOG_MAPPING)
+    board = PyMata(transport=transport, verbose=False)
+    consumer = Consumer()
+    for pin in range(PINS):
+        board.set_pin_mode(pin, board.INPUT, board.ANALOG, None if batched else consumer.callback)
+    if batched:
+        board.set_batch_callback(consumer.batch_callback, interval)
+
+    start_time = time.perf_counter()
+    transport.inject(reports)
+    while consumer.events < REPORTS:
+        time.sleep(.001)
+    elapsed = time.perf_counter() - start_time
+    board.disconnect()
+    return REPORTS / elapsed
+
+
+if __name__ == "__main__":
+    reports = analog_reports(REPORTS)
+    print('%d analog reports on %d pins' % (REPORTS, PINS))
+    print('%-36s: %9.0f events/sec' % ('a callback call per change', run(reports, False)))
+    print('%-36s: %9.0f events/sec' % ('batch per chunk', run(reports, True)))
+    print('%-36s: %9.0f events/sec' % ('batch per 10 ms window', run(reports, True, .01)))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+
+
+This benchmark measures how the aggregate message rate of a PyMataBoardPool changes as boards
+are added. Each board has its own command handler thread, tables and lock.
+
+No Arduino is needed. Each board uses a PyMataLoopbackTransport, and the same number of analog
+report messages is injected into every board at the same time.
+"""
+
+import time
+
+from PyMata.pymata_board_pool import PyMataBoardPool
+from PyMata.pymata_loopback import PyMataLoopbackTransport
+
+# number of analog report messages injected into each board
+MESSAGES_PER_BOARD = 100000
+
+# analog input pins A0 - A5
+ANALOG_PINS = range(6)
+
+POOL_SIZES = (1, 2, 4, 8)
+
+
+def analog_reports(count):
+    block = bytearray()
+    for i in range(count):
+        pin = i % len(ANALOG_PINS)
+        # a callback is only invoked when the value changes, so every report carries a new value
+        value = (i // len(ANALOG_PINS) + 1) & 0x3ff
+        block += bytearray([0xE0 | pin, value & 0x7f, value >> 7])
+    return block
+
+
+def run(boards, **options):
+    pool = PyMataBoardPool(verbose=False, **options)
+    transports = [PyMataLoopbackTransport() for _ in range(boards)]
+    for future in [pool.add(transport=transport) for transport in transports]:
+        future.result()
+
+    # each board's callbacks run in its own thread, so each board has its own counter
+    counters = []
+    for name, board in pool.items():
+        received = [0]
+        counters.append(received)
+
+        def callback(data, received=received):
+            received[0] += 1
+
+        for pin in ANALOG_PINS:
+            board.set_pin_mode(pin, board.INPUT, board.ANALOG, callback)
+
+    block = analog_reports(MESSAGES_PER_BOARD)
+    total = MESSAGES_PER_BOARD * boards
+    start_time = time.time()
+    for transport in transports:
+        transport.inject(block)
+    while sum(received[0] for received in counters) < total:
+        time.sleep(.001)
+    elapsed = time.time() - start_time
+
+    pool.close()
+    return total / elapsed
+
+
+if __name__ == "__main__":
+    print('%d messages per board' % MESSAGES_PER_BOARD)
+    for boards in POOL_SIZES:
+        print('%2d boards: receive thread + handler %9.0f messages/sec   single thread %9.0f messages/sec' %
+              (boards, run(boards), run(boards, single_thread=True)))
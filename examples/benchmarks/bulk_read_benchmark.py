@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+This benchmark compares reading every pin of a board with the pin count of an Arduino Mega
+(70 digital and 16 analog pins) one pin at a time with analog_read() and digital_read(), with
+the bulk read_all_analog(), read_all_digital() and read_pins() methods, which acquire the data lock once.
+
+Each way of reading is timed with the board idle, and while the command handler thread is busy
+processing analog reports injected through the in-memory PyMataLoopbackTransport.
+No Arduino, serial port or pseudo-terminal is needed.
+"""
+
+import time
+
+from PyMata.pymata import PyMata
+from PyMata.pymata_loopback import PyMataLoopbackTransport
+
+# analog mapping of an Arduino Mega: 54 digital pins followed by A0 - A15
+MEGA_ANALOG_MAPPING = [0x7f] * 54 + list(range(16))
+
+# number of times all of the pins are read
+POLLS = 5000
+
+
+def per_pin(board):
+    analog = [board.analog_read(pin) for pin in range(16)]
+    digital = [board.digital_read(pin) for pin in range(70)]
+    return analog, digital
+
+
+def bulk(board):
+    return board.read_all_analog(), board.read_all_digital()
+
+
+def bulk_time_stamps(board):
+    return board.read_all_analog(time_stamps=True), board.read_all_digital(time_stamps=True)
+
+
+def selected_pins(board):
+    return board.read_pins(range(16), board.ANALOG), board.read_pins(range(70))
+
+
+def time_polls(board, read):
+    """
+    :return: The time to read all of the pins in microseconds
+    """
+    start_time = time.perf_counter()
+    for _ in range(POLLS):
+        read(board)
+    return (time.perf_counter() - start_time) * 1e6 / POLLS
+
+
+def analog_reports(count):
+    block = bytearray()
+    for i in range(count):
+        value = (i // 16 + 1) & 0x3ff
+        block += bytearray([0xE0 | (i % 16), value & 0x7f, value >> 7])
+    return block
+
+
+if __name__ == "__main__":
+    transport = PyMataLoopbackTransport(analog_mapping=MEGA_ANALOG_MAPPING)
+    board = PyMata(transport=transport, verbose=False)
+    for pin in range(16):
+        board.set_pin_mode(pin, board.INPUT, board.ANALOG)
+
+    reads = (('analog_read/digital_read per pin', per_pin),
+             ('read_all_analog/read_all_digital', bulk),
+             ('read_all_* with time stamps', bulk_time_stamps),
+             ('read_pins', selected_pins))
+    reports = analog_reports(2000000)
+    print('Time to read all 86 pins, %d polls' % POLLS)
+    for label, read in reads:
+        idle = time_polls(board, read)
+        transport.inject(reports)
+        busy = time_polls(board, read)
+        # wait for the command handler to catch up before the next measurement
+        while board.get_receive_buffer_stats()['unread_bytes'] or transport.incoming:
+            time.sleep(.01)
+        print('%-34s: idle %7.1f us   while processing reports %8.1f us' % (label, idle, busy))
+    board.disconnect()
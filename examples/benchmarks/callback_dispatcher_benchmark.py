@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+
+This benchmark measures how fast a board processes analog reports when each report invokes a slow
+callback - one that sleeps for 1 ms, in place of for example a database insert or a network request.
+
+The callbacks are run in turn by the command handler thread, and then by a PyMataCallbackDispatcher
+with 4 worker threads using each overflow policy. For each, the time for the command handler to
+process the reports, the largest analog_read() time while it does so and the dispatcher statistics are
+printed. Reports are injected through the in-memory PyMataLoopbackTransport.
+No Arduino, serial port or pseudo-terminal is needed.
+"""
+
+import time
+
+from PyMata.pymata import PyMata
+from PyMata.pymata_callback_dispatcher import PyMataCallbackDispatcher
+from PyMata.pymata_loopback import PyMataLoopbackTransport
+
+# number of analog reports injected
+REPORTS = 2000
+
+# analog pins reporting
+PINS = 4
+
+# time spent in each callback, in seconds
+CALLBACK_TIME = .001
+
+
+def slow_callback(data):
+    time.sleep(CALLBACK_TIME)
+
+
+def analog_reports(count):
+    block = bytearray()
+    for i in range(count):
+        # every report changes the value, so that every report invokes the callback
+        value = (i // PINS + 1) & 0x3ff
+        block += bytearray([0xE0 | (i % PINS), value & 0x7f, value >> 7])
+    return block
+
+
+def run(dispatcher):
+    """
+    :return: time to process the reports in seconds, largest analog_read() time in seconds
+    """
+    transport = PyMataLoopbackTransport()
+    board = PyMata(transport=transport, verbose=False, callback_dispatcher=dispatcher)
+    for pin in range(PINS):
+        board.set_pin_mode(pin, board.INPUT, board.ANALOG, slow_callback)
+
+    start_time = time.perf_counter()
+    transport.inject(analog_reports(REPORTS))
+    max_read_time = 0
+    while board.get_receive_buffer_stats()['unread_bytes'] or transport.incoming:
+        read_start = time.perf_counter()
+        board.analog_read(0)
+        max_read_time = max(max_read_time, time.perf_counter() - read_start)
+        time.sleep(.001)
+    process_time = time.perf_counter() - start_time
+    board.disconnect()
+    return process_time, max_read_time
+
+
+if __name__ == "__main__":
+    print('%d analog reports, each invoking a %.1f ms callback' % (REPORTS, CALLBACK_TIME * 1000))
+    process_time, max_read_time = run(None)
+    print('%-32s: processed in %6.2f s (%7.0f reports/s), max analog_read %6.2f ms' %
+          ('callbacks in command handler', process_time, REPORTS / process_time, max_read_time * 1000))
+
+    for overflow in (PyMataCallbackDispatcher.BLOCK, PyMataCallbackDispatcher.DROP_NEWEST,
+                     PyMataCallbackDispatcher.DROP_OLDEST):
+        dispatcher = PyMataCallbackDispatcher(workers=4, max_queue=100, overflow=overflow)
+        process_time, max_read_time = run(dispatcher)
+        dispatcher.wait_idle()
+        stats = dispatcher.get_stats()
+        dispatcher.close()
+        print('%-32s: processed in %6.2f s (%7.0f reports/s), max analog_read %6.2f ms' %
+              ('dispatcher, ' + overflow, process_time, REPORTS / process_time, max_read_time * 1000))
+        print('    completed %d, dropped %d, queue high water mark %d, mean latency %.1f ms, max latency %.1f ms'
+              % (stats['completed'], stats['dropped'], stats['queue_high_water_mark'],
+                 stats['mean_latency'] * 1000, stats['max_latency'] * 1000))
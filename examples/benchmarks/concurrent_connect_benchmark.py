@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+
+
+This benchmark compares bringing up a fleet of boards one after the other with the blocking
+constructor, and concurrently with PyMata(..., auto_connect=False).connect().
+
+No Arduino is needed. Each board is a PyMataSimulator with a different boot delay, standing in
+for the time an Arduino spends in its bootloader after the port is opened.
+
+Linux/macOS only (requires pty support). Requires concurrent.futures (Python 3).
+"""
+
+import concurrent.futures
+import time
+
+from PyMata.pymata import PyMata
+from PyMata.pymata_simulator import PyMataSimulator
+
+# number of boards and the boot delay of each one
+BOARDS = 12
+BOOT_DELAYS = [.5 + .1 * i for i in range(BOARDS)]
+
+
+def shut_down(boards, simulators):
+    for board in boards:
+        board._command_handler.stop()
+        board.transport.stop()
+        board.receive_buffer.close()
+    for simulator in simulators:
+        simulator.stop()
+        simulator.join()
+        simulator.close()
+
+
+def run_sequential():
+    # each simulator starts booting when its board is connected, as an Arduino resets when its port is opened
+    simulators = [PyMataSimulator(boot_delay=boot_delay) for boot_delay in BOOT_DELAYS]
+    boards = []
+    start_time = time.time()
+    for simulator in simulators:
+        simulator.start()
+        boards.append(PyMata(simulator.port_id, verbose=False, event_driven=True))
+    elapsed = time.time() - start_time
+    shut_down(boards, simulators)
+    return elapsed
+
+
+def run_concurrent():
+    simulators = [PyMataSimulator(boot_delay=boot_delay) for boot_delay in BOOT_DELAYS]
+    boards = [PyMata(simulator.port_id, verbose=False, event_driven=True, auto_connect=False)
+              for simulator in simulators]
+    start_time = time.time()
+    futures = []
+    for simulator, board in zip(simulators, boards):
+        simulator.start()
+        futures.append(board.connect())
+    for future in concurrent.futures.as_completed(futures):
+        future.result()
+    elapsed = time.time() - start_time
+    shut_down(boards, simulators)
+    return elapsed
+
+
+if __name__ == "__main__":
+    print('%d boards, boot delays %.1f - %.1f seconds' % (BOARDS, BOOT_DELAYS[0], BOOT_DELAYS[-1]))
+    print('sequential, blocking constructor : %6.3f seconds' % run_sequential())
+    print('concurrent, connect() futures    : %6.3f seconds' % run_concurrent())
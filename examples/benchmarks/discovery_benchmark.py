@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+
+
+This benchmark compares probing serial ports for Firmata boards one at a time with the
+concurrent PyMataDiscovery.discover().
+
+No Arduino is needed. Each board is a PyMataSimulator with a different boot delay, standing in
+for the time an Arduino spends in its bootloader after its port is opened.
+
+Linux/macOS only (requires pty support).
+"""
+
+import time
+
+from PyMata.pymata_discovery import PyMataDiscovery
+from PyMata.pymata_simulator import PyMataSimulator
+
+# number of boards and the boot delay of each one
+BOARDS = 8
+BOOT_DELAYS = [.3 + .1 * i for i in range(BOARDS)]
+
+
+def run(concurrent):
+    simulators = [PyMataSimulator(boot_delay=boot_delay) for boot_delay in BOOT_DELAYS]
+    discovery = PyMataDiscovery()
+
+    start_time = time.time()
+    if concurrent:
+        for simulator in simulators:
+            simulator.start()
+        found = discovery.discover([simulator.port_id for simulator in simulators])
+    else:
+        # each simulator starts booting when its port is probed, as an Arduino resets when its port is opened
+        found = {}
+        for simulator in simulators:
+            simulator.start()
+            found.update(discovery.discover([simulator.port_id]))
+    elapsed = time.time() - start_time
+
+    for simulator in simulators:
+        simulator.stop()
+        simulator.join()
+        simulator.close()
+    return len(found), elapsed
+
+
+if __name__ == "__main__":
+    print('%d boards, boot delays %.1f - %.1f seconds' % (BOARDS, BOOT_DELAYS[0], BOOT_DELAYS[-1]))
+    print('one port at a time : %d boards found in %6.3f seconds' % run(False))
+    print('concurrent         : %d boards found in %6.3f seconds' % run(True))
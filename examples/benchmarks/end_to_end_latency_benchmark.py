@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+
+This benchmark measures end-to-end latency: the time from an analog report being written to the
+serial port until the pin callback runs. It compares the two thread design (a serial receive
+thread handing data to the command handler thread) with single thread mode, each with polled
+and event driven reads.
+
+No Arduino is needed. A pseudo-terminal stands in for the serial port. A minimal board
+responder answers the analog mapping query sent by PyMata during start up.
+
+Linux/macOS only (requires pty support).
+"""
+
+import os
+import pty
+import threading
+import time
+
+from PyMata.pymata import PyMata
+
+# number of reports sent for each configuration
+ITERATIONS = 50
+
+# analog mapping for an Uno: 14 digital pins followed by A0 - A5
+ANALOG_MAPPING_RESPONSE = bytes(bytearray([0xF0, 0x6A] + [0x7F] * 14 + list(range(6)) + [0xF7]))
+
+
+def board_responder(master_fd):
+    """
+    Answer analog mapping queries and discard everything else written by PyMata
+    """
+    while True:
+        try:
+            data = os.read(master_fd, 1024)
+        except OSError:
+            return
+        if b'\xf0\x69\xf7' in data:
+            os.write(master_fd, ANALOG_MAPPING_RESPONSE)
+
+
+def run(**options):
+    master_fd, slave_fd = pty.openpty()
+    responder = threading.Thread(target=board_responder, args=(master_fd,))
+    responder.daemon = True
+    responder.start()
+
+    board = PyMata(os.ttyname(slave_fd), bluetooth=False, verbose=False, **options)
+
+    callback_event = threading.Event()
+    board.set_pin_mode(0, board.INPUT, board.ANALOG, lambda data: callback_event.set())
+
+    latencies = []
+    for i in range(ITERATIONS):
+        callback_event.clear()
+        # the value changes with each report, so that the callback is called
+        value = i % 2 + 1
+        start_time = time.time()
+        os.write(master_fd, bytes(bytearray([0xE0, value, 0])))
+        callback_event.wait()
+        latencies.append(time.time() - start_time)
+        # let the reports arrive at random points of the polling interval
+        time.sleep(.013)
+
+    board._command_handler.stop()
+    board.transport.stop()
+    board.receive_buffer.close()
+    os.close(master_fd)
+
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[-1] * 1000
+
+
+if __name__ == "__main__":
+    print('Report to callback latency over %d reports' % ITERATIONS)
+    print('two threads,   polled reads       : median %8.3f ms   max %8.3f ms' % run())
+    print('two threads,   event driven reads : median %8.3f ms   max %8.3f ms' % run(event_driven=True))
+    print('single thread, polled reads       : median %8.3f ms   max %8.3f ms' % run(single_thread=True))
+    print('single thread, event driven reads : median %8.3f ms   max %8.3f ms' %
+          run(single_thread=True, event_driven=True))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+
+This benchmark measures how many Firmata frames per second PyMata can encode and hand to the
+serial port for digital_write, analog_write and i2c_write.
+
+No Arduino is needed. A pseudo-terminal stands in for the serial port and a drain thread
+discards everything written to it. The PyMata instance is created with auto_connect=False and
+the port is opened directly, so no board discovery takes place.
+
+Linux/macOS only (requires pty support).
+"""
+
+import os
+import pty
+import threading
+import time
+
+from PyMata.pymata import PyMata
+from PyMata.pymata_serial import PyMataSerial
+
+# number of frames sent for each test
+ITERATIONS = 20000
+
+# 20 data bytes for the i2c write test
+I2C_DATA = list(range(20))
+
+
+def drain(master_fd):
+    while True:
+        try:
+            os.read(master_fd, 65536)
+        except OSError:
+            break
+
+
+def create_board():
+    master_fd, slave_fd = pty.openpty()
+    drain_thread = threading.Thread(target=drain, args=(master_fd,))
+    drain_thread.daemon = True
+    drain_thread.start()
+
+    board = PyMata(verbose=False, auto_connect=False)
+    board.transport = PyMataSerial(os.ttyname(slave_fd), board.receive_buffer, 57600)
+    board.transport.open(False)
+    board._create_command_handler()
+    return board
+
+
+def frames_per_second(test):
+    start_time = time.time()
+    for i in range(ITERATIONS):
+        test(i)
+    return ITERATIONS / (time.time() - start_time)
+
+
+if __name__ == "__main__":
+    board = create_board()
+    print('Frames sent per test: %d' % ITERATIONS)
+    print('digital_write : %10.0f frames/sec' % frames_per_second(lambda i: board.digital_write(13, i & 1)))
+    print('analog_write  : %10.0f frames/sec' % frames_per_second(lambda i: board.analog_write(3, i & 0xff)))
+    print('i2c_write     : %10.0f frames/sec' % frames_per_second(lambda i: board.i2c_write(0x70, *I2C_DATA)))
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+
+
+This benchmark drives a complete PyMata instance (command handler, latching and callbacks)
+through the in-memory PyMataLoopbackTransport and reports the number of analog report
+messages processed per second.
+
+No Arduino, serial port or pseudo-terminal is needed.
+"""
+
+import time
+
+from PyMata.pymata import PyMata
+from PyMata.pymata_loopback import PyMataLoopbackTransport
+
+# number of analog report messages injected for each run
+TOTAL_MESSAGES = 200000
+
+# analog input pins A0 - A5
+ANALOG_PINS = range(6)
+
+
+def run(single_thread):
+    transport = PyMataLoopbackTransport()
+    board = PyMata(transport=transport, verbose=False, single_thread=single_thread)
+
+    received = [0]
+
+    def callback(data):
+        received[0] += 1
+
+    for pin in ANALOG_PINS:
+        board.set_pin_mode(pin, board.INPUT, board.ANALOG, callback)
+
+    block = bytearray()
+    for i in range(TOTAL_MESSAGES):
+        pin = i % len(ANALOG_PINS)
+        # a callback is only invoked when the value changes, so every report carries a new value
+        value = (i // len(ANALOG_PINS) + 1) & 0x3ff
+        block += bytearray([0xE0 | pin, value & 0x7f, value >> 7])
+
+    start_time = time.time()
+    transport.inject(block)
+    while received[0] < TOTAL_MESSAGES:
+        time.sleep(.001)
+    elapsed = time.time() - start_time
+
+    board._command_handler.stop()
+    transport.stop()
+    return TOTAL_MESSAGES / elapsed
+
+
+if __name__ == "__main__":
+    print('Messages injected per run: %d' % TOTAL_MESSAGES)
+    print('receive thread + command handler : %10.0f messages/sec' % run(False))
+    print('single thread                    : %10.0f messages/sec' % run(True))
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+
+This benchmark measures the per-message overhead of decoding and dispatching a Firmata stream
+with PyMataParser.
+
+A byte stream similar to that of a busy board (analog reports, digital port reports and i2c
+replies) is fed to the parser in fixed size chunks. The message handlers do nothing, so the
+time measured is the parser and dispatch overhead alone.
+"""
+
+import time
+
+from PyMata.pymata_parser import PyMataParser
+
+# number of times the recorded stream is fed to the parser
+ITERATIONS = 2000
+
+# chunk size used to feed the parser - similar to a bulk read from the serial port
+CHUNK_SIZE = 64
+
+
+def record_stream():
+    stream = bytearray()
+    for value in range(0, 1024, 64):
+        # analog reports for pins A0 - A5
+        for pin in range(6):
+            stream.extend([0xE0 + pin, value & 0x7f, (value >> 7) & 0x7f])
+        # digital reports for ports 0 - 2
+        for port in range(3):
+            stream.extend([0x90 + port, value & 0x7f, (value >> 7) & 0x01])
+    # an i2c reply carrying 6 bytes of data
+    stream.extend([0xF0, 0x77, 0x48, 0x00, 0x00, 0x00])
+    for item in range(6):
+        stream.extend([item, 0])
+    stream.append(0xF7)
+    return bytes(stream)
+
+
+def do_nothing(data):
+    pass
+
+
+if __name__ == "__main__":
+    command_dispatch = {0xE0: [do_nothing, 2], 0x90: [do_nothing, 2], 0xF9: [do_nothing, 2],
+                        0x77: [do_nothing, 2]}
+    parser = PyMataParser(command_dispatch)
+
+    stream = record_stream()
+    chunks = [stream[i:i + CHUNK_SIZE] for i in range(0, len(stream), CHUNK_SIZE)]
+
+    messages = 0
+    start_time = time.time()
+    for i in range(ITERATIONS):
+        for chunk in chunks:
+            messages += parser.feed(chunk)
+    elapsed = time.time() - start_time
+
+    print('Bytes parsed       : %d' % (len(stream) * ITERATIONS))
+    print('Messages dispatched: %d' % messages)
+    print('Messages/sec       : %.0f' % (messages / elapsed))
+    print('Per message        : %.3f usec' % (elapsed / messages * 1000000))
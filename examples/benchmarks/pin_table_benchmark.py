@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+This benchmark measures the memory used by the response and latch tables of a board with the pin
+count of an Arduino Mega (54 digital pins and 16 analog pins, 70 pins in all), and the cost of
+updating and reading them.
+
+The command handler methods are called directly, so only the table work is measured.
+No Arduino, serial port or pseudo-terminal is needed.
+"""
+
+import time
+import tracemalloc
+
+from PyMata.pymata import PyMata
+from PyMata.pymata_command_handler import PyMataCommandHandler
+from PyMata.pymata_loopback import PyMataLoopbackTransport
+
+# analog mapping of an Arduino Mega: 54 digital pins followed by A0 - A15
+MEGA_ANALOG_MAPPING = [0x7f] * 54 + list(range(16))
+
+# number of calls timed for each operation
+CALLS = 200000
+
+
+def table_memory(board):
+    """
+    :return: The number of bytes allocated to build the response and latch tables for a Mega
+    """
+    handler = PyMataCommandHandler(board)
+    handler.analog_mapping_query_results = MEGA_ANALOG_MAPPING
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+    handler.initialize_pin_tables(False)
+    used = sum(stat.size_diff for stat in tracemalloc.take_snapshot().compare_to(start, 'filename'))
+    tracemalloc.stop()
+    return used
+
+
+def time_calls(function, arguments):
+    """
+    :return: The time per call in nanoseconds
+    """
+    count = len(arguments)
+    start_time = time.perf_counter()
+    for argument in arguments:
+        function(argument)
+    return (time.perf_counter() - start_time) * 1e9 / count
+
+
+if __name__ == "__main__":
+    board = PyMata(transport=PyMataLoopbackTransport(analog_mapping=MEGA_ANALOG_MAPPING), verbose=False)
+    handler = board._command_handler
+    for pin in range(16):
+        board.set_pin_mode(pin, board.INPUT, board.ANALOG)
+    for pin in range(2, 54):
+        board.set_pin_mode(pin, board.INPUT, board.DIGITAL)
+
+    print('%d pins: %d digital, %d analog' % (len(MEGA_ANALOG_MAPPING), handler.total_pins_discovered,
+                                               handler.number_of_analog_pins_discovered))
+    print('table memory              : %8d bytes' % table_memory(board))
+
+    # each message carries a new value
+    analog_messages = [[i % 16, i & 0x7f, (i >> 7) & 0x7] for i in range(CALLS)]
+    digital_messages = [[i % 7, i & 0x7f, (i >> 7) & 0x1] for i in range(CALLS)]
+    pins = [i % 16 for i in range(CALLS)]
+
+    print('analog message update     : %8.0f ns' % time_calls(handler.analog_message, analog_messages))
+    print('digital message (8 pins)  : %8.0f ns' % time_calls(handler.digital_message, digital_messages))
+    print('analog_read               : %8.0f ns' % time_calls(board.analog_read, pins))
+    print('get_digital_response_table: %8.0f ns' % time_calls(lambda _: board.get_digital_response_table(),
+                                                              range(CALLS // 100)))
+    board.disconnect()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+This benchmark measures how the callback throughput of several boards with CPU heavy callbacks
+scales when each board runs in its own process (PyMataProcess) instead of in the threads of one
+process (PyMata), where the callbacks of all boards share a single interpreter lock.
+
+Each board is a PyMataSimulator, run in a process of its own, streaming analog reports for 6 pins
+faster than the callbacks can handle them.
+
+No Arduino is needed. Linux/macOS only (requires pty support).
+"""
+
+import multiprocessing
+import time
+
+from PyMata.pymata import PyMata
+from PyMata.pymata_process import PyMataProcess
+from PyMata.pymata_simulator import PyMataSimulator
+
+# analog input pins A0 - A5
+ANALOG_PINS = range(6)
+
+# report rounds per second sent by each board
+RATE = 2000
+
+# loop iterations of work done by each callback
+WORK = 2000
+
+# seconds to measure for each run
+DURATION = 3
+
+BOARD_COUNTS = (1, 2, 4)
+
+
+def busy_callback(data):
+    total = 0
+    for i in range(WORK):
+        total += i
+    return total
+
+
+def run_simulator(connection):
+    simulator = PyMataSimulator(report_rate=RATE)
+    simulator.start()
+    connection.send(simulator.port_id)
+    # wait until the benchmark is done with the board
+    connection.recv()
+    simulator.stop()
+    simulator.join()
+    simulator.close()
+
+
+def run(boards, use_processes):
+    simulators = []
+    for _ in range(boards):
+        connection, simulator_connection = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=run_simulator, args=(simulator_connection,))
+        process.start()
+        simulators.append((process, connection, connection.recv()))
+
+    counters = []
+    connected = []
+    for process, connection, port_id in simulators:
+        if use_processes:
+            board = PyMataProcess(port_id, bluetooth=False, verbose=False, event_driven=True)
+            callback = busy_callback
+        else:
+            board = PyMata(port_id, bluetooth=False, verbose=False, event_driven=True)
+            received = [0]
+            counters.append(received)
+
+            # each board's callbacks run in its own thread, so each board has its own counter
+            def callback(data, received=received):
+                busy_callback(data)
+                received[0] += 1
+        for pin in ANALOG_PINS:
+            board.set_pin_mode(pin, board.INPUT, board.ANALOG, callback)
+        connected.append(board)
+
+    def callbacks():
+        if use_processes:
+            return sum(board.get_stats()['callbacks'] for board in connected)
+        return sum(received[0] for received in counters)
+
+    time.sleep(.5)
+    start_count = callbacks()
+    time.sleep(DURATION)
+    delivered = callbacks() - start_count
+
+    for board in connected:
+        board.disconnect()
+    for process, connection, port_id in simulators:
+        connection.send(None)
+        process.join()
+    return delivered / float(DURATION)
+
+
+if __name__ == "__main__":
+    print('%d cores, %d analog pins per board at %d reports/sec per pin, %d loop iterations per callback' %
+          (multiprocessing.cpu_count(), len(ANALOG_PINS), RATE, WORK))
+    for boards in BOARD_COUNTS:
+        print('%d boards: threads %8.0f callbacks/sec   processes %8.0f callbacks/sec' %
+              (boards, run(boards, False), run(boards, True)))
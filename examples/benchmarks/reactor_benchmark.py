@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+This benchmark compares the threads and CPU time used by PyMata as simulated boards are added,
+in three modes: a receive thread and a command handler thread per board polling the port,
+the same two threads with event driven reads, and a single PyMataReactor thread for all boards.
+
+Every board streams analog reports for 6 pins at a low rate, and the CPU time of the process
+and the number of reports delivered to the callbacks are measured over a fixed period.
+
+No Arduino is needed. Linux/macOS only (requires pty support).
+"""
+
+import threading
+import time
+
+from PyMata.pymata import PyMata
+from PyMata.pymata_reactor import PyMataReactor
+from PyMata.pymata_simulator import PyMataSimulator
+
+# analog input pins A0 - A5
+ANALOG_PINS = range(6)
+
+# report rounds per second sent by each board
+RATE = 20
+
+# seconds to measure for each run
+DURATION = 3
+
+BOARD_COUNTS = (1, 8, 32)
+
+
+def run(boards, mode):
+    simulators = [PyMataSimulator(report_rate=RATE) for _ in range(boards)]
+    for simulator in simulators:
+        simulator.start()
+    threads_before = threading.active_count()
+
+    reactor = PyMataReactor() if mode == 'reactor' else None
+    connected = [PyMata(simulator.port_id, bluetooth=False, verbose=False, reactor=reactor,
+                        event_driven=(mode == 'event driven')) for simulator in simulators]
+    threads = threading.active_count() - threads_before
+
+    received = [0]
+    lock = threading.Lock()
+
+    def callback(data):
+        with lock:
+            received[0] += 1
+
+    for board in connected:
+        for pin in ANALOG_PINS:
+            board.set_pin_mode(pin, board.INPUT, board.ANALOG, callback)
+
+    # let the reports start flowing before measuring
+    time.sleep(.5)
+    with lock:
+        received[0] = 0
+    cpu_start = time.process_time()
+    time.sleep(DURATION)
+    cpu = time.process_time() - cpu_start
+    with lock:
+        delivered = received[0]
+
+    for board in connected:
+        board.disconnect()
+    if reactor is not None:
+        reactor.stop()
+        reactor.join()
+    for simulator in simulators:
+        simulator.stop()
+        simulator.join()
+        simulator.close()
+    return threads, 100.0 * cpu / DURATION, delivered / float(DURATION)
+
+
+if __name__ == "__main__":
+    print('%d analog pins per board at %d reports/sec per pin, %d seconds per run' %
+          (len(ANALOG_PINS), RATE, DURATION))
+    print('CPU time includes the simulators, which run in this process')
+    for boards in BOARD_COUNTS:
+        for mode in ('polled', 'event driven', 'reactor'):
+            print('%2d boards %-12s: %3d PyMata threads   CPU %5.1f%%   delivered %7.0f reports/sec' %
+                  ((boards, mode) + run(boards, mode)))
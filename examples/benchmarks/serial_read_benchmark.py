@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+This benchmark measures the sustained receive rate (bytes/sec) of the PyMataSerial
+reader thread, comparing the byte-at-a-time loop with bulk reads.
+
+No Arduino is needed. A pseudo-terminal stands in for the serial port, and a writer
+thread streams analog report messages into it as fast as the reader will take them.
+
+Linux/macOS only (requires pty support).
+"""
+
+import os
+import pty
+import threading
+import time
+
+from PyMata.pymata_ring_buffer import PyMataRingBuffer
+from PyMata.pymata_serial import PyMataSerial
+
+# number of bytes to push through the port for each run
+TOTAL_BYTES = 300000
+
+# an analog report message for pin A0 with a value of 512
+ANALOG_MESSAGE = bytearray([0xE0, 0x00, 0x04])
+
+
+def writer(master_fd, total):
+    block = bytes(ANALOG_MESSAGE * 1024)
+    sent = 0
+    while sent < total:
+        sent += os.write(master_fd, block[:min(len(block), total - sent)])
+
+
+def run(bulk_read, max_chunk_size=PyMataSerial.MAX_CHUNK_SIZE, event_driven=False):
+    master_fd, slave_fd = pty.openpty()
+    # large enough to hold everything, so the benchmark measures the receive loop alone
+    receive_buffer = PyMataRingBuffer(TOTAL_BYTES)
+    transport = PyMataSerial(os.ttyname(slave_fd), receive_buffer, 115200,
+                             bulk_read=bulk_read, max_chunk_size=max_chunk_size, event_driven=event_driven)
+    transport.start()
+
+    start_time = time.time()
+    write_thread = threading.Thread(target=writer, args=(master_fd, TOTAL_BYTES))
+    write_thread.daemon = True
+    write_thread.start()
+
+    while len(receive_buffer) < TOTAL_BYTES:
+        time.sleep(.001)
+    elapsed = time.time() - start_time
+
+    transport.stop()
+    transport.join()
+    os.close(master_fd)
+    os.close(slave_fd)
+    return TOTAL_BYTES / elapsed
+
+
+if __name__ == "__main__":
+    print('Bytes received per run: %d' % TOTAL_BYTES)
+    print('byte-at-a-time reads  : %12.0f bytes/sec' % run(False))
+    for chunk_size in (64, 256, PyMataSerial.MAX_CHUNK_SIZE, 4096):
+        print('bulk reads (max %5d) : %12.0f bytes/sec' % (chunk_size, run(True, chunk_size)))
+    print('bulk reads, event driven: %12.0f bytes/sec' % run(True, event_driven=True))
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+This benchmark measures the cost of exporting the pin state to shared memory with
+PyMata.export_pin_state(), and the rate at which another process can read it with a
+PyMataStateReader while the board is busy.
+
+Analog report messages are injected through the in-memory PyMataLoopbackTransport without the
+export, with the export, and with the export while a reader process takes snapshots continuously.
+
+No Arduino, serial port or pseudo-terminal is needed.
+"""
+
+import multiprocessing
+import time
+
+from PyMata.pymata import PyMata
+from PyMata.pymata_loopback import PyMataLoopbackTransport
+from PyMata.pymata_shared_state import PyMataStateReader
+
+# number of analog report messages injected for each run
+TOTAL_MESSAGES = 200000
+
+# analog input pins A0 - A5
+ANALOG_PINS = range(6)
+
+
+def read_snapshots(name, stop_event, results):
+    reader = PyMataStateReader(name, shared_tracker=True)
+    snapshots = 0
+    start_time = time.time()
+    while not stop_event.is_set():
+        reader.snapshot()
+        snapshots += 1
+    results.put((snapshots / (time.time() - start_time), reader.retries))
+    reader.close()
+
+
+def run(export, read):
+    transport = PyMataLoopbackTransport()
+    board = PyMata(transport=transport, verbose=False, single_thread=True)
+
+    received = [0]
+
+    def callback(data):
+        received[0] += 1
+
+    for pin in ANALOG_PINS:
+        board.set_pin_mode(pin, board.INPUT, board.ANALOG, callback)
+
+    block = bytearray()
+    for i in range(TOTAL_MESSAGES):
+        pin = i % len(ANALOG_PINS)
+        # a callback is only invoked when the value changes, so every report carries a new value
+        value = (i // len(ANALOG_PINS) + 1) & 0x3ff
+        block += bytearray([0xE0 | pin, value & 0x7f, value >> 7])
+
+    reader = None
+    if export:
+        exporter = board.export_pin_state()
+    if read:
+        stop_event = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        reader = multiprocessing.Process(target=read_snapshots, args=(exporter.name, stop_event, results))
+        reader.start()
+        # let the reader attach before injecting
+        time.sleep(.5)
+
+    start_time = time.time()
+    transport.inject(block)
+    while received[0] < TOTAL_MESSAGES:
+        time.sleep(.001)
+    elapsed = time.time() - start_time
+
+    reader_results = None
+    if reader is not None:
+        stop_event.set()
+        reader_results = results.get()
+        reader.join()
+    board.disconnect()
+    return TOTAL_MESSAGES / elapsed, reader_results
+
+
+if __name__ == "__main__":
+    print('Messages injected per run: %d, single thread mode' % TOTAL_MESSAGES)
+    print('without export         : %10.0f messages/sec' % run(False, False)[0])
+    print('with export            : %10.0f messages/sec' % run(True, False)[0])
+    rate, (snapshots, retries) = run(True, True)
+    print('with export and reader : %10.0f messages/sec' % rate)
+    print('reader process         : %10.0f snapshots/sec, %d seqlock retries' % (snapshots, retries))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+
+
+This benchmark uses the PyMataSimulator to load PyMata with analog reports at increasing rates
+and reports how many of them reached the pin callbacks, together with the receive buffer
+high water mark.
+
+No Arduino is needed. Linux/macOS only (requires pty support).
+"""
+
+import time
+
+from PyMata.pymata import PyMata
+from PyMata.pymata_simulator import PyMataSimulator
+
+# analog input pins A0 - A5
+ANALOG_PINS = range(6)
+
+# seconds to stream reports for each rate
+DURATION = 2
+
+# report rounds per second - one report for each analog pin in each round
+RATES = (100, 1000, 5000, 20000)
+
+
+def run(rate, **options):
+    simulator = PyMataSimulator(report_rate=rate)
+    simulator.start()
+    board = PyMata(simulator.port_id, bluetooth=False, verbose=False, **options)
+
+    received = [0]
+
+    def callback(data):
+        received[0] += 1
+
+    for pin in ANALOG_PINS:
+        board.set_pin_mode(pin, board.INPUT, board.ANALOG, callback)
+    time.sleep(DURATION)
+
+    sent = simulator.reports_sent
+    delivered = received[0]
+    stats = board.get_receive_buffer_stats()
+
+    board._command_handler.stop()
+    board.transport.stop()
+    board.receive_buffer.close()
+    simulator.stop()
+    simulator.join()
+    simulator.close()
+    return sent / float(DURATION), delivered / float(DURATION), stats['high_water_mark']
+
+
+if __name__ == "__main__":
+    print('%d analog pins, %d seconds per rate, event driven reads' % (len(ANALOG_PINS), DURATION))
+    for rate in RATES:
+        print('%6d rounds/sec: sent %9.0f reports/sec   delivered %9.0f reports/sec   buffer high water %6d bytes' %
+              ((rate,) + run(rate, event_driven=True)))
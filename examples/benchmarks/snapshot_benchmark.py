@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+This benchmark measures the cost of PyMata.get_pin_snapshot() on a board with the pin count of an
+Arduino Mega, and its effect on message processing while a dashboard polls snapshots at 50 Hz,
+or as fast as it can.
+
+Analog report messages are injected through the in-memory PyMataLoopbackTransport.
+No Arduino, serial port or pseudo-terminal is needed.
+"""
+
+import threading
+import time
+
+from PyMata.pymata import PyMata
+from PyMata.pymata_loopback import PyMataLoopbackTransport
+
+# analog mapping of an Arduino Mega: 54 digital pins followed by A0 - A15
+MEGA_ANALOG_MAPPING = [0x7f] * 54 + list(range(16))
+
+# analog input pins A0 - A15
+ANALOG_PINS = range(16)
+
+# number of analog report messages injected for each run
+TOTAL_MESSAGES = 200000
+
+# number of snapshots timed
+SNAPSHOTS = 20000
+
+
+def poll(board, interval, stop_event, results):
+    snapshots = 0
+    changed = 0
+    generation = None
+    while not stop_event.is_set():
+        snapshot = board.get_pin_snapshot()
+        snapshots += 1
+        if snapshot.generation != generation:
+            changed += 1
+            generation = snapshot.generation
+        if interval:
+            time.sleep(interval)
+    results.extend([snapshots, changed])
+
+
+def run(poll_interval):
+    """
+    :param poll_interval: Time between snapshots, 0 to poll continuously, or None for no poller
+
+    :return: (messages per second, snapshots taken, snapshots with a new generation)
+    """
+    transport = PyMataLoopbackTransport(analog_mapping=MEGA_ANALOG_MAPPING)
+    board = PyMata(transport=transport, verbose=False)
+
+    received = [0]
+
+    def callback(data):
+        received[0] += 1
+
+    for pin in ANALOG_PINS:
+        board.set_pin_mode(pin, board.INPUT, board.ANALOG, callback)
+
+    block = bytearray()
+    for i in range(TOTAL_MESSAGES):
+        pin = i % len(ANALOG_PINS)
+        # a callback is only invoked when the value changes, so every report carries a new value
+        value = (i // len(ANALOG_PINS) + 1) & 0x3ff
+        block += bytearray([0xE0 | pin, value & 0x7f, value >> 7])
+
+    stop_event = threading.Event()
+    results = []
+    poller = None
+    if poll_interval is not None:
+        poller = threading.Thread(target=poll, args=(board, poll_interval, stop_event, results))
+        poller.start()
+
+    start_time = time.time()
+    transport.inject(block)
+    while received[0] < TOTAL_MESSAGES:
+        time.sleep(.001)
+    elapsed = time.time() - start_time
+
+    stop_event.set()
+    if poller is not None:
+        poller.join()
+    board.disconnect()
+    return (TOTAL_MESSAGES / elapsed,) + tuple(results or [0, 0])
+
+
+if __name__ == "__main__":
+    board = PyMata(transport=PyMataLoopbackTransport(analog_mapping=MEGA_ANALOG_MAPPING), verbose=False)
+    start_time = time.perf_counter()
+    for _ in range(SNAPSHOTS):
+        board.get_pin_snapshot()
+    print('get_pin_snapshot, 70 pins : %8.2f us' % ((time.perf_counter() - start_time) * 1e6 / SNAPSHOTS))
+    board.disconnect()
+
+    print('Messages injected per run: %d' % TOTAL_MESSAGES)
+    for label, interval in (('no poller', None), ('50 Hz poller', .02), ('continuous poller', 0)):
+        rate, snapshots, changed = run(interval)
+        print('%-18s: %9.0f messages/sec   %6d snapshots, %6d with new data' % (label, rate, snapshots, changed))
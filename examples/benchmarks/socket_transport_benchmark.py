@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+
+
+This benchmark measures the PyMataSocket TCP transport against a local Firmata stand-in:
+    round trip latency - from digital_write() until the pin callback for the board's reply runs
+    throughput - analog report messages processed per second
+
+No board is needed. The stand-in listens on a local TCP port, answers the analog mapping
+query sent by PyMata during start up, replies to each digital message with an analog report
+and streams analog reports on request.
+"""
+
+import socket
+import threading
+import time
+
+from PyMata.pymata import PyMata
+from PyMata.pymata_socket import PyMataSocket
+
+# number of round trips measured for each configuration
+ITERATIONS = 500
+
+# number of analog reports streamed for each configuration
+TOTAL_MESSAGES = 200000
+
+# analog mapping for an Uno: 14 digital pins followed by A0 - A5
+ANALOG_MAPPING_RESPONSE = bytes(bytearray([0xF0, 0x6A] + [0x7F] * 14 + list(range(6)) + [0xF7]))
+
+
+def analog_reports(count):
+    """
+    Build count analog reports for pin A0. The value changes with each report, so that
+    the callback is called for every one of them.
+    """
+    block = bytearray()
+    for i in range(count):
+        value = i % 1000 + 1
+        block += bytearray([0xE0, value & 0x7f, value >> 7])
+    return bytes(block)
+
+
+def firmata_stand_in(server, stream_request):
+    """
+    Serve a single PyMata connection
+    """
+    connection = server.accept()[0]
+    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    while True:
+        if stream_request.is_set():
+            stream_request.clear()
+            connection.sendall(analog_reports(TOTAL_MESSAGES))
+        try:
+            data = bytearray(connection.recv(1024))
+        except socket.error:
+            return
+        if not data:
+            return
+        if b'\xf0\x69\xf7' in data:
+            connection.sendall(ANALOG_MAPPING_RESPONSE)
+        for i in range(len(data) - 2):
+            if 0x90 <= data[i] <= 0x9F:
+                # reply to the digital message with an analog report for A0 carrying the port value + 1
+                connection.sendall(bytes(bytearray([0xE0, data[i + 1] + 1, 0])))
+
+
+def run(**options):
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    stream_request = threading.Event()
+    stand_in = threading.Thread(target=firmata_stand_in, args=(server, stream_request))
+    stand_in.daemon = True
+    stand_in.start()
+
+    transport = PyMataSocket('127.0.0.1', server.getsockname()[1])
+    board = PyMata(transport=transport, verbose=False, **options)
+
+    callback_event = threading.Event()
+    received = [0]
+
+    def callback(data):
+        received[0] += 1
+        callback_event.set()
+
+    board.set_pin_mode(0, board.INPUT, board.ANALOG, callback)
+    board.set_pin_mode(2, board.OUTPUT, board.DIGITAL)
+
+    latencies = []
+    for i in range(ITERATIONS):
+        callback_event.clear()
+        start_time = time.time()
+        board.digital_write(2, i % 2)
+        callback_event.wait()
+        latencies.append(time.time() - start_time)
+    latencies.sort()
+
+    received[0] = 0
+    start_time = time.time()
+    stream_request.set()
+    # wake up the stand-in
+    board.digital_write(3, 0)
+    while received[0] < TOTAL_MESSAGES:
+        time.sleep(.001)
+    rate = TOTAL_MESSAGES / (time.time() - start_time)
+
+    board._command_handler.stop()
+    transport.stop()
+    board.receive_buffer.close()
+    server.close()
+
+    return latencies[len(latencies) // 2] * 1000, latencies[-1] * 1000, rate
+
+
+if __name__ == "__main__":
+    print('Round trips per run: %d   analog reports per run: %d' % (ITERATIONS, TOTAL_MESSAGES))
+    print('two threads   : round trip median %7.3f ms  max %7.3f ms   %9.0f messages/sec' % run())
+    print('single thread : round trip median %7.3f ms  max %7.3f ms   %9.0f messages/sec' %
+          run(single_thread=True))
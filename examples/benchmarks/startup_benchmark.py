@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+
+
+This benchmark measures PyMata start up time against simulated boards and prints the
+per-phase breakdown reported by get_startup_timing().
+
+No Arduino is needed. Linux/macOS only (requires pty support).
+"""
+
+import time
+
+from PyMata.pymata import PyMata
+from PyMata.pymata_simulator import PyMataSimulator
+
+# number of boards started one after the other, as when a service restarts
+BOARDS = 12
+
+
+def start_board(**options):
+    simulator = PyMataSimulator()
+    simulator.start()
+    board = PyMata(simulator.port_id, verbose=False, **options)
+    timing = board.get_startup_timing()
+
+    board._command_handler.stop()
+    board.transport.stop()
+    board.receive_buffer.close()
+    simulator.stop()
+    simulator.join()
+    simulator.close()
+    return timing
+
+
+def run(label, **options):
+    start_time = time.time()
+    timings = [start_board(**options) for _ in range(BOARDS)]
+    elapsed = time.time() - start_time
+
+    print('%s: %d boards started in %.3f seconds' % (label, BOARDS, elapsed))
+    for phase in ('open', 'first_message', 'discovery', 'total'):
+        values = [timing[phase] * 1000 for timing in timings]
+        print('    %-14s mean %8.3f ms   max %8.3f ms' % (phase, sum(values) / len(values), max(values)))
+    print('    queries sent   mean %8.1f' % (sum(timing['queries_sent'] for timing in timings) / float(BOARDS)))
+
+
+if __name__ == "__main__":
+    run('polled reads')
+    run('event driven reads', event_driven=True)
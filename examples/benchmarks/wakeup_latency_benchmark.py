@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+
+
+
+This benchmark measures the wake-up latency of the PyMataSerial receive thread: the time from
+a message being written to the port until the command handler waiting on the receive buffer is woken.
+It compares the polling receive loop with the event driven (selectors based) receive loop.
+
+No Arduino is needed. A pseudo-terminal stands in for the serial port.
+
+Linux/macOS only (requires pty support).
+"""
+
+import os
+import pty
+import time
+
+from PyMata.pymata_ring_buffer import PyMataRingBuffer
+from PyMata.pymata_serial import PyMataSerial
+
+# number of messages sent for each run
+ITERATIONS = 50
+
+# an analog report message for pin A0 with a value of 512
+ANALOG_MESSAGE = bytes(bytearray([0xE0, 0x00, 0x04]))
+
+
+def run(event_driven):
+    master_fd, slave_fd = pty.openpty()
+    receive_buffer = PyMataRingBuffer()
+    transport = PyMataSerial(os.ttyname(slave_fd), receive_buffer, 57600, event_driven=event_driven)
+    transport.start()
+    time.sleep(.2)
+
+    latencies = []
+    for i in range(ITERATIONS):
+        start_time = time.time()
+        os.write(master_fd, ANALOG_MESSAGE)
+        receive_buffer.wait()
+        latencies.append(time.time() - start_time)
+        receive_buffer.clear()
+        # let the messages arrive at random points of the polling interval
+        time.sleep(.013)
+
+    transport.stop()
+    transport.join()
+    os.close(master_fd)
+    os.close(slave_fd)
+
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[-1] * 1000
+
+
+if __name__ == "__main__":
+    print('Wake-up latency over %d messages' % ITERATIONS)
+    print('polling receive loop      : median %8.3f ms   max %8.3f ms' % run(False))
+    print('event driven receive loop : median %8.3f ms   max %8.3f ms' % run(True))
@@ -0,0 +1,87 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+
+import sys
+import time
+import unittest
+
+from PyMata.pymata import PyMata
+
+try:
+    from PyMata.pymata_process import PyMataProcess, shared_memory
+except ImportError:
+    shared_memory = None
+
+
+LATCH_CONSTANTS = ('LATCH_IGNORE', 'LATCH_ARMED', 'LATCH_LATCHED', 'DIGITAL_LATCH_HIGH', 'DIGITAL_LATCH_LOW',
+                   'ANALOG_LATCH_GT', 'ANALOG_LATCH_LT', 'ANALOG_LATCH_GTE', 'ANALOG_LATCH_LTE',
+                   'LATCH_PIN', 'LATCH_STATE', 'LATCHED_DATA', 'LATCHED_TIME_STAMP')
+
+
+@unittest.skipIf(shared_memory is None or sys.platform.startswith('win'),
+                 'requires multiprocessing.shared_memory and pseudo-terminals')
+class TestPyMataProcess(unittest.TestCase):
+    def setUp(self):
+        # imported here, since the simulator requires pty support
+        from PyMata.pymata_simulator import PyMataSimulator
+        self.simulator = PyMataSimulator()
+        self.simulator.start()
+        self.board = PyMataProcess(self.simulator.port_id, verbose=False)
+
+    def tearDown(self):
+        self.board.disconnect()
+        self.simulator.stop()
+        self.simulator.join()
+        self.simulator.close()
+
+    def test_latch_constants(self):
+        for name in LATCH_CONSTANTS:
+            self.assertEqual(getattr(self.board, name), getattr(PyMata, name), name)
+
+    def test_digital_latch(self):
+        board = self.board
+        board.set_pin_mode(3, board.INPUT, board.DIGITAL)
+        board.set_digital_latch(3, board.DIGITAL_LATCH_HIGH)
+        self.simulator.send_digital(0, 8)
+        deadline = time.time() + 2
+        latch_data = board.get_digital_latch_data(3)
+        while latch_data[board.LATCH_STATE] != board.LATCH_LATCHED and time.time() < deadline:
+            time.sleep(.05)
+            latch_data = board.get_digital_latch_data(3)
+        self.assertEqual(latch_data[board.LATCH_STATE], board.LATCH_LATCHED)
+        self.assertEqual(latch_data[board.LATCHED_DATA], board.DIGITAL_LATCH_HIGH)
+
+    def test_values_after_reset(self):
+        board = self.board
+        board.set_pin_mode(3, board.INPUT, board.DIGITAL)
+        self.simulator.send_digital(0, 8)
+        deadline = time.time() + 2
+        while board.digital_read(3) != 1 and time.time() < deadline:
+            time.sleep(.05)
+        self.assertEqual(board.digital_read(3), 1)
+        board.reset()
+        self.assertEqual(board.digital_read(3), 0)
+        self.assertEqual(board.get_digital_response_table()[3], [board.INPUT, 0])
+
+    def test_pin_out_of_range(self):
+        with self.assertRaises(IndexError):
+            self.board.analog_read(len(self.board.get_analog_response_table()))
+
+
+if __name__ == '__main__':
+    unittest.main()
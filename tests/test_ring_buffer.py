@@ -0,0 +1,66 @@
+"""
+ Copyright (c) 2015-2019 Alan Yorinks All rights reserved.
+
+ This program is free software; you can redistribute it and/or
+ modify it under the terms of the GNU AFFERO GENERAL PUBLIC LICENSE
+ Version 3 as published by the Free Software Foundation; either
+ or (at your option) any later version.
+ This library is distributed in the hope that it will be useful,
+ but WITHOUT ANY WARRANTY; without even the implied warranty of
+ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ General Public License for more details.
+
+ You should have received a copy of the GNU AFFERO GENERAL PUBLIC LICENSE
+ along with this library; if not, write to the Free Software
+ Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+"""
+
+
+import unittest
+
+from PyMata.pymata_ring_buffer import PyMataRingBuffer
+
+
+class TestRingBufferDropOldest(unittest.TestCase):
+    def test_drops_oldest_data(self):
+        buffer = PyMataRingBuffer(8, PyMataRingBuffer.DROP_OLDEST)
+        buffer.write(b'abcdefgh')
+        buffer.write(b'XY')
+        self.assertEqual(buffer.read(), b'cdefghXY')
+        self.assertEqual(buffer.get_stats()['dropped_bytes'], 2)
+
+    def test_peek_held_drops_oldest_unreserved_data(self):
+        buffer = PyMataRingBuffer(8, PyMataRingBuffer.DROP_OLDEST)
+        buffer.write(b'abcd')
+        held = buffer.peek()
+        buffer.write(b'efgh')
+        buffer.write(b'XY')
+        # the data held by the reader is untouched and the newest data is kept
+        self.assertEqual(held.tobytes(), b'abcd')
+        self.assertEqual(buffer.get_stats()['dropped_bytes'], 2)
+        buffer.consume(len(held))
+        self.assertEqual(buffer.read(), b'ghXY')
+
+    def test_peek_held_with_wrapped_data(self):
+        buffer = PyMataRingBuffer(8, PyMataRingBuffer.DROP_OLDEST)
+        buffer.write(b'123456')
+        buffer.consume(len(buffer.peek()) - 2)
+        # '56' is at the end of the storage and the data written next wraps around
+        held = buffer.peek()
+        buffer.write(b'abcdef')
+        buffer.write(b'XYZ')
+        self.assertEqual(held.tobytes(), b'56')
+        buffer.consume(len(held))
+        self.assertEqual(buffer.read(), b'defXYZ')
+
+    def test_all_data_held_drops_new_data(self):
+        buffer = PyMataRingBuffer(4, PyMataRingBuffer.DROP_OLDEST)
+        buffer.write(b'abcd')
+        held = buffer.peek()
+        buffer.write(b'XY')
+        self.assertEqual(held.tobytes(), b'abcd')
+        self.assertEqual(buffer.get_stats()['dropped_bytes'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()